@@ -0,0 +1,224 @@
+# benchmarks/client_bench.py
+"""
+Acquisition and command-latency benchmark for WebSocketClient.
+
+Runs the client against an in-process websocket server on the simulated hardware
+backend and reports p50/p95/p99 for:
+  cycle     one acquisition window over every due sensor (sample_sensors)
+  command   activate/deactivate round-trip as seen by the server
+  send      publishing one payload (encode + websocket send)
+  loop_lag  how late the event loop wakes a 10 ms timer
+
+Each run is compared with the previous saved run of the same scenario; with --save it
+is appended to benchmarks/results.jsonl (untracked) together with the git revision.
+
+    python -m benchmarks.client_bench --scenario retries --duration 30 --save
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ROBECTRON_HAL", "sim")
+
+import websockets
+from websocket_client import WebSocketClient
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(REPO_ROOT, "benchmarks", "results.jsonl")
+
+# Simulated hardware settings per scenario
+SCENARIOS = {
+    "nominal": {
+        "dht22": {"failure_rate": 0.0},
+        "ds18b20": {"failure_rate": 0.0},
+        "ads1115": {"failure_rate": 0.0},
+    },
+    "retries": {
+        "dht22": {"failure_rate": 0.5},
+        "ds18b20": {"failure_rate": 0.2},
+        "ads1115": {"failure_rate": 0.05},
+    },
+}
+
+
+class BenchClient(WebSocketClient):
+    """WebSocketClient that records how long cycles and sends take."""
+
+    def __init__(self, config_file, samples):
+        super().__init__(config_file)
+        self.samples = samples
+
+    async def sample_sensors(self, sensor_names):
+        start = time.perf_counter()
+        sensor_info = await super().sample_sensors(sensor_names)
+        self.samples["cycle"].append(time.perf_counter() - start)
+        return sensor_info
+
+    async def publish(self, payload, timestamp=None):
+        start = time.perf_counter()
+        await super().publish(payload, timestamp)
+        if self.websocket is not None:
+            self.samples["send"].append(time.perf_counter() - start)
+
+
+def write_config(scenario, uri, workdir, sampling_interval):
+    """Derive a benchmark config from config.json pointing at the local server."""
+    with open(os.path.join(REPO_ROOT, "config.json"), "r") as f:
+        config = json.load(f)
+    config["websocket_url_pi"] = uri
+    config["sampling_interval"] = sampling_interval
+    config.pop("sampling", None)  # Sample and report every sensor each interval
+    config["hal"] = {"backend": "sim", "sim": dict(config.get("hal", {}).get("sim", {}), **SCENARIOS[scenario])}
+    config.setdefault("telemetry_buffer", {})["path"] = os.path.join(workdir, "telemetry.db")
+    config.setdefault("logging", {})["file"] = os.path.join(workdir, "client.log.jsonl")
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+async def measure_loop_lag(samples, interval=0.01):
+    """Record how much later than requested the event loop wakes a sleeping task."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples["loop_lag"].append(time.perf_counter() - start - interval)
+
+
+async def run(scenario, duration, sampling_interval, command_interval, retry_delay):
+    samples = {"cycle": [], "command": [], "send": [], "loop_lag": []}
+    replies = asyncio.Queue()
+
+    async def handler(websocket):
+        async def send_commands():
+            actions = ("activate", "deactivate")
+            count = 0
+            while True:
+                action = actions[count % 2]
+                count += 1
+                start = time.perf_counter()
+                await websocket.send(json.dumps({"action": action, "actuator": "EC_Pump", "request_id": f"bench-{count}"}))
+                await replies.get()
+                samples["command"].append(time.perf_counter() - start)
+                await asyncio.sleep(command_interval)
+
+        commands = asyncio.create_task(send_commands())
+        try:
+            async for message in websocket:
+                # Command replies echo the request_id first; everything else is telemetry
+                if isinstance(message, str) and message.startswith('{"request_id": "bench-'):
+                    replies.put_nowait(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass  # The client is cancelled mid-connection when the run ends
+        finally:
+            commands.cancel()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            config_file = write_config(scenario, f"ws://127.0.0.1:{port}", workdir, sampling_interval)
+            client = BenchClient(config_file, samples)
+            for sensor in client.sensors.values():
+                sensor.delay = retry_delay  # Shorter retry back-off keeps runs short
+
+            lag_task = asyncio.create_task(measure_loop_lag(samples))
+            client_task = asyncio.create_task(client.gather_and_send())
+            await asyncio.sleep(duration)
+            client_task.cancel()
+            lag_task.cancel()
+            await asyncio.gather(client_task, lag_task, return_exceptions=True)
+            client.acquisition.shutdown()
+            client.log_listener.stop()
+
+    return samples
+
+
+def summarize(samples):
+    """Turn raw durations into p50/p95/p99 in milliseconds."""
+    summary = {}
+    for name, values in samples.items():
+        if len(values) < 2:
+            summary[name] = {"count": len(values)}
+            continue
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": cuts[49] * 1000,
+            "p95_ms": cuts[94] * 1000,
+            "p99_ms": cuts[98] * 1000,
+        }
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_result(scenario):
+    """Return the last stored result for a scenario, if any."""
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    previous = None
+    with open(RESULTS_FILE, "r") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["scenario"] == scenario:
+                previous = entry
+    return previous
+
+
+def report(summary, previous):
+    print(f"{'metric':10s} {'count':>6s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s}  vs previous p95")
+    for name, stats in summary.items():
+        if "p50_ms" not in stats:
+            print(f"{name:10s} {stats['count']:6d} {'-':>10s} {'-':>10s} {'-':>10s}")
+            continue
+        change = ""
+        old = (previous or {}).get("metrics", {}).get(name, {})
+        if old.get("p95_ms"):
+            change = f"{(stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100:+.1f}% ({previous['revision']})"
+        print(f"{name:10s} {stats['count']:6d} {stats['p50_ms']:10.2f} {stats['p95_ms']:10.2f} "
+              f"{stats['p99_ms']:10.2f}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="nominal")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--sampling-interval", type=float, default=0.5, help="Seconds between acquisition cycles")
+    parser.add_argument("--command-interval", type=float, default=0.05, help="Seconds between commands")
+    parser.add_argument("--retry-delay", type=float, default=0.2, help="Driver retry delay in seconds")
+    parser.add_argument("--save", action="store_true", help="Append the result to results.jsonl")
+    args = parser.parse_args()
+
+    samples = asyncio.run(run(args.scenario, args.duration, args.sampling_interval,
+                              args.command_interval, args.retry_delay))
+    summary = summarize(samples)
+    entry = {
+        "timestamp": time.time(),
+        "revision": git_revision(),
+        "scenario": args.scenario,
+        "duration": args.duration,
+        "metrics": summary,
+    }
+    report(summary, previous_result(args.scenario))
+
+    if args.save:
+        with open(RESULTS_FILE, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# commands/dispatcher.py
+import asyncio
+import json
+import logging
+import time
+from telemetry.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+
+class CommandDispatcher:
+    """
+    Registry of command handlers, run concurrently with per-resource serialisation.
+
+    A handler is `async def handler(websocket, command) -> dict | None` registered for one
+    action, optionally with a `locks(command) -> [key, ...]` function. Commands that share a
+    key (e.g. the same relay channel) run one at a time in arrival order; everything else
+    runs in parallel, so a slow sensor read does not hold up relay commands.
+    A returned dict is sent as the JSON reply with the command's request_id echoed back;
+    ValueError/TypeError/OSError become {"status": "error"} replies, as does a command
+    that is not a JSON object.
+    At most max_in_flight commands run at once; submit() waits for a free slot, which
+    stops the reader and pushes back on the sender.
+    """
+
+    def __init__(self, max_in_flight=16):
+        self.handlers = {}  # action -> (handler, locks function or None)
+        self.max_in_flight = max_in_flight
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._locks = {}  # serialisation key -> asyncio.Lock
+        self._tasks = set()
+        self._counters = {}  # action -> ws_commands_total counter, one per registered action
+        metrics = get_registry()
+        # Unregistered actions share one label so a misbehaving backend cannot grow the label set
+        self._unknown = metrics.counter("ws_commands_total", "Commands received from the backend", action="unknown")
+        self._command_seconds = metrics.histogram("ws_command_seconds", "Time from receiving a command to its reply")
+        metrics.gauge_func("ws_commands_in_flight", lambda: len(self._tasks), "Commands currently running")
+
+    def register(self, action, handler, locks=None):
+        self.handlers[action] = (handler, locks)
+        self._counters[action] = get_registry().counter(
+            "ws_commands_total", "Commands received from the backend", action=action)
+
+    async def submit(self, websocket, command):
+        """Start a command in the background once a slot is free."""
+        await self._slots.acquire()
+        task = asyncio.create_task(self._run(websocket, command))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        self._slots.release()
+
+    async def _run(self, websocket, command):
+        try:
+            await self.dispatch(websocket, command)
+        except Exception as e:
+            # Replies to a closed connection and similar failures must not kill the dispatcher
+            logger.warning("Command %s failed: %s", command.get("action") if isinstance(command, dict) else command, e)
+
+    async def dispatch(self, websocket, command):
+        """Run one command to completion and send its reply."""
+        started = time.perf_counter()
+        if not isinstance(command, dict):
+            self._unknown.inc()
+            logger.warning("Error: command is not a JSON object: %.200r", command)
+            await websocket.send(json.dumps({"status": "error", "message": "Expected a JSON object"}))
+            return
+        action = command.get("action")
+        entry = self.handlers.get(action) if isinstance(action, str) else None
+        (self._counters[action] if entry is not None else self._unknown).inc()
+        try:
+            if entry is None:
+                raise ValueError(f"Unknown action: {action}")
+            handler, locks = entry
+            keys = sorted(set(locks(command))) if locks is not None else []
+            held = []
+            try:
+                # Sorted acquisition order prevents deadlocks between multi-key commands
+                for key in keys:
+                    lock = self._locks.setdefault(key, asyncio.Lock())
+                    await lock.acquire()
+                    held.append(lock)
+                reply = await handler(websocket, command)
+            finally:
+                for lock in reversed(held):
+                    lock.release()
+        except (ValueError, TypeError, OSError) as e:
+            logger.warning("Error: %s", e)
+            reply = {"status": "error", "message": str(e)}
+
+        if reply is not None:
+            if "request_id" in command:
+                reply = {"request_id": command["request_id"], **reply}
+            await websocket.send(json.dumps(reply))
+        self._command_seconds.observe(time.perf_counter() - started)
+
+    async def cancel_all(self):
+        """Cancel running commands, e.g. when their connection is gone."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
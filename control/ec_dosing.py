@@ -0,0 +1,262 @@
+# control/ec_dosing.py
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Settings the backend may change at runtime with set_ec_control
+TUNABLE = ("enabled", "setpoint", "hysteresis", "mode", "kp", "ki", "dose_ms", "min_dose_ms", "max_dose_ms",
+           "mix_wait", "sample_interval", "max_doses_per_hour", "max_ec", "require_on")
+
+# Numeric settings and the smallest value each accepts: (minimum, minimum is allowed)
+NUMERIC = {
+    "setpoint": (0, False),
+    "hysteresis": (0, True),
+    "kp": (0, True),
+    "ki": (0, True),
+    "dose_ms": (0, False),
+    "min_dose_ms": (0, True),
+    "max_dose_ms": (0, False),
+    "mix_wait": (0, True),
+    "sample_interval": (0, False),
+    "max_doses_per_hour": (0, True),
+    "max_ec": (0, False),
+}
+
+
+class ECDosingController:
+    """
+    Closed-loop EC control running on the device next to the EC sensor and the dosing pumps.
+    Each step reads EC (reusing a reading up to sample_interval old) and, if it is below
+    the setpoint, doses every pump with a timed pulse, then waits mix_wait seconds for the
+    nutrient to mix before measuring again.
+
+    mode "hysteresis" doses a fixed dose_ms whenever EC < setpoint - hysteresis.
+    mode "pi" doses kp * error + ki * integral milliseconds (clamped to min/max_dose_ms),
+    with the integral frozen while the output is saturated.
+
+    Interlocks stop dosing (the loop keeps measuring): a failed or missing EC reading, EC
+    above max_ec (the controller also disables itself), a pump that is not a relay channel,
+    a channel in require_on that is OFF (e.g. the circulation pump), a dose still mixing in,
+    the max_doses_per_hour rate limit and a pulse any pump could not take. Every pump is
+    checked before the first is pulsed, and the dose is recorded before pulsing, so a dose
+    always starts the mix wait and counts towards the rate limit.
+    max_dose_ms (and dose_ms) are capped at the shortest pump max on-time.
+    Every step is reported to the coroutines in `listeners` as an "ec_control" event.
+    """
+
+    def __init__(self, acquisition, relays, pulses, pumps=("ECA", "ECB"), sensor="EC", enabled=False,
+                 setpoint=1.5, hysteresis=0.1, mode="hysteresis", kp=2000.0, ki=50.0, dose_ms=1000,
+                 min_dose_ms=100, max_dose_ms=5000, mix_wait=60.0, sample_interval=5.0, max_doses_per_hour=6,
+                 max_ec=3.0, require_on=()):
+        self.acquisition = acquisition
+        self.relays = relays
+        self.pulses = pulses
+        self.pumps = list(pumps)  # Channels pulsed together for one dose (A and B nutrient)
+        self.sensor = sensor
+        self.enabled = enabled
+        self.setpoint = setpoint  # Target EC in mS/cm
+        self.hysteresis = hysteresis  # Dose only below setpoint - hysteresis (hysteresis mode)
+        self.mode = mode  # "hysteresis" or "pi"
+        self.kp = kp  # ms of dosing per mS/cm of error
+        self.ki = ki  # ms of dosing per mS/cm*s of accumulated error
+        self.dose_ms = dose_ms
+        self.min_dose_ms = min_dose_ms
+        self.max_dose_ms = max_dose_ms
+        self.mix_wait = mix_wait  # Seconds to let a dose mix in before the next measurement
+        self.sample_interval = sample_interval  # Seconds between control steps when not dosing
+        self.max_doses_per_hour = max_doses_per_hour
+        self.max_ec = max_ec  # Safety ceiling; exceeding it disables the controller
+        self.require_on = list(require_on)  # Channels that must be ON to dose
+        self.listeners = []  # async callables(event dict)
+        self.integral = 0.0
+        self.last_step = None  # Monotonic time of the last step (for the integral)
+        self.doses = []  # Monotonic times of recent doses (rate limit)
+        self.mixing_until = 0.0  # Monotonic time the last dose has mixed in
+        self.last_event = None
+        self._wake = asyncio.Event()  # Set when settings change so the loop re-evaluates at once
+        limit = self.pulse_limit_ms()
+        if limit is not None and max(self.dose_ms, self.max_dose_ms) > limit:
+            logger.warning("EC control doses capped at the %d ms pump max on-time", limit)
+            self.dose_ms = min(self.dose_ms, limit)
+            self.max_dose_ms = min(self.max_dose_ms, limit)
+        self.validate({key: getattr(self, key) for key in TUNABLE})  # Reject a bad config at startup
+
+    def pulse_limit_ms(self):
+        """Longest pulse every pump accepts, in ms (None = no limit)."""
+        limits = []
+        for pump in self.pumps:
+            try:
+                limit = self.pulses.max_on_time(pump)
+            except ValueError:
+                continue  # Not a relay channel: reported by the interlock
+            if limit is not None:
+                limits.append(limit * 1000)
+        return min(limits, default=None)
+
+    def validate(self, settings):
+        """
+        Check a complete or partial set of settings against the current ones.
+        Raises ValueError for unknown keys, wrong types and out-of-range or inconsistent values.
+        """
+        unknown = set(settings) - set(TUNABLE)
+        if unknown:
+            raise ValueError(f"Unknown EC control settings: {', '.join(sorted(unknown))}")
+        for key, value in settings.items():
+            if key == "enabled":
+                if not isinstance(value, bool):
+                    raise ValueError(f"EC control setting enabled must be true or false, got {value!r}")
+            elif key == "mode":
+                if value not in ("hysteresis", "pi"):
+                    raise ValueError(f"Unknown EC control mode: {value!r}")
+            elif key == "require_on":
+                if not isinstance(value, (list, tuple)) or not all(isinstance(name, str) for name in value):
+                    raise ValueError(f"EC control setting require_on must be a list of channel names, got {value!r}")
+                snapshot = self.relays.snapshot()
+                for name in value:
+                    if name not in snapshot:
+                        raise ValueError(f"EC control require_on refers to unknown channel {name}")
+            else:
+                minimum, inclusive = NUMERIC[key]
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+                    raise ValueError(f"EC control setting {key} must be a number, got {value!r}")
+                if value < minimum or (value == minimum and not inclusive):
+                    raise ValueError(f"EC control setting {key} must be {'>=' if inclusive else '>'} {minimum}, got {value}")
+        merged = {key: settings.get(key, getattr(self, key, None)) for key in ("min_dose_ms", "max_dose_ms", "setpoint", "max_ec")}
+        if None not in merged.values():
+            if merged["min_dose_ms"] > merged["max_dose_ms"]:
+                raise ValueError("EC control min_dose_ms must not exceed max_dose_ms")
+            if merged["setpoint"] >= merged["max_ec"]:
+                raise ValueError("EC control setpoint must be below max_ec")
+        limit = self.pulse_limit_ms()
+        for key in ("dose_ms", "max_dose_ms"):
+            value = settings.get(key)
+            if limit is not None and value is not None and value > limit:
+                raise ValueError(f"EC control {key} must not exceed the {limit:g} ms pump max on-time")
+
+    def configure(self, settings):
+        """Apply setpoint/tuning changes from the backend; invalid settings raise ValueError and change nothing."""
+        self.validate(settings)
+        for key, value in settings.items():
+            setattr(self, key, list(value) if key == "require_on" else value)
+        if "setpoint" in settings or "mode" in settings:
+            self.integral = 0.0
+        self._wake.set()
+        return self.status()
+
+    def status(self):
+        return {
+            **{key: getattr(self, key) for key in TUNABLE},
+            "pumps": self.pumps,
+            "integral": self.integral,
+            "doses_last_hour": len(self.doses),
+            "last": self.last_event,
+        }
+
+    def decide(self, ec, now):
+        """Dose length in ms for an EC value (0 = no dose). Updates the PI integral."""
+        error = self.setpoint - ec
+        if self.mode == "pi":
+            dt = 0.0 if self.last_step is None else now - self.last_step
+            integral = self.integral + error * dt
+            output = self.kp * error + self.ki * integral
+            if 0 <= output <= self.max_dose_ms:
+                self.integral = integral  # Anti-windup: only integrate while the output is not saturated
+            if output < self.min_dose_ms:
+                return 0
+            return min(output, self.max_dose_ms)
+        if error > self.hysteresis:
+            return self.dose_ms
+        return 0
+
+    def interlock(self, entry, now):
+        """Reason dosing is blocked right now, or None."""
+        data = entry.get("sensor_data") or {}
+        ec = data.get("ec_value")
+        if entry.get("sensor_status") != "OK" or ec is None:
+            return "no valid EC reading"
+        if ec > self.max_ec:
+            self.enabled = False
+            logger.error("EC %.3f above the %.3f safety limit, EC control disabled", ec, self.max_ec)
+            return "EC above max_ec, controller disabled"
+        snapshot = self.relays.snapshot()
+        for pump in self.pumps:
+            if pump not in snapshot:
+                return f"dosing pump {pump} is not a relay channel"
+        for name in self.require_on:
+            if snapshot.get(name) != "ON":
+                return f"{name} is not ON"
+        if now < self.mixing_until:
+            return "last dose still mixing"
+        self.doses = [t for t in self.doses if now - t < 3600]
+        if len(self.doses) >= self.max_doses_per_hour:
+            return "max_doses_per_hour reached"
+        return None
+
+    async def step(self):
+        """One control step; returns the number of seconds to wait before the next one."""
+        now = time.monotonic()
+        entry = await self.acquisition.read(self.sensor, max_age=self.sample_interval)
+        data = entry.get("sensor_data") or {}
+        ec = data.get("ec_value")
+        event = {"event": "ec_control", "ec": ec, "temperature": data.get("temperature"),
+                 "setpoint": self.setpoint, "action": "idle", "dose_ms": 0, "reason": None}
+        wait = self.sample_interval
+
+        reason = self.interlock(entry, now)
+        if reason is not None:
+            event.update(action="interlock", reason=reason)
+        else:
+            dose_ms = self.decide(ec, now)
+            if dose_ms:
+                try:
+                    for pump in self.pumps:
+                        self.pulses.check(pump, dose_ms)
+                except ValueError as e:
+                    event.update(action="interlock", reason=str(e))
+                else:
+                    # Recorded first: a pump that still fails to start must not lead to a redose
+                    wait = dose_ms / 1000.0 + self.mix_wait  # Measure again once the dose has mixed in
+                    self.doses.append(now)
+                    self.mixing_until = now + wait
+                    event.update(action="dose", dose_ms=round(dose_ms))
+                    try:
+                        for pump in self.pumps:
+                            self.pulses.pulse(pump, dose_ms, request_id="ec_control")
+                    except ValueError as e:
+                        logger.error("EC dose only partly started: %s", e)
+                        event.update(reason=str(e))
+        self.last_step = now
+        self.last_event = event
+        await self._emit(event)
+        return wait
+
+    async def run(self):
+        """Control loop; idles while disabled and reacts immediately to new settings."""
+        while True:
+            wait = self.sample_interval
+            if self.enabled:
+                try:
+                    wait = await self.step()
+                except ValueError as e:
+                    logger.error("EC control step failed: %s", e)
+                except Exception as e:
+                    # Unexpected failure: stop dosing rather than let the task die with enabled still true
+                    logger.exception("EC control step crashed, EC control disabled: %s", e)
+                    self.enabled = False
+                    self.last_event = {"event": "ec_control", "action": "fault", "reason": str(e),
+                                       "setpoint": self.setpoint, "dose_ms": 0}
+                    await self._emit(self.last_event)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _emit(self, event):
+        for listener in self.listeners:
+            try:
+                await listener(event)
+            except Exception as e:
+                logger.warning("EC control listener failed: %s", e)
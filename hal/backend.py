@@ -0,0 +1,65 @@
+# hal/backend.py
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that overrides the backend chosen in config.json
+BACKEND_ENV = "ROBECTRON_HAL"
+BACKENDS = ("rpi", "sim")
+
+_backend = None
+
+
+def is_raspberry_pi():
+    """Detect a Raspberry Pi from the device-tree model string."""
+    try:
+        with open("/proc/device-tree/model", "r") as f:
+            return "Raspberry Pi" in f.read()
+    except OSError:
+        return False
+
+
+def select_backend_name(hal_config=None):
+    """
+    Resolve which backend to use.
+    ROBECTRON_HAL wins over the "backend" entry of the hal config. The default is "rpi";
+    simulated hardware is only ever used when asked for by name, so a Pi with a broken
+    driver install fails at startup instead of quietly reporting made-up readings.
+    """
+    hal_config = hal_config or {}
+    name = os.environ.get(BACKEND_ENV) or hal_config.get("backend", "rpi")
+    if name == "auto":
+        raise ValueError('HAL backend "auto" is no longer supported: use "rpi", or "sim" for simulated hardware')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HAL backend: {name} (expected one of {', '.join(BACKENDS)})")
+    return name
+
+
+def configure_backend(hal_config=None):
+    """Create the process-wide backend from the "hal" section of config.json."""
+    global _backend
+    hal_config = hal_config or {}
+    name = select_backend_name(hal_config)
+    if name == "rpi":
+        from hal.rpi import RPiBackend
+        try:
+            _backend = RPiBackend()
+        except ImportError as e:
+            if not is_raspberry_pi():
+                raise RuntimeError(f"Not running on a Raspberry Pi ({e}); set {BACKEND_ENV}=sim or "
+                                   f'"hal": {{"backend": "sim"}} to use simulated hardware') from e
+            raise RuntimeError(f"Raspberry Pi hardware libraries are missing: {e}") from e
+        logger.info("Using %s hardware backend", name)
+    else:
+        from hal.sim import SimBackend
+        _backend = SimBackend(hal_config.get("sim", {}))
+        logger.warning("Using SIMULATED hardware: sensor readings are not real and relays switch nothing")
+    return _backend
+
+
+def get_backend():
+    """Return the configured backend, configuring it from the environment on first use."""
+    if _backend is None:
+        configure_backend()
+    return _backend
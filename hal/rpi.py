@@ -0,0 +1,50 @@
+# hal/rpi.py
+import glob
+import time
+
+# sysfs control files of the kernel w1_therm driver for bus-wide ("bulk") conversions
+W1_BULK_READ_GLOB = "/sys/bus/w1/devices/w1_bus_master*/therm_bulk_read"
+
+
+class RPiBackend:
+    """Real Raspberry Pi hardware: RPi.GPIO, Adafruit Blinka/DHT, w1thermsensor and smbus2."""
+
+    name = "rpi"
+
+    def __init__(self):
+        # Imported here so the simulated backend works on machines without these libraries
+        import RPi.GPIO as GPIO
+        import board
+        import adafruit_dht
+        import smbus2
+        from w1thermsensor import W1ThermSensor, NoSensorFoundError
+
+        self.GPIO = GPIO
+        self.board = board
+        self.DHT22 = adafruit_dht.DHT22
+        self.W1ThermSensor = W1ThermSensor
+        self.NoSensorFoundError = NoSensorFoundError
+        self.SMBus = smbus2.SMBus
+
+    def w1_bulk_convert(self, timeout):
+        """
+        Start a temperature conversion on every DS18B20 of every 1-Wire bus at once and wait
+        for it to finish, at most `timeout` seconds in all. Subsequent reads return the
+        converted values without converting again.
+        Returns False if the kernel driver has no bulk read support.
+        """
+        masters = glob.glob(W1_BULK_READ_GLOB)
+        if not masters:
+            return False
+        deadline = time.monotonic() + timeout
+        for master in masters:
+            with open(master, "w") as f:
+                f.write("trigger\n")
+        for master in masters:
+            # -1 while conversions are still running
+            while time.monotonic() < deadline:
+                with open(master, "r") as f:
+                    if f.read().strip() != "-1":
+                        break
+                time.sleep(0.01)
+        return True
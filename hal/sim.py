@@ -0,0 +1,266 @@
+# hal/sim.py
+import random
+import threading
+import time
+
+# ADS1115 register pointers and config bits used by the simulated converter
+_REG_CONVERT = 0x00
+_REG_CONFIG = 0x01
+_OS_BIT = 0x8000
+_MODE_SINGLE = 0x0100
+# Samples per second for each DR field value (config bits 7:5)
+_DATA_RATES = (8, 16, 32, 64, 128, 250, 475, 860)
+# Full-scale range in volts for each PGA field value (config bits 11:9)
+_FULL_SCALE = (6.144, 4.096, 2.048, 1.024, 0.512, 0.256, 0.256, 0.256)
+# DS18B20 conversion time in seconds for each resolution in bits
+_DS18B20_CONVERSION = {9: 0.09375, 10: 0.1875, 11: 0.375, 12: 0.75}
+
+
+class SimGPIO:
+    """In-memory stand-in for RPi.GPIO that records pin modes and levels."""
+
+    BCM = "BCM"
+    OUT = "OUT"
+    IN = "IN"
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self):
+        self.mode = None
+        self.pins = {}  # pin -> level
+        self.writes = 0  # Number of output() calls, useful when profiling relay traffic
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, mode, initial=None):
+        # Like RPi.GPIO, a list of channels can be set up in one call
+        for channel in (pin if isinstance(pin, (list, tuple)) else (pin,)):
+            self.pins.setdefault(channel, self.LOW if initial is None else initial)
+
+    def output(self, pin, state):
+        # Like RPi.GPIO, a list of channels with a matching list of levels is one call
+        if isinstance(pin, (list, tuple)):
+            states = state if isinstance(state, (list, tuple)) else [state] * len(pin)
+            self.pins.update(zip(pin, states))
+        else:
+            self.pins[pin] = state
+        self.writes += 1
+
+    def input(self, pin):
+        return self.pins.get(pin, self.LOW)
+
+    def cleanup(self, pin=None):
+        if pin is None:
+            self.pins.clear()
+        else:
+            self.pins.pop(pin, None)
+
+
+class SimBoard:
+    """Stand-in for the Blinka `board` module: any pin name resolves to itself."""
+
+    def __getattr__(self, name):
+        return name
+
+
+class SimDHT22:
+    """
+    DHT22 model. Like the Adafruit driver it refuses to measure more often than every
+    min_interval seconds (cached values are returned instead), each measurement blocks
+    for read_time and fails with a RuntimeError at failure_rate.
+    """
+
+    def __init__(self, backend, pin):
+        settings = backend.settings.get("dht22", {})
+        self.pin = pin
+        self.rng = backend.rng
+        self.read_time = settings.get("read_time", 0.25)
+        self.min_interval = settings.get("min_interval", 2.0)
+        self.failure_rate = settings.get("failure_rate", 0.0)
+        self._temperature = settings.get("temperature", 24.0)
+        self._humidity = settings.get("humidity", 60.0)
+        self._last_measure = None
+        self._lock = threading.Lock()
+
+    def _measure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last_measure is not None and now - self._last_measure < self.min_interval:
+                return
+            self._last_measure = now
+            time.sleep(self.read_time)
+            if self.rng.random() < self.failure_rate:
+                raise RuntimeError("Checksum did not validate. Try again.")
+            self._temperature += self.rng.gauss(0, 0.05)
+            self._humidity += self.rng.gauss(0, 0.2)
+
+    @property
+    def temperature(self):
+        self._measure()
+        return round(self._temperature, 1)
+
+    @property
+    def humidity(self):
+        self._measure()
+        return round(self._humidity, 1)
+
+    def exit(self):
+        pass
+
+
+class SimNoSensorFoundError(Exception):
+    """Raised like w1thermsensor.NoSensorFoundError when no probe answers."""
+
+
+class SimW1ThermSensor:
+    """DS18B20 model with resolution-dependent conversion time and injectable failures."""
+
+    backend = None  # Bound by SimBackend so the class-level discovery API can see its settings
+
+    def __init__(self, sensor_id=None):
+        settings = self.backend.settings.get("ds18b20", {})
+        probes = self._probe_ids()
+        if not probes or self.backend.rng.random() < settings.get("missing_rate", 0.0):
+            raise SimNoSensorFoundError("No DS18B20 sensor found on the 1-Wire bus")
+        if sensor_id is not None and sensor_id not in probes:
+            raise SimNoSensorFoundError(f"DS18B20 sensor {sensor_id} not found")
+        self.id = sensor_id or probes[0]
+        self.rng = self.backend.rng
+        self.resolution = self.backend.w1_resolutions.get(self.id, settings.get("resolution", 12))
+        self.failure_rate = settings.get("failure_rate", 0.0)
+        self._temperature = settings.get("temperature", 21.5) + 0.1 * probes.index(self.id)
+
+    @classmethod
+    def _probe_ids(cls):
+        count = cls.backend.settings.get("ds18b20", {}).get("probes", 1)
+        return [f"3c01d607{index:06x}" for index in range(count)]
+
+    @classmethod
+    def get_available_sensors(cls):
+        return [cls(sensor_id) for sensor_id in cls._probe_ids()]
+
+    def set_resolution(self, resolution, persist=False):
+        self.resolution = resolution
+        self.backend.w1_resolutions[self.id] = resolution
+
+    def get_resolution(self):
+        return self.resolution
+
+    def get_temperature(self):
+        if self.id in self.backend.w1_converted:
+            # A bulk conversion already produced this probe's value
+            self.backend.w1_converted.discard(self.id)
+        else:
+            time.sleep(_DS18B20_CONVERSION.get(self.resolution, 0.75))
+        if self.rng.random() < self.failure_rate:
+            raise RuntimeError("DS18B20 CRC check failed")
+        self._temperature += self.rng.gauss(0, 0.02)
+        return round(self._temperature, 3)
+
+
+class SimSMBus:
+    """
+    I2C bus with simulated ADS1115 converters.
+    Conversion time follows the configured data rate, the OS bit reads back as 0 while a
+    conversion is in progress, and every transaction costs i2c_latency seconds. Channel
+    inputs are given in millivolts per device address.
+    """
+
+    def __init__(self, backend, bus=1):
+        settings = backend.settings.get("ads1115", {})
+        self.bus = bus
+        self.rng = backend.rng
+        self.i2c_latency = settings.get("i2c_latency", 0.0002)
+        self.failure_rate = settings.get("failure_rate", 0.0)
+        self.noise_mv = settings.get("noise_mv", 0.5)
+        # {"72": {"0": 230.0}} -> {72: {0: 230.0}}; unspecified channels read 0 mV
+        self.channels = {
+            int(addr): {int(channel): float(mv) for channel, mv in inputs.items()}
+            for addr, inputs in settings.get("channels", {"72": {"0": 230.0}}).items()
+        }
+        self.transactions = 0
+        self._devices = {}  # addr -> {"config": int, "ready_at": float, "value": int}
+        self._lock = threading.Lock()
+
+    def _transaction(self, addr):
+        self.transactions += 1
+        time.sleep(self.i2c_latency)
+        if addr not in self.channels:
+            raise OSError(121, "Remote I/O error")
+        if self.rng.random() < self.failure_rate:
+            raise OSError(121, "Remote I/O error")
+        return self._devices.setdefault(addr, {"config": 0x8583, "ready_at": 0.0, "value": 0})
+
+    def _convert(self, addr, config):
+        mux = (config >> 12) & 0x07
+        channel = mux - 4 if mux >= 4 else mux  # Differential inputs read their positive channel
+        millivolts = self.channels[addr].get(channel, 0.0) + self.rng.gauss(0, self.noise_mv)
+        full_scale = _FULL_SCALE[(config >> 9) & 0x07]
+        raw = int(millivolts / 1000.0 / full_scale * 32768)
+        return max(-32768, min(32767, raw))
+
+    def write_i2c_block_data(self, addr, register, data):
+        with self._lock:
+            device = self._transaction(addr)
+            if register == _REG_CONFIG:
+                config = (data[0] << 8) | data[1]
+                device["config"] = config & ~_OS_BIT
+                conversion_time = 1.0 / _DATA_RATES[(config >> 5) & 0x07]
+                if config & _OS_BIT or not config & _MODE_SINGLE:
+                    device["ready_at"] = time.monotonic() + conversion_time
+                    device["value"] = self._convert(addr, config)
+
+    def read_i2c_block_data(self, addr, register, length):
+        with self._lock:
+            device = self._transaction(addr)
+            ready = time.monotonic() >= device["ready_at"]
+            if register == _REG_CONFIG:
+                config = device["config"] | (_OS_BIT if ready else 0)
+                return [(config >> 8) & 0xFF, config & 0xFF][:length]
+            if register == _REG_CONVERT:
+                if not device["config"] & _MODE_SINGLE and ready:
+                    # Continuous mode keeps converting, so each read sees a fresh sample
+                    device["value"] = self._convert(addr, device["config"])
+                value = device["value"] & 0xFFFF
+                return [(value >> 8) & 0xFF, value & 0xFF][:length]
+            return [0] * length
+
+    def close(self):
+        pass
+
+
+class SimBackend:
+    """Simulated hardware with configurable latency models and failure rates."""
+
+    name = "sim"
+
+    def __init__(self, settings=None):
+        self.settings = settings or {}
+        self.rng = random.Random(self.settings.get("seed"))
+        self.GPIO = SimGPIO()
+        self.board = SimBoard()
+        self.NoSensorFoundError = SimNoSensorFoundError
+        # Bind the 1-Wire class to this backend so its classmethods see the settings
+        self.W1ThermSensor = type("W1ThermSensor", (SimW1ThermSensor,), {"backend": self})
+        self.w1_resolutions = {}  # ROM ID -> resolution set on the simulated probe
+        self.w1_converted = set()  # ROM IDs whose value came from the last bulk conversion
+        self._buses = {}
+
+    def w1_bulk_convert(self, timeout):
+        """Convert every simulated probe at once: costs the slowest probe's conversion time."""
+        settings = self.settings.get("ds18b20", {})
+        probes = self.W1ThermSensor._probe_ids()
+        resolution = max(self.w1_resolutions.get(probe, settings.get("resolution", 12)) for probe in probes)
+        time.sleep(_DS18B20_CONVERSION.get(resolution, 0.75))
+        self.w1_converted.update(probes)
+        return True
+
+    def DHT22(self, pin):
+        return SimDHT22(self, pin)
+
+    def SMBus(self, bus=1):
+        # Devices on a bus keep their register state, so share one simulated bus per number
+        if bus not in self._buses:
+            self._buses[bus] = SimSMBus(self, bus)
+        return self._buses[bus]
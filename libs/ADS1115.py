@@ -1,10 +1,7 @@
 #ADS1115.py
-# import smbus
-import smbus2 as smbus
+import threading
 import time
-
-# Get I2C bus
-bus = smbus.SMBus(1)
+from libs.i2c_bus import get_i2c_bus
 
 # I2C address of the device
 ADS1115_IIC_ADDRESS0				= 0x48
@@ -54,33 +51,69 @@ ADS1115_REG_CONFIG_CQUE_2CONV		= 0x01 # Assert ALERT/RDY after two conversions
 ADS1115_REG_CONFIG_CQUE_4CONV		= 0x02 # Assert ALERT/RDY after four conversions
 ADS1115_REG_CONFIG_CQUE_NONE		= 0x03 # Disable the comparator and put ALERT/RDY in high state (default)
 
-mygain=0x02
-coefficient=0.125
-addr_G=ADS1115_IIC_ADDRESS0
+# Samples per second for each data rate setting
+ADS1115_DATA_RATES = {
+	ADS1115_REG_CONFIG_DR_8SPS		: 8,
+	ADS1115_REG_CONFIG_DR_16SPS		: 16,
+	ADS1115_REG_CONFIG_DR_32SPS		: 32,
+	ADS1115_REG_CONFIG_DR_64SPS		: 64,
+	ADS1115_REG_CONFIG_DR_128SPS	: 128,
+	ADS1115_REG_CONFIG_DR_250SPS	: 250,
+	ADS1115_REG_CONFIG_DR_475SPS	: 475,
+	ADS1115_REG_CONFIG_DR_860SPS	: 860,
+}
+ADS1115_OS_READY				= 0x80 # OS bit in the config MSB reads 1 once no conversion is in progress
+ADS1115_CONVERSION_MARGIN		= 0.1 # Internal oscillator tolerance (+/-10%) on the nominal conversion time
+ADS1115_POLL_INTERVAL			= 0.0005 # Seconds between OS bit polls once the nominal time has elapsed
+
+def dataRateFromSPS(sps):
+	"""Map a samples-per-second figure (8..860) to its ADS1115_REG_CONFIG_DR_* value."""
+	for dr, rate in ADS1115_DATA_RATES.items():
+		if rate == sps:
+			return dr
+	raise ValueError(f"Unsupported ADS1115 data rate: {sps} SPS")
+
+# Millivolts per LSB for each gain setting
+ADS1115_COEFFICIENTS = {
+	ADS1115_REG_CONFIG_PGA_6_144V	: 0.1875,
+	ADS1115_REG_CONFIG_PGA_4_096V	: 0.125,
+	ADS1115_REG_CONFIG_PGA_2_048V	: 0.0625,
+	ADS1115_REG_CONFIG_PGA_1_024V	: 0.03125,
+	ADS1115_REG_CONFIG_PGA_0_512V	: 0.015625,
+	ADS1115_REG_CONFIG_PGA_0_256V	: 0.0078125,
+}
+ADS1115_MUX_SINGLE = [ADS1115_REG_CONFIG_MUX_SINGLE_0, ADS1115_REG_CONFIG_MUX_SINGLE_1, ADS1115_REG_CONFIG_MUX_SINGLE_2, ADS1115_REG_CONFIG_MUX_SINGLE_3]
+ADS1115_MUX_DIFF = [ADS1115_REG_CONFIG_MUX_DIFF_0_1, ADS1115_REG_CONFIG_MUX_DIFF_0_3, ADS1115_REG_CONFIG_MUX_DIFF_1_3, ADS1115_REG_CONFIG_MUX_DIFF_2_3]
+
 class ADS1115():
+	"""One ADS1115 converter. Address, gain and data rate are per instance, the I2C bus is
+	shared through libs.i2c_bus, and a per-device lock keeps each conversion sequence whole
+	when the same converter is used from several threads."""
+
+	def __init__(self,addr=ADS1115_IIC_ADDRESS0,gain=ADS1115_REG_CONFIG_PGA_4_096V,data_rate=ADS1115_REG_CONFIG_DR_128SPS,bus=None):
+		self.bus = bus if bus is not None else get_i2c_bus(1)
+		self.addr = addr
+		self.channel = 0
+		self.lock = threading.RLock()
+		self._config = None  # Last config register value written, to skip redundant writes
+		self.setGain(gain)
+		self.setDataRate(data_rate)
+
 	def setGain(self,gain):
-		global mygain
-		global coefficient
-		mygain=gain
-		if mygain == ADS1115_REG_CONFIG_PGA_6_144V:
-			coefficient = 0.1875
-		elif mygain == ADS1115_REG_CONFIG_PGA_4_096V:
-			coefficient = 0.125
-		elif mygain == ADS1115_REG_CONFIG_PGA_2_048V:
-			coefficient = 0.0625
-		elif mygain == ADS1115_REG_CONFIG_PGA_1_024V:
-			coefficient = 0.03125
-		elif mygain == ADS1115_REG_CONFIG_PGA_0_512V:
-			coefficient = 0.015625
-		elif  mygain == ADS1115_REG_CONFIG_PGA_0_256V:
-			coefficient = 0.0078125
-		else:
-			coefficient = 0.125
+		self.gain = gain
+		self.coefficient = ADS1115_COEFFICIENTS.get(gain, 0.125)
+	def setDataRate(self,dr):
+		"""Select the conversion rate, one of the ADS1115_REG_CONFIG_DR_* values"""
+		if dr not in ADS1115_DATA_RATES:
+			raise ValueError(f"Unsupported ADS1115 data rate setting: {dr:#04x}")
+		self.dataRate = dr
+	def conversionTime(self,dr=None):
+		"""Nominal seconds per conversion at the given (default: current) data rate"""
+		return 1.0 / ADS1115_DATA_RATES[self.dataRate if dr is None else dr]
 	def setAddr_ADS1115(self,addr):
-		global addr_G
-		addr_G=addr
+		self.addr = addr
+		self._config = None
 	def setChannel(self,channel):
-		global mygain
 		"""Select the Channel user want to use from 0-3
 		For Single-ended Output
 		0 : AINP = AIN0 and AINN = GND
@@ -97,56 +130,92 @@ class ADS1115():
 			self.channel = 0
 
 		return self.channel
-	
+
+	def writeConfig(self,msb,lsb,force=False):
+		"""Write the config register unless it already holds this value.
+		Writes with OS set always go out, since they are what starts a single-shot conversion."""
+		config = (msb << 8) | lsb
+		if force or msb & ADS1115_REG_CONFIG_OS_SINGLE or config != self._config:
+			self.bus.write_i2c_block_data(self.addr, ADS1115_REG_POINTER_CONFIG, [msb, lsb])
+			self._config = config
+
 	def setSingle(self):
-		global addr_G
-		if self.channel == 0:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_0 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-		elif self.channel == 1:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_1 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-		elif self.channel == 2:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_2 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-		elif self.channel == 3:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_SINGLE_3 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-
-		bus.write_i2c_block_data(addr_G, ADS1115_REG_POINTER_CONFIG, CONFIG_REG)
+		"""Start one single-shot, single-ended conversion on the selected channel"""
+		self.startConversion(ADS1115_MUX_SINGLE[self.channel])
 
 	def setDifferential(self):
-		global addr_G
-		if self.channel == 0:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_0_1 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-		elif self.channel == 1:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_0_3 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-		elif self.channel == 2:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_1_3 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-		elif self.channel == 3:
-			CONFIG_REG = [ADS1115_REG_CONFIG_OS_SINGLE | ADS1115_REG_CONFIG_MUX_DIFF_2_3 | mygain | ADS1115_REG_CONFIG_MODE_CONTIN, ADS1115_REG_CONFIG_DR_128SPS | ADS1115_REG_CONFIG_CQUE_NONE]
-
-		bus.write_i2c_block_data(addr_G, ADS1115_REG_POINTER_CONFIG, CONFIG_REG)
+		"""Start one single-shot, differential conversion on the selected channel pair"""
+		self.startConversion(ADS1115_MUX_DIFF[self.channel])
+
+	def startConversion(self,mux,dr=None):
+		"""Write the config register with OS set in power-down single-shot mode"""
+		dr = self.dataRate if dr is None else dr
+		self.writeConfig(ADS1115_REG_CONFIG_OS_SINGLE | mux | self.gain | ADS1115_REG_CONFIG_MODE_SINGLE, dr | ADS1115_REG_CONFIG_CQUE_NONE)
+
+	def conversionReady(self):
+		"""True once the OS bit reports that no conversion is in progress"""
+		config = self.bus.read_i2c_block_data(self.addr, ADS1115_REG_POINTER_CONFIG, 2)
+		return bool(config[0] & ADS1115_OS_READY)
+
+	def waitConversion(self,dr=None):
+		"""Sleep for the nominal conversion time, then poll the OS bit until the result is ready"""
+		conversion = self.conversionTime(dr)
+		time.sleep(conversion)
+		self.pollReady(time.monotonic() + conversion * (1 + 2 * ADS1115_CONVERSION_MARGIN) + 0.01)
+
+	def pollReady(self,deadline):
+		"""Poll the OS bit until the conversion completes or the monotonic deadline passes"""
+		while not self.conversionReady():
+			if time.monotonic() > deadline:
+				raise RuntimeError("ADS1115 conversion did not complete")
+			time.sleep(ADS1115_POLL_INTERVAL)
+
+	def readRaw(self):
+		"""Read the signed 16-bit conversion result"""
+		data = self.bus.read_i2c_block_data(self.addr, ADS1115_REG_POINTER_CONVERT, 2)
+		raw_adc = data[0] * 256 + data[1]
+		if raw_adc > 32767:
+			raw_adc -= 65536
+		return raw_adc
 
 	def readValue(self):
 		"""Read data back from ADS1115_REG_POINTER_CONVERT(0x00), 2 bytes
 		raw_adc MSB, raw_adc LSB"""
-		global coefficient
-		global addr_G
-		data = bus.read_i2c_block_data(addr_G, ADS1115_REG_POINTER_CONVERT, 2)
-		
-		# Convert the data
-		raw_adc = data[0] * 256 + data[1]
-
-		if raw_adc > 32767:
-			raw_adc -= 65535
-		raw_adc = int(float(raw_adc)*coefficient)
+		raw_adc = int(float(self.readRaw())*self.coefficient)
 		return {'r' : raw_adc}
 
+	def readBurst(self,channel,out,dr=None):
+		"""Fill `out` (a preallocated array('d')) with single-ended readings in millivolts.
+		The converter runs in continuous mode for the burst, one sample per conversion period,
+		and is put back into power-down single-shot mode afterwards."""
+		dr = self.dataRate if dr is None else dr
+		with self.lock:
+			self.setChannel(channel)
+			mux = ADS1115_MUX_SINGLE[self.channel]
+			self.writeConfig(mux | self.gain | ADS1115_REG_CONFIG_MODE_CONTIN, dr | ADS1115_REG_CONFIG_CQUE_NONE)
+			period = self.conversionTime(dr) * (1 + ADS1115_CONVERSION_MARGIN)
+			start = time.monotonic()
+			try:
+				for i in range(len(out)):
+					# Wait until the (i+1)-th conversion has completed
+					delay = start + (i + 1) * period - time.monotonic()
+					if delay > 0:
+						time.sleep(delay)
+					out[i] = self.readRaw() * self.coefficient
+			finally:
+				self.writeConfig(mux | self.gain | ADS1115_REG_CONFIG_MODE_SINGLE, dr | ADS1115_REG_CONFIG_CQUE_NONE)
+		return out
+
 	def readVoltage(self,channel):
-		self.setChannel(channel)
-		self.setSingle()
-		time.sleep(0.1)
-		return self.readValue()
+		with self.lock:
+			self.setChannel(channel)
+			self.setSingle()
+			self.waitConversion()
+			return self.readValue()
 
 	def ComparatorVoltage(self,channel):
-		self.setChannel(channel)
-		self.setDifferential()
-		time.sleep(0.1)
-		return self.readValue()
+		with self.lock:
+			self.setChannel(channel)
+			self.setDifferential()
+			self.waitConversion()
+			return self.readValue()
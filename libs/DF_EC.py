@@ -1,96 +1,194 @@
+import json
+import logging
 import os
-import sys
 import time
 
-_kvalue = 1.0
-_kvalueLow = 1.0
-_kvalueHigh = 1.0
-_voltage = 0.0
-_temperature = 25.0
+# NumPy is optional; readECBatch falls back to a plain loop without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KVALUE = 1.0
+# Number of past calibrations kept in the calibration file
+CALIBRATION_HISTORY = 20
+
+
+class ECCalibrationStore:
+    """
+    Calibration constants of one EC probe, kept in memory and persisted as JSON.
+    The file is loaded once; every change is written to a temporary file, fsynced and renamed
+    over the old one, so a power loss leaves either the old or the new calibration on disk.
+    Each change bumps the version and the previous constants are kept in a bounded history.
+    """
+
+    def __init__(self, path, history_limit=CALIBRATION_HISTORY, legacy_path=None):
+        self.path = path
+        self.history_limit = history_limit
+        self.legacy_path = legacy_path  # Old "kvalueLow=..." text file, imported if no JSON file exists yet
+        self.kvalueLow = DEFAULT_KVALUE
+        self.kvalueHigh = DEFAULT_KVALUE
+        self.version = 0
+        self.updated = None
+        self.reason = None  # What produced the current constants (buffer solution, reset, restore)
+        self.history = []  # Previous calibrations, oldest first
+
+    def load(self):
+        """Load the calibration from disk; returns False (keeping the defaults) if the file is unusable."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                self.kvalueLow = float(data["kvalueLow"])
+                self.kvalueHigh = float(data["kvalueHigh"])
+                self.version = int(data.get("version", 0))
+                self.updated = data.get("updated")
+                self.reason = data.get("reason")
+                self.history = data.get("history", [])
+            elif self.legacy_path and os.path.exists(self.legacy_path):
+                values = self._read_legacy(self.legacy_path)
+                self.update(values["kvalueLow"], values["kvalueHigh"], reason="import " + self.legacy_path)
+            else:
+                logger.info("%s not found. Creating file with default values.", self.path)
+                self.save()
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error("%s ERROR ! %s. Using default K values; please recalibrate or reset.", self.path, e)
+            self.kvalueLow = self.kvalueHigh = DEFAULT_KVALUE
+            return False
+
+    @staticmethod
+    def _read_legacy(path):
+        values = {}
+        with open(path, 'r') as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                if sep:
+                    values[key] = float(value)
+        return {"kvalueLow": values["kvalueLow"], "kvalueHigh": values["kvalueHigh"]}
+
+    def as_dict(self):
+        return {
+            "version": self.version,
+            "updated": self.updated,
+            "reason": self.reason,
+            "kvalueLow": self.kvalueLow,
+            "kvalueHigh": self.kvalueHigh,
+        }
+
+    def update(self, kvalueLow=None, kvalueHigh=None, reason=None):
+        """Replace one or both constants, archive the previous ones and persist the result."""
+        if self.version:
+            self.history.append(self.as_dict())
+            del self.history[:-self.history_limit]
+        if kvalueLow is not None:
+            self.kvalueLow = float(kvalueLow)
+        if kvalueHigh is not None:
+            self.kvalueHigh = float(kvalueHigh)
+        self.version += 1
+        self.updated = time.time()
+        self.reason = reason
+        self.save()
+        return self.as_dict()
+
+    def restore(self, version):
+        """Make a calibration from the history current again (as a new version)."""
+        for entry in self.history:
+            if entry["version"] == version:
+                return self.update(entry["kvalueLow"], entry["kvalueHigh"], reason=f"restore {version}")
+        raise ValueError(f"Calibration version {version} not found")
+
+    def save(self):
+        """Write the calibration atomically: temp file, fsync, rename, fsync the directory."""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({**self.as_dict(), "history": self.history}, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
 
 class DFRobot_EC():
-    def __init__(self):
-        # Define the path to store ecdata.txt in the data directory
-        self.ecdata_file = os.path.join('data', 'ecdata.txt')
-        
-        # Ensure the data directory exists
-        os.makedirs('data', exist_ok=True)
+    def __init__(self, probe_id=None, data_dir='data'):
+        # One calibration file per probe so several EC sensors keep their own constants
+        name = 'ecdata.json' if probe_id is None else f'ecdata_{probe_id}.json'
+        self.store = ECCalibrationStore(
+            os.path.join(data_dir, name),
+            legacy_path=os.path.join(data_dir, 'ecdata.txt') if probe_id is None else None,
+        )
+        self._kvalue = DEFAULT_KVALUE  # K value currently in use; switches between low and high with hysteresis
 
     def begin(self):
-        global _kvalueLow
-        global _kvalueHigh
-
-        # Check if the file exists, if not create it with default values
-        if not os.path.exists(self.ecdata_file):
-            print(f"{self.ecdata_file} not found. Creating file with default values.")
-            with open(self.ecdata_file, 'w') as f:
-                f.write("kvalueLow=1.0\n")
-                f.write("kvalueHigh=1.0\n")
-        try:
-            with open(self.ecdata_file, 'r') as f:
-                kvalueLowLine = f.readline().strip('kvalueLow=')
-                _kvalueLow = float(kvalueLowLine)
-                kvalueHighLine = f.readline().strip('kvalueHigh=')
-                _kvalueHigh = float(kvalueHighLine)
-        except Exception as e:
-            print(f"{self.ecdata_file} ERROR ! {e}. Please run DFRobot_EC_Reset")
-            sys.exit(1)
+        """Load the calibration once; a damaged file leaves the default constants in place."""
+        return self.store.load()
+
+    def _selectK(self, rawEC):
+        valueTemp = rawEC * self._kvalue
+        if valueTemp > 2.5:
+            self._kvalue = self.store.kvalueHigh
+        elif valueTemp < 2.0:
+            self._kvalue = self.store.kvalueLow
+        return self._kvalue
 
     def readEC(self, voltage, temperature):
         """Read and calculate EC value."""
-        global _kvalueLow
-        global _kvalueHigh
-        global _kvalue
         rawEC = 1000 * voltage / 820.0 / 200.0
-        valueTemp = rawEC * _kvalue
-        if valueTemp > 2.5:
-            _kvalue = _kvalueHigh
-        elif valueTemp < 2.0:
-            _kvalue = _kvalueLow
-        value = rawEC * _kvalue
+        value = rawEC * self._selectK(rawEC)
         value = value / (1.0 + 0.0185 * (temperature - 25.0))
         return value
 
+    def readECBatch(self, voltages, temperature, out):
+        """
+        Convert a buffer of voltages to EC values in one pass, writing into `out`.
+        The low/high K value is chosen once for the batch from its mean voltage,
+        the same way readEC chooses it for a single reading.
+        """
+        scale = 1000 / 820.0 / 200.0
+        rawMean = scale * sum(voltages) / len(voltages)
+        factor = scale * self._selectK(rawMean) / (1.0 + 0.0185 * (temperature - 25.0))
+        if np is not None:
+            np.multiply(np.frombuffer(voltages, dtype=np.float64), factor, out=np.frombuffer(out, dtype=np.float64))
+        else:
+            for i in range(len(voltages)):
+                out[i] = voltages[i] * factor
+        return out
+
     def calibration(self, voltage, temperature):
+        """
+        Calibrate against a 1.413 us/cm or 12.88 ms/cm buffer solution, picked from the raw reading.
+        Returns the new calibration, or None if the reading matches neither buffer.
+        """
         rawEC = 1000 * voltage / 820.0 / 200.0
         if 0.9 < rawEC < 1.9:
             compECsolution = 1.413 * (1.0 + 0.0185 * (temperature - 25.0))
             KValueTemp = 820.0 * 200.0 * compECsolution / 1000.0 / voltage
-            print(f">>> Buffer Solution: 1.413 us/cm")
-            with open(self.ecdata_file, 'r+') as f:
-                flist = f.readlines()
-                flist[0] = 'kvalueLow=' + str(KValueTemp) + '\n'
-                f.seek(0)
-                f.writelines(flist)
-            print(">>> EC: 1.413 us/cm Calibration completed.")
+            logger.info(">>> Buffer Solution: 1.413 us/cm")
+            calibration = self.store.update(kvalueLow=KValueTemp, reason="buffer 1.413")
+            logger.info(">>> EC: 1.413 us/cm Calibration completed.")
+            return calibration
         elif 9 < rawEC < 16.8:
             compECsolution = 12.88 * (1.0 + 0.0185 * (temperature - 25.0))
             KValueTemp = 820.0 * 200.0 * compECsolution / 1000.0 / voltage
-            print(f">>> Buffer Solution: 12.88 ms/cm")
-            with open(self.ecdata_file, 'r+') as f:
-                flist = f.readlines()
-                flist[1] = 'kvalueHigh=' + str(KValueTemp) + '\n'
-                f.seek(0)
-                f.writelines(flist)
-            print(">>> EC: 12.88 ms/cm Calibration completed.")
+            logger.info(">>> Buffer Solution: 12.88 ms/cm")
+            calibration = self.store.update(kvalueHigh=KValueTemp, reason="buffer 12.88")
+            logger.info(">>> EC: 12.88 ms/cm Calibration completed.")
+            return calibration
         else:
-            print(">>> Buffer Solution Error. Try again.")
+            logger.warning(">>> Buffer Solution Error. Try again.")
+            return None
 
     def reset(self):
         """Reset EC values to default."""
-        global _kvalueLow, _kvalueHigh
-        _kvalueLow = 1.0
-        _kvalueHigh = 1.0
-        try:
-            with open(self.ecdata_file, 'r+') as f:
-                flist = f.readlines()
-                flist[0] = 'kvalueLow=' + str(_kvalueLow) + '\n'
-                flist[1] = 'kvalueHigh=' + str(_kvalueHigh) + '\n'
-                f.seek(0)
-                f.writelines(flist)
-            print(">>> Reset to default parameters <<<")
-        except:
-            with open(self.ecdata_file, 'w') as f:
-                f.write('kvalueLow=1.0\n')
-                f.write('kvalueHigh=1.0\n')
-            print(">>> Reset to default parameters <<<")
+        calibration = self.store.update(DEFAULT_KVALUE, DEFAULT_KVALUE, reason="reset")
+        self._kvalue = DEFAULT_KVALUE
+        logger.info(">>> Reset to default parameters <<<")
+        return calibration
@@ -0,0 +1,50 @@
+#i2c_bus.py
+import threading
+from hal.backend import get_backend
+from telemetry.metrics import get_registry
+
+# Shared bus managers, one per I2C bus number
+_buses = {}
+_buses_lock = threading.Lock()
+
+class I2CBus():
+	"""One persistent SMBus handle per bus, serialised with a lock so several
+	device drivers can share it from different threads."""
+
+	def __init__(self,number=1):
+		self.number = number
+		self.smbus = get_backend().SMBus(number)
+		self.lock = threading.RLock()
+		self.transactions = 0
+		metrics = get_registry()
+		metrics.counter_func("i2c_transactions_total", lambda: self.transactions, "I2C transactions", bus=number)
+		self.errors = metrics.counter("i2c_errors_total", "I2C transactions that raised an I/O error", bus=number)
+
+	def write_i2c_block_data(self,addr,register,data):
+		with self.lock:
+			self.transactions += 1
+			try:
+				self.smbus.write_i2c_block_data(addr, register, data)
+			except OSError:
+				self.errors.inc()
+				raise
+
+	def read_i2c_block_data(self,addr,register,length):
+		with self.lock:
+			self.transactions += 1
+			try:
+				return self.smbus.read_i2c_block_data(addr, register, length)
+			except OSError:
+				self.errors.inc()
+				raise
+
+	def close(self):
+		with self.lock:
+			self.smbus.close()
+
+def get_i2c_bus(number=1):
+	"""Return the shared manager for an I2C bus, opening the bus on first use."""
+	with _buses_lock:
+		if number not in _buses:
+			_buses[number] = I2CBus(number)
+		return _buses[number]
@@ -0,0 +1,215 @@
+# relays/pulse.py
+import asyncio
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Pulse:
+    """One timed ON period requested for a relay channel."""
+
+    def __init__(self, pulse_id, channel, duration, request_id=None):
+        self.pulse_id = pulse_id
+        self.channel = channel
+        self.duration = duration  # Seconds
+        self.request_id = request_id  # Echoed in the completion event
+        self.cancelled = asyncio.Event()
+
+    def event(self, status, actual=None):
+        return {
+            "event": "pulse",
+            "status": status,
+            "actuator": self.channel,
+            "pulse_id": self.pulse_id,
+            "request_id": self.request_id,
+            "duration_ms": round(self.duration * 1000),
+            "actual_ms": None if actual is None else round(actual * 1000, 1),
+        }
+
+
+class PulseScheduler:
+    """
+    Runs timed relay pulses on the device, so a dose does not depend on the backend
+    sending a deactivate in time.
+    Each channel has its own queue and worker task: pulses for the same pump run back to
+    back, different pumps run concurrently. Timing uses the event loop's monotonic clock.
+    A channel with a max on-time also gets a watchdog thread that switches it off at that
+    limit even if the event loop is stalled; the same watchdog guards plain activations.
+    Completion, cancellation and safety events are passed to every coroutine in `listeners`;
+    a watchdog that forces a channel off reports a "watchdog" event once the loop runs again
+    and cancels the pulse it cut short.
+    """
+
+    def __init__(self, bank, max_on_times=None, default_max_on_time=None, queue_size=8):
+        self.bank = bank
+        self.max_on_times = max_on_times or {}  # channel -> seconds
+        self.default_max_on_time = default_max_on_time  # Limit for channels not listed (None = no limit)
+        self.queue_size = queue_size
+        self.listeners = []  # async callables(event dict)
+        self._queues = {}  # channel -> asyncio.Queue of Pulse
+        self._workers = {}  # channel -> worker task
+        self._active = {}  # channel -> Pulse being executed
+        self._pulses = {}  # pulse_id -> Pulse, queued or running
+        self._watchdogs = {}  # channel -> threading.Timer
+        self._loop = None  # Event loop the watchdogs report back to, captured when one is armed
+        self._tasks = set()  # Event deliveries started from watchdog threads
+        self._ids = itertools.count(1)
+
+    def max_on_time(self, name):
+        """Max on-time in seconds of a channel or alias (None = no limit)."""
+        channel = self.bank.canonical(name)
+        return self.max_on_times.get(channel, self.default_max_on_time)
+
+    def check(self, name, duration_ms):
+        """
+        Validate a pulse without queueing it and return the channel name.
+        Raises ValueError for unknown channels, durations beyond the channel's max on-time
+        and full queues, exactly as pulse() would.
+        """
+        channel = self.bank.canonical(name)
+        limit = self.max_on_time(channel)
+        if float(duration_ms) <= 0:
+            raise ValueError(f"Pulse duration must be positive, got {duration_ms} ms")
+        if limit is not None and float(duration_ms) / 1000.0 > limit:
+            raise ValueError(f"Pulse of {duration_ms} ms exceeds the {limit} s limit for {channel}")
+        queue = self._queues.get(channel)
+        if queue is not None and queue.full():
+            raise ValueError(f"Pulse queue for {channel} is full ({self.queue_size} pending)")
+        return channel
+
+    def pulse(self, name, duration_ms, request_id=None):
+        """Queue a pulse of duration_ms on a channel and return its pulse id (ValueError: see check)."""
+        channel = self.check(name, duration_ms)
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = asyncio.Queue(self.queue_size)
+        pulse = Pulse(next(self._ids), channel, float(duration_ms) / 1000.0, request_id)
+        queue.put_nowait(pulse)
+        self._pulses[pulse.pulse_id] = pulse
+        if channel not in self._workers or self._workers[channel].done():
+            self._workers[channel] = asyncio.create_task(self._run(channel, queue))
+        return pulse.pulse_id
+
+    def cancel(self, name, pulse_id=None):
+        """
+        Cancel one pulse (running or queued) or, without pulse_id, every pulse of the channel.
+        Returns the number of pulses cancelled.
+        """
+        channel = self.bank.canonical(name)
+        cancelled = 0
+        for pulse in list(self._pulses.values()):
+            if pulse.channel != channel or pulse.cancelled.is_set():
+                continue
+            if pulse_id is None or pulse.pulse_id == pulse_id:
+                pulse.cancelled.set()
+                cancelled += 1
+        return cancelled
+
+    def pending(self):
+        """{channel: number of queued pulses (including the running one)}."""
+        return {channel: queue.qsize() + (channel in self._active)
+                for channel, queue in self._queues.items() if queue.qsize() or channel in self._active}
+
+    async def _run(self, channel, queue):
+        while not queue.empty():
+            pulse = queue.get_nowait()
+            if pulse.cancelled.is_set():
+                self._pulses.pop(pulse.pulse_id, None)
+                await self._emit(pulse.event("cancelled", 0.0))
+                continue
+            self._active[channel] = pulse
+            try:
+                await self._execute(pulse)
+            finally:
+                self._active.pop(channel, None)
+                self._pulses.pop(pulse.pulse_id, None)
+
+    async def _execute(self, pulse):
+        loop = asyncio.get_running_loop()
+        self.bank.apply({pulse.channel: True})
+        started = loop.time()
+        self.arm_watchdog(pulse.channel, pulse.duration)
+        try:
+            await asyncio.wait_for(pulse.cancelled.wait(), pulse.duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.bank.apply({pulse.channel: False})
+            actual = loop.time() - started
+            self.disarm_watchdog(pulse.channel)
+        status = "cancelled" if pulse.cancelled.is_set() else "completed"
+        logger.info("Pulse %s on %s %s after %.1f ms", pulse.pulse_id, pulse.channel, status, actual * 1000)
+        await self._emit(pulse.event(status, actual))
+
+    def arm_watchdog(self, name, duration=None):
+        """
+        Switch the channel off from a separate thread after its max on-time (or `duration`
+        plus a small margin for pulses), independently of the event loop.
+        Without `duration` a watchdog that is already running keeps its deadline, so
+        repeating an activate cannot extend the on-time past the limit.
+        """
+        channel = self.bank.canonical(name)
+        limit = self.max_on_time(channel)
+        if duration is not None:
+            limit = duration + 0.1 if limit is None else min(limit, duration + 0.1)
+        elif channel in self._watchdogs and self._watchdogs[channel].is_alive():
+            return
+        if limit is None:
+            return
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass  # Armed outside the loop: the channel is still switched off, only the event is lost
+        self.disarm_watchdog(channel)
+        timer = threading.Timer(limit, self._watchdog_expired, args=(channel, limit))
+        timer.daemon = True
+        self._watchdogs[channel] = timer
+        timer.start()
+
+    def disarm_watchdog(self, name):
+        timer = self._watchdogs.pop(self.bank.canonical(name), None)
+        if timer is not None:
+            timer.cancel()
+
+    def _watchdog_expired(self, channel, limit):
+        if self._watchdogs.get(channel) is threading.current_thread():
+            del self._watchdogs[channel]
+        if self.bank.apply({channel: False}):
+            logger.error("%s exceeded its %.3f s on-time limit and was switched off", channel, limit)
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                try:
+                    loop.call_soon_threadsafe(self._watchdog_fired, channel, limit)
+                except RuntimeError:
+                    pass  # Loop closed in the meantime
+
+    def _watchdog_fired(self, channel, limit):
+        """Loop side of a watchdog shutoff: end the pulse it cut short and report the event."""
+        pulse = self._active.get(channel)
+        if pulse is not None:
+            pulse.cancelled.set()
+            event = pulse.event("watchdog", limit)
+        else:
+            event = {"event": "pulse", "status": "watchdog", "actuator": channel, "pulse_id": None,
+                     "request_id": None, "duration_ms": None, "actual_ms": round(limit * 1000, 1)}
+        task = asyncio.ensure_future(self._emit(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _emit(self, event):
+        for listener in self.listeners:
+            try:
+                await listener(event)
+            except Exception as e:
+                logger.warning("Pulse event listener failed: %s", e)
+
+    def shutdown(self):
+        """Cancel all pulses and watchdogs and switch the pulsing channels off."""
+        for pulse in list(self._pulses.values()):
+            pulse.cancelled.set()
+        for channel in list(self._active):
+            self.bank.apply({channel: False})
+        for channel in list(self._watchdogs):
+            self.disarm_watchdog(channel)
@@ -0,0 +1,167 @@
+# relays/relay_bank.py
+import logging
+import threading
+from actuators.actuators_interface import ActuatorInterface
+from hal.backend import get_backend
+from telemetry.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+# Channels of the relay board (see tests/relay-pi4.py): main, power and chemist groups
+DEFAULT_CHANNELS = {
+    'PH': 17, 'EC': 27, 'TP': 22, 'WF': 5, 'LL': 6, 'CUR': 13, 'DCFAN': 19, 'SV': 26, 'HDTY': 15,
+    'MP': 20, 'DP': 21, 'HDRF': 12, 'LIGHT': 16, 'FAN': 7, 'AIR': 14,
+    'ECA': 18, 'ECB': 23, 'PHUP': 24, 'PHDN': 25,
+}
+
+ON_VALUES = ("ON", "on", True, 1)
+OFF_VALUES = ("OFF", "off", False, 0)
+
+
+class RelayChannel(ActuatorInterface):
+    """One channel of a RelayBank, with the activate/deactivate/get_status API of RelayControl."""
+
+    def __init__(self, bank, name):
+        self.bank = bank
+        self.name = name
+        self.pin = bank.pins[bank.bits[name]]
+
+    def activate(self):
+        self.bank.apply({self.name: True})
+
+    def deactivate(self):
+        self.bank.apply({self.name: False})
+
+    def get_status(self):
+        return self.bank.status(self.name)
+
+
+class RelayBank:
+    """
+    All relay channels of the board, with their state kept as one bitmask (bit i = channel i).
+    A change to several channels is written with a single batched GPIO call that only
+    touches the pins whose level actually changes. The {name: "ON"/"OFF"} snapshot is
+    rebuilt once per change, so reading it is free.
+    Every change, whoever makes it (commands, pulses, watchdog threads), is reported to the
+    callables in `listeners` with the list of changed names, on the thread that made it.
+    """
+
+    def __init__(self, channels=None, aliases=None):
+        channels = DEFAULT_CHANNELS if channels is None else channels
+        self.names = list(channels)
+        self.pins = [channels[name] for name in self.names]
+        self.bits = {name: bit for bit, name in enumerate(self.names)}
+        # Alternative names, e.g. {"EC_Pump": "ECA"}
+        self.aliases = aliases or {}
+        for alias, name in self.aliases.items():
+            if name not in self.bits:
+                raise ValueError(f"Relay alias {alias} refers to unknown channel {name}")
+            self.bits[alias] = self.bits[name]
+        self.state = 0  # Bitmask of channels that are ON
+        self.writes = 0  # Batched GPIO writes issued
+        self._lock = threading.Lock()
+        self._snapshot = {}
+        self.listeners = []  # Callables(changed names)
+        metrics = get_registry()
+        self._toggles = [metrics.counter("relay_toggles_total", "Relay state changes", pin=pin) for pin in self.pins]
+
+        self.gpio = get_backend().GPIO  # RPi.GPIO or its simulated stand-in
+        # Configure every channel in one call and start with all relays OFF
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.pins, self.gpio.OUT, initial=self.gpio.LOW)
+        self._rebuild_snapshot()
+
+    @classmethod
+    def from_config(cls, relay_config=None, reserved_pins=()):
+        """
+        Build the bank from the "relays" section of config.json. Channels on reserved pins
+        (for example sensor power rails switched by the PowerScheduler) are left out so the
+        same pin is never driven from two places.
+        """
+        relay_config = relay_config or {}
+        channels = dict(relay_config.get("channels", DEFAULT_CHANNELS))
+        for name, pin in list(channels.items()):
+            if pin in reserved_pins:
+                logger.info("Relay channel %s on pin %s is reserved for sensor power, leaving it out", name, pin)
+                del channels[name]
+        aliases = {alias: name for alias, name in relay_config.get("aliases", {}).items() if name in channels}
+        return cls(channels, aliases)
+
+    def mask(self, names):
+        """Bitmask of the given channel names (raises ValueError for unknown names)."""
+        mask = 0
+        for name in names:
+            bit = self.bits.get(name)
+            if bit is None:
+                raise ValueError(f"Unrecognized actuator: {name}")
+            mask |= 1 << bit
+        return mask
+
+    def canonical(self, name):
+        """Channel name for a channel or alias (raises ValueError for unknown names)."""
+        bit = self.bits.get(name)
+        if bit is None:
+            raise ValueError(f"Unrecognized actuator: {name}")
+        return self.names[bit]
+
+    def apply(self, changes):
+        """
+        Switch several channels at once. `changes` maps names to "ON"/"OFF" (or booleans).
+        Every name is validated before anything is written. Returns the names that changed.
+        """
+        on_mask = off_mask = 0
+        for name, value in changes.items():
+            if value in ON_VALUES:
+                on_mask |= self.mask((name,))
+            elif value in OFF_VALUES:
+                off_mask |= self.mask((name,))
+            else:
+                raise ValueError(f"Invalid state for {name}: {value!r} (expected ON or OFF)")
+
+        with self._lock:
+            new_state = (self.state | on_mask) & ~off_mask
+            changed = self.state ^ new_state
+            if not changed:
+                return []
+            pins, levels = [], []
+            for bit, pin in enumerate(self.pins):
+                if changed >> bit & 1:
+                    pins.append(pin)
+                    levels.append(self.gpio.HIGH if new_state >> bit & 1 else self.gpio.LOW)
+                    self._toggles[bit].inc()
+            self.gpio.output(pins, levels)  # One batched write for all changed pins
+            self.writes += 1
+            self.state = new_state
+            self._rebuild_snapshot()
+        logger.debug("Relays switched: %s", pins)
+        names = [name for bit, name in enumerate(self.names) if changed >> bit & 1]
+        for listener in self.listeners:
+            listener(names)
+        return names
+
+    def _rebuild_snapshot(self):
+        snapshot = {name: "ON" if self.state >> bit & 1 else "OFF" for name, bit in self.bits.items()}
+        self._snapshot = snapshot  # Replaced, never mutated, so handed-out snapshots stay valid
+
+    def snapshot(self):
+        """{name: "ON"/"OFF"} for every channel (and alias). Do not modify the returned dict."""
+        return self._snapshot
+
+    def status(self, name):
+        return "ON" if self.state >> self.bits[name] & 1 else "OFF"
+
+    def channel(self, name):
+        return RelayChannel(self, name)
+
+    def channels(self):
+        """RelayChannel per channel name and alias."""
+        return {name: RelayChannel(self, name) for name in self.bits}
+
+    def all_off(self):
+        self.apply({name: False for name in self.names})
+
+    def cleanup(self):
+        """Switch everything off and release the pins."""
+        self.all_off()
+        for pin in self.pins:
+            self.gpio.cleanup(pin)
@@ -1,32 +1,9 @@
 # relays/relay_control.py
-import platform
+import logging
+from hal.backend import get_backend
+from telemetry.metrics import get_registry
 
-# Conditional import: Use RPi.GPIO only if running on Raspberry Pi
-if platform.system() == 'Linux':  # Likely to be a Raspberry Pi
-    import RPi.GPIO as GPIO
-else:
-    # Mock GPIO class for non-Raspberry Pi systems (like macOS or Windows)
-    class GPIO:
-        BCM = "BCM"
-        OUT = "OUT"
-        LOW = "LOW"
-        HIGH = "HIGH"
-
-        @staticmethod
-        def setmode(mode):
-            print(f"Set mode to: {mode}")
-
-        @staticmethod
-        def setup(pin, mode):
-            print(f"Setup pin {pin} with mode {mode}")
-
-        @staticmethod
-        def output(pin, state):
-            print(f"Set pin {pin} to state {state}")
-
-        @staticmethod
-        def cleanup(pin=None):
-            print(f"Cleanup pin {pin}")
+logger = logging.getLogger(__name__)
 
 
 class RelayControl:
@@ -34,23 +11,29 @@ class RelayControl:
         """Initialize the relay with the specified GPIO pin."""
         self.pin = pin
         self.status = "OFF"  # Initial status of the relay is OFF
+        self.gpio = get_backend().GPIO  # RPi.GPIO or its simulated stand-in
+        self.toggles = get_registry().counter("relay_toggles_total", "Relay state changes", pin=pin)
         
         # Set up GPIO mode and configure the relay pin as an output
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.pin, GPIO.OUT)
-        GPIO.output(self.pin, GPIO.LOW)  # Ensure the relay starts in the OFF state
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.pin, self.gpio.OUT)
+        self.gpio.output(self.pin, self.gpio.LOW)  # Ensure the relay starts in the OFF state
 
     def activate(self):
         """Turn on the relay (activate the device)."""
-        GPIO.output(self.pin, GPIO.HIGH)
+        self.gpio.output(self.pin, self.gpio.HIGH)
+        if self.status != "ON":
+            self.toggles.inc()
         self.status = "ON"
-        print(f"Relay on pin {self.pin} activated (ON)")
+        logger.debug("Relay on pin %s activated (ON)", self.pin)
 
     def deactivate(self):
         """Turn off the relay (deactivate the device)."""
-        GPIO.output(self.pin, GPIO.LOW)
+        self.gpio.output(self.pin, self.gpio.LOW)
+        if self.status != "OFF":
+            self.toggles.inc()
         self.status = "OFF"
-        print(f"Relay on pin {self.pin} deactivated (OFF)")
+        logger.debug("Relay on pin %s deactivated (OFF)", self.pin)
 
     def get_status(self):
         """Get the current status of the relay (ON or OFF)."""
@@ -58,5 +41,5 @@ class RelayControl:
 
     def cleanup(self):
         """Clean up GPIO settings."""
-        GPIO.cleanup(self.pin)
-        print(f"Cleaned up GPIO pin {self.pin}")
+        self.gpio.cleanup(self.pin)
+        logger.debug("Cleaned up GPIO pin %s", self.pin)
@@ -1,49 +1,34 @@
-import platform
+import logging
 import time
+from hal.backend import get_backend
 from sensors.sensors_interface import SensorInterface
-from relays.relay_control import RelayControl
+from sensors.power import PowerScheduler
+from telemetry.metrics import get_registry
 
-# Conditional import for Adafruit board library (only for Raspberry Pi)
-if platform.system() == 'Linux':  # Raspberry Pi
-    import board
-    import adafruit_dht
-else:
-    # Mock the board library for non-Linux platforms (macOS/Windows)
-    class board:
-        D11 = "D11"
-        # Add any other board pin constants you might use
-    class adafruit_dht:
-        class DHT22:
-            def __init__(self, pin):
-                print(f"Mock DHT22 initialized with pin {pin}")
-            
-            @property
-            def temperature(self):
-                return 25.0  # Mock temperature value
-
-            @property
-            def humidity(self):
-                return 60.0  # Mock humidity value
+logger = logging.getLogger(__name__)
 
 
 class DHTSensor(SensorInterface):
-    def __init__(self, data_pin, power_relay_pin, max_retries=5, delay=2):
-        self.sensor = adafruit_dht.DHT22(data_pin)
+    def __init__(self, data_pin, power_relay_pin, max_retries=5, delay=2, power=None):
+        self.sensor = get_backend().DHT22(data_pin)  # adafruit_dht.DHT22 or the simulated model
         self.status = "Initialized"
-        # Relay to control power to the sensor
-        self.power_relay = RelayControl(power_relay_pin)
+        # Power rail handle; rails shared with other sensors are switched by the scheduler
+        self.power = power or PowerScheduler().register("DHT22", power_relay_pin)
         self.max_retries = max_retries  # Maximum number of retries to get a valid reading
         self.delay = delay  # Delay in seconds between retries
+        self.retries = get_registry().counter(  # Read attempts that had to be retried
+            "sensor_retries_total", "Sensor read attempts that were retried", sensor="DHT22")
 
     def power_on(self):
-        """Turn on the relay to provide power to the sensor."""
-        self.power_relay.activate()
+        """Power the sensor's rail and wait out its warm-up time."""
+        self.power.power_on()
         self.status = "Powered On"
 
     def power_off(self):
-        """Turn off the relay to cut power to the sensor."""
-        self.power_relay.deactivate()
-        self.status = "Powered Off"
+        """Release the sensor's rail; it is switched off once no other sensor needs it."""
+        self.power.power_off()
+        if self.status not in ("OK", "Error"):  # Keep the outcome of the last read
+            self.status = "Powered Off"
 
     def read_value(self):
         """Read temperature and humidity values from the sensor with retries."""
@@ -59,11 +44,13 @@ class DHTSensor(SensorInterface):
                     self.power_off()  # Optionally turn off the sensor after reading
                     return {"temperature": temperature, "humidity": humidity}
                 else:
-                    print(f"Invalid reading on attempt {attempt + 1}. Retrying...")
+                    logger.warning("Invalid DHT22 reading on attempt %d. Retrying...", attempt + 1)
+                    self.retries.inc()
                     time.sleep(self.delay)  # Wait before retrying
 
             except RuntimeError as e:
-                print(f"Error reading DHT22: {e}. Retrying in {self.delay} seconds...")
+                logger.warning("Error reading DHT22: %s. Retrying in %s seconds...", e, self.delay)
+                self.retries.inc()
                 time.sleep(self.delay)
 
         self.status = "Error"  # Sensor read failed after retries
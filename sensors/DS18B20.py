@@ -1,56 +1,102 @@
-import platform
+import logging
 import time
+from hal.backend import get_backend
 from sensors.sensors_interface import SensorInterface
-from relays.relay_control import RelayControl
-
-# Conditional import for w1thermsensor (only for Raspberry Pi)
-if platform.system() == 'Linux':  # Raspberry Pi
-    from w1thermsensor import W1ThermSensor, NoSensorFoundError
-else:
-    # Mock the W1ThermSensor class for non-Linux platforms (macOS/Windows)
-    class W1ThermSensor:
-        def __init__(self):
-            print("Mock DS18B20 sensor initialized.")
-        
-        def get_temperature(self):
-            return 22.5  # Mock temperature value
-    
-    class NoSensorFoundError(Exception):
-        pass
+from sensors.power import PowerScheduler
+from telemetry.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+
+# Conversion time in seconds for each DS18B20 resolution in bits
+CONVERSION_TIMES = {9: 0.09375, 10: 0.1875, 11: 0.375, 12: 0.75}
 
 
 class DS18B20Sensor(SensorInterface):
-    def __init__(self, power_relay_pin, max_retries=5, delay=2):
-        # Initialize the relay for power control
-        self.power_relay = RelayControl(pin=power_relay_pin)
+    def __init__(self, power_relay_pin, max_retries=5, delay=2, power=None,
+                 resolution=12, resolutions=None, primary_probe=None):
+        # Power rail handle; rails shared with other sensors are switched by the scheduler
+        self.power = power or PowerScheduler().register("DS18B20", power_relay_pin)
         self.status = "Initialized"
         self.max_retries = max_retries  # Max number of retries if reading fails
         self.delay = delay  # Delay between retries
-        self.sensor = None
+        self.retries = get_registry().counter(  # Read attempts that had to be retried
+            "sensor_retries_total", "Sensor read attempts that were retried", sensor="DS18B20")
+        self.sensor = None  # Primary probe, reported as "temperature"
+        self.probes = []  # Every probe found on the bus
+        self.resolution = resolution  # Default resolution in bits (9-12)
+        self.resolutions = resolutions or {}  # ROM ID -> resolution override
+        self.primary_probe = primary_probe  # ROM ID of the primary probe (default: first found)
+        self._resolution_switch = None  # Rail switch count when resolutions were last applied
+        self.backend = get_backend()  # Provides W1ThermSensor, NoSensorFoundError and w1_bulk_convert
 
     def power_on(self):
-        """Turn on the relay to provide power to the sensor."""
-        self.power_relay.activate()
+        """Power the sensor's rail and wait out its warm-up time."""
+        self.power.power_on()
         self.status = "Powered On"
 
     def power_off(self):
-        """Turn off the relay to cut power to the sensor."""
-        self.power_relay.deactivate()
-        self.status = "Powered Off"
+        """Release the sensor's rail; it is switched off once no other sensor needs it."""
+        self.power.power_off()
+        if self.status not in ("OK", "Error"):  # Keep the outcome of the last read
+            self.status = "Powered Off"
 
     def initialize_sensor(self):
-        """Initialize the DS18B20 sensor after powering it on."""
+        """Discover every DS18B20 probe on the bus after powering it on."""
         try:
-            self.sensor = W1ThermSensor()  # This is either the real or mock sensor
-            self.status = "Initialized"
-            return True
-        except NoSensorFoundError:
-            print("Could not find DS18B20 sensor. Retrying...")
+            # These are either the real or simulated sensors
+            probes = self.backend.W1ThermSensor.get_available_sensors()
+            if not probes:
+                raise self.backend.NoSensorFoundError("No DS18B20 sensor found on the 1-Wire bus")
+        except self.backend.NoSensorFoundError:
+            logger.warning("Could not find DS18B20 sensor. Retrying...")
             self.status = "Initialization Failed"
             return False
 
+        self.probes = probes
+        self.sensor = next((probe for probe in probes if probe.id == self.primary_probe), probes[0])
+        self._resolution_switch = None
+        self.status = "Initialized"
+        return True
+
+    def apply_resolutions(self):
+        """Set each probe's resolution; the setting is volatile, so redo it after the rail is power-cycled."""
+        switches = self.power.rail.switches
+        if switches == self._resolution_switch:
+            return
+        for probe in self.probes:
+            resolution = self.resolutions.get(probe.id, self.resolution)
+            try:
+                probe.set_resolution(resolution)
+            except Exception as e:
+                logger.warning("Could not set DS18B20 %s to %s bit: %s", probe.id, resolution, e)
+        self._resolution_switch = switches
+
+    def conversion_time(self):
+        """Worst-case conversion time over all probes."""
+        bits = [self.resolutions.get(probe.id, self.resolution) for probe in self.probes] or [self.resolution]
+        return CONVERSION_TIMES.get(max(bits), 0.75)
+
+    def read_probes(self):
+        """
+        Read every probe, keyed by ROM ID.
+        One bus-wide conversion is triggered first so all probes convert in parallel and the
+        per-probe reads return immediately; without bulk support each probe converts in turn.
+        Probes that fail to read are reported as None.
+        """
+        self.apply_resolutions()
+        self.backend.w1_bulk_convert(self.conversion_time())
+        temperatures = {}
+        for probe in self.probes:
+            try:
+                temperatures[probe.id] = probe.get_temperature()
+            except Exception as e:
+                logger.warning("Error reading DS18B20 %s: %s", probe.id, e)
+                temperatures[probe.id] = None
+        return temperatures
+
     def read_value(self):
-        """Read temperature value from DS18B20 sensor with retries."""
+        """Read temperature values from all DS18B20 probes with retries."""
         self.power_on()  # Ensure the sensor is powered on
         self.status = "Reading"
 
@@ -59,23 +105,29 @@ class DS18B20Sensor(SensorInterface):
                 # Ensure sensor is initialized before reading
                 if self.sensor is None or self.status == "Initialization Failed":
                     if not self.initialize_sensor():
-                        print(f"Retrying initialization... Attempt {attempt + 1}/{self.max_retries}")
+                        logger.info("Retrying initialization... Attempt %d/%d", attempt + 1, self.max_retries)
+                        self.retries.inc()
                         time.sleep(self.delay)
                         continue
 
-                temperature = self.sensor.get_temperature()
+                temperatures = self.read_probes()
+                temperature = temperatures.get(self.sensor.id)
                 if temperature is not None:
                     self.status = "OK"
                     self.power_off()  # Optionally turn off the sensor after reading
-                    return {"temperature": temperature}
+                    # The primary probe stays under "temperature"; every probe is also reported by ROM ID
+                    return {"temperature": temperature, **temperatures}
                 else:
-                    print(f"Invalid reading on attempt {attempt + 1}. Retrying...")
+                    logger.warning("Invalid DS18B20 reading on attempt %d. Retrying...", attempt + 1)
+                    self.retries.inc()
                     time.sleep(self.delay)  # Wait before retrying
-            except NoSensorFoundError as e:
-                print(f"Error reading DS18B20: {e}. Retrying in {self.delay} seconds...")
+            except self.backend.NoSensorFoundError as e:
+                logger.warning("Error reading DS18B20: %s. Retrying in %s seconds...", e, self.delay)
+                self.retries.inc()
                 time.sleep(self.delay)
             except Exception as e:
-                print(f"An error occurred while reading DS18B20: {e}. Retrying...")
+                logger.warning("An error occurred while reading DS18B20: %s. Retrying...", e)
+                self.retries.inc()
                 time.sleep(self.delay)
 
         self.status = "Error"  # Reading failed after retries
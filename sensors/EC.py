@@ -1,88 +1,148 @@
-import platform
+import logging
+import threading
 import time
+from array import array
 from sensors.sensors_interface import SensorInterface
-from relays.relay_control import RelayControl
+from sensors.power import PowerScheduler
+from telemetry.metrics import get_registry
+from libs.ADS1115 import ADS1115, ADS1115_REG_CONFIG_DR_128SPS
+from libs.DF_EC import DFRobot_EC
+from sensors.filters import FILTERS, spread
 
-# Import the necessary EC sensor dependencies from the libs directory
-if platform.system() == 'Linux':  # Only import these on Linux (Raspberry Pi)
-    from libs.ADS1115 import ADS1115
-    from libs.DF_EC import DFRobot_EC
-else:
-    # Mock the EC sensor behavior for non-Linux platforms
-    class ADS1115:
-        def setAddr_ADS1115(self, addr):
-            print(f"Mock set ADC address to {addr}")
+logger = logging.getLogger(__name__)
 
-        def setGain(self, gain):
-            print(f"Mock set ADC gain to {gain}")
-
-        def readVoltage(self, channel):
-            return {"r": 1.23}  # Mock ADC voltage reading
-
-    class DFRobot_EC:
-        def begin(self):
-            print("Mock EC sensor initialized")
-
-        def readEC(self, voltage, temperature):
-            return voltage * 0.5  # Mock EC value calculation
 
 class ECSensor(SensorInterface):
-    def __init__(self, power_relay_pin, adc_address=0x48, gain=0x00, max_retries=5, delay=2):
-        self.ads1115 = ADS1115()  # Initialize ADC for the EC sensor
-        self.ec = DFRobot_EC()    # Initialize EC measurement class
+    def __init__(self, power_relay_pin, adc_address=0x48, gain=0x00, data_rate=ADS1115_REG_CONFIG_DR_128SPS,
+                 max_retries=5, delay=2, burst_samples=1, burst_data_rate=None, burst_filter="median",
+                 power=None, probe_id=None, calibration_dir='data'):
+        # ADC for the EC sensor; address, gain and data rate are configured once per instance
+        self.ads1115 = ADS1115(addr=adc_address, gain=gain, data_rate=data_rate)
+        # EC conversion with this probe's own calibration constants
+        self.ec = DFRobot_EC(probe_id=probe_id, data_dir=calibration_dir)
         self.status = "Initialized"
-        self.power_relay = RelayControl(power_relay_pin)
+        # Power rail handle; rails shared with other sensors are switched by the scheduler
+        self.power = power or PowerScheduler().register("EC", power_relay_pin)
         self.adc_address = adc_address
         self.gain = gain
+        self.data_rate = data_rate  # ADS1115_REG_CONFIG_DR_* setting; reads finish after one conversion
         self.max_retries = max_retries
         self.delay = delay
+        self.retries = get_registry().counter(  # Read attempts that had to be retried
+            "sensor_retries_total", "Sensor read attempts that were retried", sensor="EC")
+        self._lock = threading.Lock()  # Calibration and readings both drive the ADC
+
+        # Burst mode: take burst_samples readings in continuous conversion and filter them
+        self.burst_samples = burst_samples
+        self.burst_data_rate = burst_data_rate or data_rate
+        self.burst_filter = FILTERS[burst_filter]
+        # Buffers are allocated once and reused for every burst
+        self._burst_voltages = array('d', bytes(8 * burst_samples))
+        self._burst_ec = array('d', bytes(8 * burst_samples))
         
-        # Start EC sensor calibration or setup
-        self.power_on()  # Ensure the sensor is powered before starting calibration/setup
+        # Load the stored calibration once; it stays in memory afterwards
         self.ec.begin()
-        self.power_off()  # Optionally power off after initialization
 
     def power_on(self):
-        """Turn on the relay to provide power to the sensor."""
-        self.power_relay.activate()
+        """Power the sensor's rail and wait out its warm-up time."""
+        self.power.power_on()
         self.status = "Powered On"
 
     def power_off(self):
-        """Turn off the relay to cut power to the sensor."""
-        self.power_relay.deactivate()
-        self.status = "Powered Off"
+        """Release the sensor's rail; it is switched off once no other sensor needs it."""
+        self.power.power_off()
+        if self.status not in ("OK", "Error"):  # Keep the outcome of the last read
+            self.status = "Powered Off"
 
     def read_value(self, temperature=25):
         """Read EC sensor values with retries."""
+        with self._lock:
+            return self._read_value(temperature)
+
+    def _read_value(self, temperature):
         self.power_on()  # Ensure the sensor is powered before reading
         self.status = "Reading"
 
         for attempt in range(self.max_retries):
             try:
-                # Set ADC address and gain for the ADS1115
-                self.ads1115.setAddr_ADS1115(self.adc_address)
-                self.ads1115.setGain(self.gain)
-
-                # Read the EC value from the ADC and convert it
-                adc0 = self.ads1115.readVoltage(0)
-                ec_value = self.ec.readEC(adc0['r'], temperature)
+                if self.burst_samples > 1:
+                    reading = self.read_burst(temperature)
+                else:
+                    # Read the EC value from the ADC and convert it
+                    adc0 = self.ads1115.readVoltage(0)
+                    reading = {"ec_value": self.ec.readEC(adc0['r'], temperature), "temperature": temperature}
+                ec_value = reading["ec_value"]
 
                 if ec_value is not None and ec_value > 0:
                     self.status = "OK"
                     self.power_off()  # Power off after successful reading
-                    return {"ec_value": ec_value, "temperature": temperature}
+                    return reading
                 else:
-                    print(f"Invalid EC reading on attempt {attempt + 1}. Retrying...")
+                    logger.warning("Invalid EC reading on attempt %d. Retrying...", attempt + 1)
+                    self.retries.inc()
                     time.sleep(self.delay)
 
-            except RuntimeError as e:
-                print(f"Error reading EC sensor: {e}. Retrying in {self.delay} seconds...")
+            except (RuntimeError, OSError) as e:
+                logger.warning("Error reading EC sensor: %s. Retrying in %s seconds...", e, self.delay)
+                self.retries.inc()
                 time.sleep(self.delay)
 
         self.status = "Error"
         self.power_off()  # Ensure power is off even after failed attempts
         return {"ec_value": None, "temperature": None}
 
+    def read_burst(self, temperature):
+        """Capture a burst of ADC samples, convert them all to EC and return the filtered value with its spread."""
+        self.ads1115.readBurst(0, self._burst_voltages, dr=self.burst_data_rate)
+        ec_values = self.ec.readECBatch(self._burst_voltages, temperature, self._burst_ec)
+        ec_min, ec_max, ec_std = spread(ec_values)
+        return {
+            "ec_value": self.burst_filter(ec_values),
+            "temperature": temperature,
+            "ec_min": ec_min,
+            "ec_max": ec_max,
+            "ec_std": ec_std,
+            "samples": self.burst_samples,
+        }
+
+    def read_voltage(self):
+        """One probe voltage in mV, filtered over a burst when burst mode is enabled."""
+        if self.burst_samples > 1:
+            self.ads1115.readBurst(0, self._burst_voltages, dr=self.burst_data_rate)
+            return self.burst_filter(self._burst_voltages)
+        return self.ads1115.readVoltage(0)['r']
+
+    def calibrate(self, temperature=25):
+        """
+        Calibrate with the probe in a 1.413 us/cm or 12.88 ms/cm buffer solution.
+        Returns the new calibration; raises ValueError if the reading matches neither buffer.
+        """
+        with self._lock:
+            self.power_on()
+            try:
+                voltage = self.read_voltage()
+            finally:
+                self.power_off()
+            calibration = self.ec.calibration(voltage, temperature)
+        if calibration is None:
+            raise ValueError(f"EC probe voltage {voltage:.1f} mV does not match a 1.413 us/cm or 12.88 ms/cm buffer")
+        return calibration
+
+    def reset_calibration(self):
+        """Reset the probe to the default K values."""
+        with self._lock:
+            return self.ec.reset()
+
+    def restore_calibration(self, version):
+        """Make an earlier calibration version current again."""
+        with self._lock:
+            return self.ec.store.restore(version)
+
+    def get_calibration(self):
+        """Current calibration and its history."""
+        store = self.ec.store
+        return {**store.as_dict(), "history": list(store.history)}
+
     def get_status(self):
         """Get the current status of the EC sensor."""
         return self.status
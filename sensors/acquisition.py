@@ -0,0 +1,231 @@
+# sensors/acquisition.py
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sensors.cache import ReadingCache
+from telemetry.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+
+class SensorAcquisition:
+    """Run blocking sensor drivers in a bounded thread pool so the event loop stays responsive."""
+
+    def __init__(self, sensors, max_workers=3, read_timeout=15.0, read_timeouts=None, cycle_timeout=None,
+                 power=None, inputs=None):
+        self.sensors = sensors  # Mapping of sensor name -> SensorInterface instance
+        self.read_timeout = read_timeout  # Default per-read deadline in seconds
+        self.read_timeouts = read_timeouts or {}  # Per-sensor overrides of the read deadline
+        self.cycle_timeout = cycle_timeout  # Deadline for a full multi-sensor cycle (None = slowest read)
+        self.power = power  # Optional PowerScheduler used to open one power window per cycle
+        # Derived readings: sensor name -> {read_value argument: {"sensor", "metric", "max_age", "default"}}
+        self.inputs = inputs or {}
+        self.order = self._topological_order()  # Upstream sensors before the sensors that use them
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sensor")
+        # Reads still running in the pool, keyed by sensor name. A driver that overruns its
+        # deadline keeps its thread until it returns, so later callers join that read instead
+        # of stacking a second one on the same hardware.
+        self._in_flight = {}
+        self.cache = ReadingCache()  # Last good reading per sensor, for requests that accept a max_age
+        self.listeners = []  # Callables (sensor_name, entry) invoked after every physical read
+
+        # Per-sensor latency/outcome metrics, looked up once so recording them does not allocate
+        metrics = get_registry()
+        self._read_seconds = {name: metrics.histogram("sensor_read_seconds", "Physical sensor read latency", sensor=name)
+                              for name in sensors}
+        self._timeouts = {name: metrics.counter("sensor_timeouts_total", "Reads that missed their deadline", sensor=name)
+                          for name in sensors}
+        self._errors = {name: metrics.counter("sensor_errors_total", "Reads that failed or returned an Error status",
+                                              sensor=name)
+                        for name in sensors}
+        self._cycle_seconds = metrics.histogram("acquisition_cycle_seconds", "Duration of a multi-sensor read cycle")
+        metrics.counter_func("reading_cache_hits_total", lambda: self.cache.hits, "Requests answered from the cache")
+        metrics.counter_func("reading_cache_misses_total", lambda: self.cache.misses, "Requests that needed a read")
+        metrics.counter_func("reading_cache_coalesced_total", lambda: self.cache.coalesced,
+                             "Reads joined instead of started")
+
+    def _topological_order(self):
+        """Sensor names ordered so every sensor comes after the sensors it takes inputs from."""
+        order, visiting = [], set()
+
+        def visit(sensor_name):
+            if sensor_name in order:
+                return
+            if sensor_name in visiting:
+                raise ValueError(f"Sensor inputs form a cycle through {sensor_name}")
+            visiting.add(sensor_name)
+            for spec in self.inputs.get(sensor_name, {}).values():
+                if spec["sensor"] not in self.sensors:
+                    raise ValueError(f"{sensor_name} takes input from unknown sensor {spec['sensor']}")
+                visit(spec["sensor"])
+            visiting.discard(sensor_name)
+            order.append(sensor_name)
+
+        for sensor_name in self.sensors:
+            visit(sensor_name)
+        return order
+
+    async def _resolve_inputs(self, sensor_name, deadline=None):
+        """
+        Collect the upstream values a derived sensor needs, as read_value keyword arguments.
+        A cached upstream reading within the input's max_age is reused; otherwise the read
+        already running for the upstream sensor is joined, and only if there is none is the
+        upstream sensor read. Missing values fall back to the input's default.
+        Waiting for an upstream read never goes past `deadline` (event loop time).
+        """
+        kwargs = {}
+        for argument, spec in self.inputs.get(sensor_name, {}).items():
+            upstream = spec["sensor"]
+            metric = spec.get("metric", argument)
+            entry = self.cache.peek(upstream, spec.get("max_age", 0))
+            if entry is not None:
+                sensor_data = entry["sensor_data"]
+            else:
+                future = self._in_flight.get(upstream)
+                if future is not None and not future.done():
+                    # The upstream read of this cycle is already running: wait for its result
+                    try:
+                        timeout = self._remaining(self.read_timeouts.get(upstream, self.read_timeout), deadline)
+                        sensor_data = (await asyncio.wait_for(asyncio.shield(future), timeout))["sensor_data"]
+                    except asyncio.TimeoutError:
+                        sensor_data = None
+                else:
+                    sensor_data = (await self.read(upstream, deadline=deadline))["sensor_data"]
+            value = (sensor_data or {}).get(metric)
+            if value is None:
+                logger.warning("%s: no %s %s available, using %s", sensor_name, upstream, metric, spec.get("default"))
+                value = spec.get("default")
+            if value is not None:
+                kwargs[argument] = value
+        return kwargs
+
+    def _submit(self, sensor_name, sensor_instance, kwargs=None):
+        """Start a driver read in the pool, or join the one already running for this sensor (single-flight)."""
+        future = self._in_flight.get(sensor_name)
+        if future is None or future.done():
+            future = asyncio.ensure_future(self._physical_read(sensor_name, sensor_instance, kwargs))
+            self._in_flight[sensor_name] = future
+        else:
+            self.cache.coalesced += 1
+        return future
+
+    async def _physical_read(self, sensor_name, sensor_instance, kwargs):
+        """
+        One driver read and its bookkeeping (latency, errors, cache, listeners), done exactly
+        once per physical read however many callers join it, and even if they all time out.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            sensor_data = await loop.run_in_executor(
+                self.executor, functools.partial(sensor_instance.read_value, **(kwargs or {})))
+        except Exception as e:
+            logger.error("%s read failed: %s", sensor_name, e)
+            self._errors[sensor_name].inc()
+            return {"sensor_data": None, "sensor_status": "Error"}
+        self._read_seconds[sensor_name].observe(time.perf_counter() - started)
+
+        entry = {"sensor_data": sensor_data, "sensor_status": sensor_instance.get_status()}
+        if entry["sensor_status"] == "Error":
+            self._errors[sensor_name].inc()
+        self.cache.put(sensor_name, entry)
+        for listener in self.listeners:
+            listener(sensor_name, entry)
+        return entry
+
+    @staticmethod
+    def _remaining(timeout, deadline):
+        """`timeout`, shortened to what is left until `deadline` (event loop time, None = no deadline)."""
+        if deadline is None:
+            return timeout
+        return max(0.0, min(timeout, deadline - asyncio.get_running_loop().time()))
+
+    async def read(self, sensor_name, timeout=None, max_age=None, deadline=None):
+        """
+        Read one sensor off the event loop.
+        Returns the usual {"sensor_data": ..., "sensor_status": ...} entry. If the driver
+        does not finish within the deadline the status is reported as "Timeout".
+        With max_age (seconds) a cached reading at most that old is returned without touching
+        the hardware. Sensors with inputs get their upstream values first (see _resolve_inputs).
+        `deadline` (event loop time) bounds the input wait and the read together, so a chain of
+        dependent sensors cannot outlast the cycle it belongs to.
+        """
+        sensor_instance = self.sensors.get(sensor_name)
+        if sensor_instance is None:
+            raise ValueError(f"Unrecognized sensor: {sensor_name}")
+
+        if max_age is not None:
+            cached = self.cache.get(sensor_name, max_age)
+            if cached is not None:
+                return cached
+
+        if timeout is None:
+            timeout = self.read_timeouts.get(sensor_name, self.read_timeout)
+        future = self._in_flight.get(sensor_name)
+        if (future is None or future.done()) and sensor_name in self.inputs:
+            kwargs = await self._resolve_inputs(sensor_name, deadline)
+        else:
+            kwargs = None
+        timeout = self._remaining(timeout, deadline)
+        if timeout <= 0 and (future is None or future.done()):
+            # The input wait used up the cycle: do not start a read whose power window is closing
+            logger.warning("%s: no time left in the cycle after resolving inputs, reporting timeout", sensor_name)
+            self._timeouts[sensor_name].inc()
+            return {"sensor_data": None, "sensor_status": "Timeout"}
+        future = self._submit(sensor_name, sensor_instance, kwargs)
+        try:
+            # Shield the shared read so a timeout only abandons this wait, not the read itself
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%s read exceeded %s seconds, reporting timeout", sensor_name, timeout)
+            self._timeouts[sensor_name].inc()
+            return {"sensor_data": None, "sensor_status": "Timeout"}
+
+    async def read_all(self, sensor_names=None, cycle_timeout=None, max_age=None):
+        """
+        Read several sensors concurrently.
+        The sensors sit on separate buses (GPIO bit-bang, 1-Wire, I2C), so a cycle costs the
+        slowest read rather than the sum. Sensors that miss their own deadline or the cycle
+        deadline are reported with a "Timeout" status and the rest are returned as is.
+        With max_age, sensors with a fresh enough cached reading are not read at all.
+        Reads start in dependency order, so a derived sensor joins its upstream read of the
+        same cycle instead of starting another one.
+        """
+        sensor_names = list(self.sensors if sensor_names is None else sensor_names)
+        cycle_timeout = self.cycle_timeout if cycle_timeout is None else cycle_timeout
+
+        results = {}
+        if max_age is not None:
+            for sensor_name in sensor_names:
+                cached = self.cache.get(sensor_name, max_age)
+                if cached is not None:
+                    results[sensor_name] = cached
+        position = {sensor_name: index for index, sensor_name in enumerate(self.order)}
+        to_read = sorted((sensor_name for sensor_name in sensor_names if sensor_name not in results),
+                         key=lambda sensor_name: position.get(sensor_name, -1))
+
+        # One absolute deadline for the whole cycle; without cycle_timeout it is the slowest read's deadline
+        timeouts = {sensor_name: self.read_timeouts.get(sensor_name, self.read_timeout) for sensor_name in to_read}
+        budget = cycle_timeout if cycle_timeout is not None else max(timeouts.values(), default=0.0)
+        deadline = asyncio.get_running_loop().time() + budget
+        reads = [self.read(sensor_name, timeout=min(timeouts[sensor_name], budget), deadline=deadline)
+                 for sensor_name in to_read]
+
+        # Switch every rail on once for the whole window so shared rails are not toggled per sensor
+        started = time.perf_counter()
+        if self.power is not None:
+            self.power.hold(to_read)
+        try:
+            results.update(zip(to_read, await asyncio.gather(*reads)))
+        finally:
+            if self.power is not None:
+                self.power.release(to_read)
+        if to_read:
+            self._cycle_seconds.observe(time.perf_counter() - started)
+        return {sensor_name: results[sensor_name] for sensor_name in sensor_names}
+
+    def shutdown(self):
+        """Release the worker threads without waiting for stuck drivers."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
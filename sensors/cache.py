@@ -0,0 +1,52 @@
+# sensors/cache.py
+import time
+
+
+class ReadingCache:
+    """Last good reading per sensor, stamped with the monotonic clock so freshness can be checked."""
+
+    def __init__(self):
+        self._entries = {}  # sensor name -> (monotonic timestamp, {"sensor_data": ..., "sensor_status": ...})
+        self.hits = 0  # Requests answered from the cache
+        self.misses = 0  # Requests that needed a physical read
+        self.coalesced = 0  # Physical reads joined instead of started
+
+    def get(self, sensor_name, max_age):
+        """Return the cached entry if it is at most `max_age` seconds old, else None (a miss)."""
+        cached = self._entries.get(sensor_name)
+        if cached is not None and time.monotonic() - cached[0] <= max_age:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        return None
+
+    def peek(self, sensor_name, max_age):
+        """Like get, but for internal lookups that should not count as hits or misses."""
+        cached = self._entries.get(sensor_name)
+        if cached is not None and time.monotonic() - cached[0] <= max_age:
+            return cached[1]
+        return None
+
+    def put(self, sensor_name, entry):
+        """Store an entry; only successful reads replace the last good sample."""
+        if entry.get("sensor_status") == "OK":
+            self._entries[sensor_name] = (time.monotonic(), entry)
+
+    def age(self, sensor_name):
+        """Seconds since the last good reading of a sensor, or None if there is none."""
+        cached = self._entries.get(sensor_name)
+        return None if cached is None else time.monotonic() - cached[0]
+
+    def snapshot(self):
+        """Every cached reading with its age in seconds, without counting hits or misses."""
+        now = time.monotonic()
+        return {sensor_name: {**entry, "age": now - stamp} for sensor_name, (stamp, entry) in self._entries.items()}
+
+    def stats(self):
+        """Counters and the age of every cached reading."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "ages": {sensor_name: self.age(sensor_name) for sensor_name in self._entries},
+        }
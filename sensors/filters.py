@@ -0,0 +1,53 @@
+# sensors/filters.py
+import math
+
+# NumPy is optional: it is used for vectorized filtering when installed, otherwise the
+# same statistics are computed in pure Python over the array buffer.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def as_vector(samples):
+    """Return a NumPy view of an array('d') buffer without copying (or the buffer itself)."""
+    if np is not None and not isinstance(samples, np.ndarray):
+        return np.frombuffer(samples, dtype=np.float64)
+    return samples
+
+
+def median(samples):
+    """Median of a sample buffer."""
+    if np is not None:
+        return float(np.median(as_vector(samples)))
+    ordered = sorted(samples)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def trimmed_mean(samples, proportion=0.1):
+    """Mean after discarding `proportion` of the samples from each end."""
+    cut = int(len(samples) * proportion)
+    if np is not None:
+        ordered = np.sort(as_vector(samples))
+        return float(ordered[cut:len(ordered) - cut].mean())
+    ordered = sorted(samples)[cut:len(samples) - cut]
+    return sum(ordered) / len(ordered)
+
+
+def spread(samples):
+    """Return (min, max, standard deviation) of a sample buffer."""
+    if np is not None:
+        vector = as_vector(samples)
+        return float(vector.min()), float(vector.max()), float(vector.std())
+    mean = sum(samples) / len(samples)
+    variance = sum((value - mean) ** 2 for value in samples) / len(samples)
+    return min(samples), max(samples), math.sqrt(variance)
+
+
+FILTERS = {
+    "median": median,
+    "trimmed_mean": trimmed_mean,
+}
@@ -0,0 +1,133 @@
+# sensors/power.py
+import threading
+import time
+from relays.relay_control import RelayControl
+
+
+class PowerRail:
+    """A relay-switched supply shared by one or more sensors, reference-counted across threads."""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.relay = RelayControl(pin)
+        self.warmup = 0.0  # Longest warm-up of the sensors on this rail
+        self.keep_hot = False  # Leave the rail on between acquisition windows
+        self.refs = 0
+        self.powered_at = None  # Monotonic time the rail was switched on, None while off
+        self.switches = 0  # Number of times the rail has been switched on
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a reference on the rail, switching it on if it is off."""
+        with self.lock:
+            self.refs += 1
+            if self.powered_at is None:
+                self.relay.activate()
+                self.powered_at = time.monotonic()
+                self.switches += 1
+
+    def release(self):
+        """Drop a reference; the last one switches the rail off unless it is kept hot."""
+        with self.lock:
+            self.refs = max(0, self.refs - 1)
+            if self.refs == 0 and not self.keep_hot and self.powered_at is not None:
+                self.relay.deactivate()
+                self.powered_at = None
+
+    def set_keep_hot(self, keep_hot):
+        """Start or stop keeping the rail on between windows, switching it now if it is idle."""
+        with self.lock:
+            self.keep_hot = keep_hot
+            if keep_hot and self.powered_at is None:
+                self.relay.activate()
+                self.powered_at = time.monotonic()
+                self.switches += 1
+            elif not keep_hot and self.refs == 0 and self.powered_at is not None:
+                self.relay.deactivate()
+                self.powered_at = None
+
+    def wait_warm(self, warmup):
+        """Block until the rail has been on for at least `warmup` seconds."""
+        with self.lock:
+            powered_at = self.powered_at
+        if powered_at is not None:
+            remaining = powered_at + warmup - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+
+
+class SensorPower:
+    """A sensor's view of its rail: power_on waits out the sensor's own warm-up time."""
+
+    def __init__(self, rail, warmup):
+        self.rail = rail
+        self.warmup = warmup
+
+    def power_on(self):
+        self.rail.acquire()
+        self.rail.wait_warm(self.warmup)
+
+    def power_off(self):
+        self.rail.release()
+
+
+class PowerScheduler:
+    """
+    Groups sensors by power relay so each rail is switched once per acquisition window.
+    Sensors sharing a pin share one PowerRail. With keep_hot_factor set, a rail stays on
+    while the shortest current sampling interval of its sensors is below keep_hot_factor
+    times its warm-up time, since power-cycling it would cost more than it saves.
+    Intervals are per sensor (`intervals`, else sampling_interval) and follow fast mode
+    through set_interval().
+    """
+
+    def __init__(self, sampling_interval=None, keep_hot_factor=None, intervals=None):
+        self.sampling_interval = sampling_interval  # Interval of sensors without one of their own
+        self.keep_hot_factor = keep_hot_factor
+        self.intervals = dict(intervals or {})  # sensor name -> current sampling interval
+        self.rails = {}  # pin -> PowerRail
+        self.sensor_rails = {}  # sensor name -> PowerRail
+
+    def register(self, sensor_name, pin, warmup=0.0):
+        """Attach a sensor to the rail on `pin` and return its SensorPower handle."""
+        rail = self.rails.get(pin)
+        if rail is None:
+            rail = self.rails[pin] = PowerRail(pin)
+        rail.warmup = max(rail.warmup, warmup)
+        self.sensor_rails[sensor_name] = rail
+        self._update(rail)
+        return SensorPower(rail, warmup)
+
+    def set_interval(self, sensor_name, interval):
+        """Record a sensor's current sampling interval (e.g. on entering fast mode) and re-plan its rail."""
+        if self.intervals.get(sensor_name) == interval:
+            return
+        self.intervals[sensor_name] = interval
+        rail = self.sensor_rails.get(sensor_name)
+        if rail is not None:
+            self._update(rail)
+
+    def _update(self, rail):
+        intervals = [self.intervals.get(sensor_name, self.sampling_interval)
+                     for sensor_name, sensor_rail in self.sensor_rails.items() if sensor_rail is rail]
+        intervals = [interval for interval in intervals if interval is not None]
+        rail.set_keep_hot(self.keep_hot_factor is not None and bool(intervals)
+                          and min(intervals) < self.keep_hot_factor * rail.warmup)
+
+    def _rails_for(self, sensor_names):
+        rails = []
+        for sensor_name in sensor_names:
+            rail = self.sensor_rails.get(sensor_name)
+            if rail is not None and rail not in rails:
+                rails.append(rail)
+        return rails
+
+    def hold(self, sensor_names):
+        """Open an acquisition window: switch on every rail the sensors need, all at once."""
+        for rail in self._rails_for(sensor_names):
+            rail.acquire()
+
+    def release(self, sensor_names):
+        """Close an acquisition window opened with hold()."""
+        for rail in self._rails_for(sensor_names):
+            rail.release()
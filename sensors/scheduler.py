@@ -0,0 +1,108 @@
+# sensors/scheduler.py
+import time
+
+
+class SensorSchedule:
+    """Sampling and reporting rules for one sensor."""
+
+    def __init__(self, interval, fast_interval=None, fast_when=None, deadband=None, max_silence=None):
+        self.interval = interval  # Seconds between samples normally
+        self.fast_interval = fast_interval  # Seconds between samples while a fast_when actuator is ON
+        self.fast_when = fast_when or []  # Actuator names that switch this sensor to fast sampling
+        self.deadband = deadband or {}  # metric -> minimum change worth reporting ("*" = any other metric); empty = report every sample
+        self.max_silence = max_silence  # Report at least this often even without a change
+        self.last_sample = None  # Monotonic time of the last sample
+        self.last_report = None  # Monotonic time of the last report
+        self.last_reported = None  # Last reported {"sensor_data": ..., "sensor_status": ...}
+
+
+class SamplingScheduler:
+    """
+    Per-sensor sampling intervals with report-by-exception.
+    A sensor is sampled when its interval has elapsed (its fast interval while one of its
+    fast_when actuators is ON) and a sample is reported only if a deadband metric moved
+    by more than its threshold, the status changed, or max_silence has expired.
+    A "*" deadband entry covers every metric without a threshold of its own, e.g. the
+    per-ROM temperatures of a DS18B20 bus, whose keys are not known in advance.
+    """
+
+    def __init__(self, sensor_names, default_interval=60, schedules=None):
+        schedules = schedules or {}
+        self.schedules = {}
+        for sensor_name in sensor_names:
+            settings = schedules.get(sensor_name, {})
+            self.schedules[sensor_name] = SensorSchedule(
+                interval=settings.get("interval", default_interval),
+                fast_interval=settings.get("fast_interval"),
+                fast_when=settings.get("fast_when"),
+                deadband=settings.get("deadband"),
+                max_silence=settings.get("max_silence"),
+            )
+
+    def interval_for(self, sensor_name, actuator_status):
+        """Current sampling interval, taking fast mode into account."""
+        schedule = self.schedules[sensor_name]
+        if schedule.fast_interval is not None:
+            for actuator_name in schedule.fast_when:
+                if actuator_status.get(actuator_name) == "ON":
+                    return schedule.fast_interval
+        return schedule.interval
+
+    def next_due(self, sensor_name, actuator_status):
+        """Monotonic time the sensor should next be sampled."""
+        schedule = self.schedules[sensor_name]
+        if schedule.last_sample is None:
+            return 0.0
+        return schedule.last_sample + self.interval_for(sensor_name, actuator_status)
+
+    def due(self, actuator_status, now=None):
+        """Names of sensors whose next sample is due."""
+        now = time.monotonic() if now is None else now
+        return [sensor_name for sensor_name in self.schedules
+                if self.next_due(sensor_name, actuator_status) <= now]
+
+    def seconds_until_next(self, actuator_status, now=None):
+        """Seconds until the earliest sensor is due (0 if one is due already)."""
+        now = time.monotonic() if now is None else now
+        earliest = min(self.next_due(sensor_name, actuator_status) for sensor_name in self.schedules)
+        return max(0.0, earliest - now)
+
+    def mark_sampled(self, sensor_names, now=None):
+        now = time.monotonic() if now is None else now
+        for sensor_name in sensor_names:
+            self.schedules[sensor_name].last_sample = now
+
+    def should_report(self, sensor_name, entry, now=None):
+        """Decide whether a new sample is worth sending, and remember it if so."""
+        now = time.monotonic() if now is None else now
+        schedule = self.schedules[sensor_name]
+        if self._changed(schedule, entry) or (
+                schedule.max_silence is not None and now - schedule.last_report >= schedule.max_silence):
+            schedule.last_report = now
+            schedule.last_reported = entry
+            return True
+        return False
+
+    @staticmethod
+    def _changed(schedule, entry):
+        previous = schedule.last_reported
+        if previous is None or not schedule.deadband:
+            return True
+        if entry.get("sensor_status") != previous.get("sensor_status"):
+            return True
+        values = entry.get("sensor_data") or {}
+        previous_values = previous.get("sensor_data") or {}
+        deadband = schedule.deadband
+        if "*" in deadband:
+            numeric = lambda value: value is None or isinstance(value, (int, float))
+            metrics = [metric for metric in set(values) | set(previous_values)
+                       if numeric(values.get(metric)) and numeric(previous_values.get(metric))]
+            deadband = {metric: deadband.get(metric, deadband["*"]) for metric in metrics}
+        for metric, threshold in deadband.items():
+            value, previous_value = values.get(metric), previous_values.get(metric)
+            if value is None or previous_value is None:
+                if value is not previous_value:
+                    return True
+            elif abs(value - previous_value) > threshold:
+                return True
+        return False
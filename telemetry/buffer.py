@@ -0,0 +1,123 @@
+# telemetry/buffer.py
+import asyncio
+import concurrent.futures
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class TelemetryBuffer:
+    """
+    Durable store-and-forward queue for readings taken while the backend is unreachable.
+    Records live in SQLite (WAL mode) and are committed in groups to limit SD-card writes.
+    The table is bounded: once max_records is exceeded the oldest records are dropped.
+    The coroutine methods (extend, fetch, confirm, aclose) run the SQLite work on the
+    buffer's own thread, so a slow SD card never stalls the event loop; the plain methods
+    do the same work on the calling thread.
+    """
+
+    def __init__(self, path=os.path.join('data', 'telemetry.db'), max_records=50000,
+                 commit_batch=5, commit_interval=300.0):
+        self.path = path
+        self.max_records = max_records  # Upper bound on stored records (oldest are dropped first)
+        self.commit_batch = commit_batch  # Records to accumulate before a group commit
+        self.commit_interval = commit_interval  # Max seconds a record may wait in memory before commit
+        self._pending = []  # (timestamp, payload_json) rows not yet committed
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()  # One statement sequence at a time, whichever thread runs it
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetry-buffer")
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is crash-safe in WAL mode; only the last group commit can be lost on power failure
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS telemetry ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "timestamp REAL NOT NULL, "
+            "payload TEXT NOT NULL)"
+        )
+        self.db.commit()
+        # Stored record count kept in memory so len() never queries SQLite (metrics read it from other threads)
+        self._stored = self.db.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0]
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def extend(self, samples):
+        """Append (timestamp, payload) samples on the buffer thread."""
+        await self._run(self._extend, samples)
+
+    async def fetch(self, limit=100):
+        """fetch_batch on the buffer thread."""
+        return await self._run(self.fetch_batch, limit)
+
+    async def confirm(self, last_seq):
+        """ack on the buffer thread."""
+        await self._run(self.ack, last_seq)
+
+    async def aclose(self):
+        """close on the buffer thread, then stop the thread."""
+        await self._run(self.close)
+        self.executor.shutdown(wait=False)
+
+    def _extend(self, samples):
+        for timestamp, payload in samples:
+            self.append(payload, timestamp=timestamp)
+
+    def append(self, payload, timestamp=None):
+        """Queue one payload; it is written to disk with the next group commit."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._pending.append((timestamp, json.dumps(payload)))
+            if (len(self._pending) >= self.commit_batch
+                    or time.monotonic() - self._last_commit >= self.commit_interval):
+                self._flush()
+
+    def flush(self):
+        """Write all pending records in a single transaction and enforce the size bound."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_commit = time.monotonic()
+        if not self._pending:
+            return
+        with self.db:
+            self.db.executemany("INSERT INTO telemetry (timestamp, payload) VALUES (?, ?)", self._pending)
+            dropped = self.db.execute(
+                "DELETE FROM telemetry WHERE seq <= (SELECT MAX(seq) FROM telemetry) - ?",
+                (self.max_records,),
+            ).rowcount
+        self._stored += len(self._pending) - dropped
+        self._pending = []
+
+    def fetch_batch(self, limit=100):
+        """Return up to `limit` of the oldest records as dicts with seq, timestamp and payload."""
+        with self._lock:
+            self._flush()
+            rows = self.db.execute(
+                "SELECT seq, timestamp, payload FROM telemetry ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"seq": seq, "timestamp": timestamp, "payload": json.loads(payload)}
+                for seq, timestamp, payload in rows]
+
+    def ack(self, last_seq):
+        """Delete every record up to and including `last_seq` once the backend has confirmed it."""
+        with self._lock, self.db:
+            self._stored -= self.db.execute("DELETE FROM telemetry WHERE seq <= ?", (last_seq,)).rowcount
+
+    def __len__(self):
+        return self._stored + len(self._pending)
+
+    def close(self):
+        """Commit anything still pending and close the database."""
+        with self._lock:
+            self._flush()
+            self.db.close()
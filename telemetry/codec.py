@@ -0,0 +1,252 @@
+# telemetry/codec.py
+import json
+import math
+import struct
+import time
+import zlib
+
+# Websocket subprotocols offered at connect time; the backend picks the one it understands
+JSON_SUBPROTOCOL = "robectron.json"
+BINARY_SUBPROTOCOL = "robectron.binary.v1"
+
+SCHEMA_VERSION = 1
+MAGIC = b"RF"
+FLAG_ZLIB = 0x01  # Definitions and samples are zlib-compressed after the header
+FLAG_SEQ = 0x02  # Live frame: the batch_id field holds the session sequence number of the first sample
+
+# Frame layout (little-endian):
+#   header   magic(2s) version(B) flags(B) batch_id(I) n_defs(H) n_samples(H)
+#   def      name_id(H) name_len(B) name(utf-8)
+#   sample   timestamp(d) n_sensors(B) n_actuators(B)
+#   sensor   sensor_id(H) status(B) n_values(B), then n_values x value
+#   value    metric_id(H) value(f), NaN for a missing reading
+#   actuator actuator_id(H) state(B)
+_HEADER = struct.Struct("<2sBBIHH")
+_DEF = struct.Struct("<HB")
+_SAMPLE = struct.Struct("<dBB")
+_SENSOR = struct.Struct("<HBB")
+_VALUE = struct.Struct("<Hf")
+_ACTUATOR = struct.Struct("<HB")
+
+# Names with a fixed numeric ID in schema v1. Sensors, metrics and actuators share one ID space.
+# Anything else is assigned an ID from DYNAMIC_ID_START and defined once per session in-band.
+STATIC_IDS = {
+    "DHT22": 1,
+    "DS18B20": 2,
+    "EC": 3,
+    "temperature": 16,
+    "humidity": 17,
+    "ec_value": 18,
+    "EC_Pump": 64,
+}
+DYNAMIC_ID_START = 1024
+
+STATUS_CODES = {
+    "OK": 0,
+    "Error": 1,
+    "Timeout": 2,
+    "Initialized": 3,
+    "Reading": 4,
+    "Powered On": 5,
+    "Powered Off": 6,
+}
+STATUS_UNKNOWN = 255
+ACTUATOR_STATES = {"OFF": 0, "ON": 1}
+
+
+def _flatten(values, prefix=""):
+    """Yield (dotted_name, float) pairs from a possibly nested sensor_data dict."""
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}.")
+        elif value is None:
+            yield name, math.nan
+        elif isinstance(value, (int, float)):
+            yield name, float(value)
+
+
+class JsonCodec:
+    """The original wire format: one JSON text frame per payload."""
+
+    subprotocol = JSON_SUBPROTOCOL
+    batch_size = 1
+
+    def encode(self, samples, batch_id=None, seq=None):
+        """Encode a list of (timestamp, payload) samples; live samples carry their sequence number."""
+        if batch_id is None and len(samples) == 1:
+            if seq is None:
+                return json.dumps(samples[0][1])
+            return json.dumps({**samples[0][1], "seq": seq})
+        records = [{"timestamp": timestamp, "payload": payload} for timestamp, payload in samples]
+        return json.dumps({"type": "backlog", "batch_id": batch_id, "records": records})
+
+
+class BinaryCodec:
+    """
+    Schema-versioned struct encoding with numeric IDs and several samples per frame.
+    Names outside STATIC_IDS are sent once per session and referenced by ID afterwards,
+    so an encoder/decoder pair must live exactly as long as one websocket connection.
+    """
+
+    subprotocol = BINARY_SUBPROTOCOL
+
+    def __init__(self, batch_size=1, compress=False, compress_threshold=128):
+        self.batch_size = batch_size  # Live samples per frame
+        self.compress = compress
+        self.compress_threshold = compress_threshold  # Bytes below which zlib is not worth it
+        self._ids = dict(STATIC_IDS)
+        self._next_id = DYNAMIC_ID_START
+
+    def _name_id(self, name, new_defs):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._next_id
+            self._next_id += 1
+            self._ids[name] = name_id
+            new_defs.append((name_id, name))
+        return name_id
+
+    def encode(self, samples, batch_id=None, seq=None):
+        """
+        Encode a list of (timestamp, payload) samples into one binary frame. Live frames pass
+        the sequence number of their first sample as seq (the samples are numbered consecutively).
+        """
+        new_defs = []
+        body = bytearray()
+        for timestamp, payload in samples:
+            sensors = payload.get("sensor_data", {})
+            actuators = payload.get("actuator_status", {})
+            body += _SAMPLE.pack(timestamp, len(sensors), len(actuators))
+            for sensor_name, entry in sensors.items():
+                values = list(_flatten(entry.get("sensor_data") or {}))
+                status = STATUS_CODES.get(entry.get("sensor_status"), STATUS_UNKNOWN)
+                body += _SENSOR.pack(self._name_id(sensor_name, new_defs), status, len(values))
+                for metric_name, value in values:
+                    body += _VALUE.pack(self._name_id(metric_name, new_defs), value)
+            for actuator_name, state in actuators.items():
+                body += _ACTUATOR.pack(self._name_id(actuator_name, new_defs), ACTUATOR_STATES.get(state, 0))
+
+        defs = bytearray()
+        for name_id, name in new_defs:
+            encoded = name.encode("utf-8")
+            defs += _DEF.pack(name_id, len(encoded)) + encoded
+
+        flags = 0
+        content = bytes(defs + body)
+        if self.compress and len(content) >= self.compress_threshold:
+            content = zlib.compress(content)
+            flags |= FLAG_ZLIB
+
+        if seq is not None:
+            flags |= FLAG_SEQ
+            batch_id = seq
+        header = _HEADER.pack(MAGIC, SCHEMA_VERSION, flags, batch_id or 0, len(new_defs), len(samples))
+        return header + content
+
+
+class BinaryDecoder:
+    """Decode BinaryCodec frames back into the JSON payload structure (backend side and tests)."""
+
+    def __init__(self):
+        self._names = {name_id: name for name, name_id in STATIC_IDS.items()}
+        self._statuses = {code: status for status, code in STATUS_CODES.items()}
+        self._states = {code: state for state, code in ACTUATOR_STATES.items()}
+
+    def decode(self, frame):
+        """Return {"batch_id": ..., "seq": ..., "records": [{"timestamp": ..., "payload": ...}, ...]}."""
+        magic, version, flags, batch_id, n_defs, n_samples = _HEADER.unpack_from(frame, 0)
+        if magic != MAGIC or version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported frame: magic={magic!r} version={version}")
+        content = frame[_HEADER.size:]
+        if flags & FLAG_ZLIB:
+            content = zlib.decompress(content)
+
+        offset = 0
+        for _ in range(n_defs):
+            name_id, name_len = _DEF.unpack_from(content, offset)
+            offset += _DEF.size
+            self._names[name_id] = content[offset:offset + name_len].decode("utf-8")
+            offset += name_len
+
+        records = []
+        for _ in range(n_samples):
+            timestamp, n_sensors, n_actuators = _SAMPLE.unpack_from(content, offset)
+            offset += _SAMPLE.size
+            sensor_data = {}
+            for _ in range(n_sensors):
+                sensor_id, status, n_values = _SENSOR.unpack_from(content, offset)
+                offset += _SENSOR.size
+                values = {}
+                for _ in range(n_values):
+                    metric_id, value = _VALUE.unpack_from(content, offset)
+                    offset += _VALUE.size
+                    values[self._names[metric_id]] = None if math.isnan(value) else value
+                sensor_data[self._names[sensor_id]] = {
+                    "sensor_data": values,
+                    "sensor_status": self._statuses.get(status, "Unknown"),
+                }
+            actuator_status = {}
+            for _ in range(n_actuators):
+                actuator_id, state = _ACTUATOR.unpack_from(content, offset)
+                offset += _ACTUATOR.size
+                actuator_status[self._names[actuator_id]] = self._states.get(state, "OFF")
+            records.append({
+                "timestamp": timestamp,
+                "payload": {"sensor_data": sensor_data, "actuator_status": actuator_status},
+            })
+
+        if flags & FLAG_SEQ:
+            return {"batch_id": None, "seq": batch_id, "records": records}
+        return {"batch_id": batch_id or None, "seq": None, "records": records}
+
+
+def make_codec(subprotocol, config=None):
+    """Pick the codec for the subprotocol the backend accepted (JSON if it chose none)."""
+    config = config or {}
+    if subprotocol == BINARY_SUBPROTOCOL:
+        return BinaryCodec(
+            batch_size=config.get("batch_size", 1),
+            compress=config.get("compress", False),
+        )
+    return JsonCodec()
+
+
+def compare(payload, batch_size=10, rounds=1000):
+    """Measure bytes per sample and encode time per send for the JSON and binary paths."""
+    samples = [(time.time(), payload)] * batch_size
+    results = {}
+    for name, codec in (("json", JsonCodec()),
+                        ("binary", BinaryCodec(batch_size=batch_size)),
+                        ("binary+zlib", BinaryCodec(batch_size=batch_size, compress=True))):
+        if name == "json":
+            # JSON sends one frame per sample
+            frame = codec.encode(samples[:1])
+            per_sample = len(frame.encode("utf-8"))
+            start = time.process_time()
+            for _ in range(rounds):
+                codec.encode(samples[:1])
+            per_send = (time.process_time() - start) / rounds
+        else:
+            codec.encode(samples)  # First frame carries the dynamic name definitions
+            frame = codec.encode(samples)
+            per_sample = len(frame) / batch_size
+            start = time.process_time()
+            for _ in range(rounds):
+                codec.encode(samples)
+            per_send = (time.process_time() - start) / rounds
+        results[name] = {"bytes_per_sample": per_sample, "cpu_us_per_send": per_send * 1e6}
+    return results
+
+
+if __name__ == "__main__":
+    example = {
+        "sensor_data": {
+            "DHT22": {"sensor_data": {"temperature": 24.1, "humidity": 61.0}, "sensor_status": "OK"},
+            "DS18B20": {"sensor_data": {"temperature": 21.4}, "sensor_status": "OK"},
+            "EC": {"sensor_data": {"ec_value": 1.42, "temperature": 21.4}, "sensor_status": "OK"},
+        },
+        "actuator_status": {"EC_Pump": "OFF"},
+    }
+    for name, result in compare(example).items():
+        print(f"{name:12s} {result['bytes_per_sample']:8.1f} bytes/sample {result['cpu_us_per_send']:8.1f} us/send")
@@ -0,0 +1,161 @@
+# telemetry/connection.py
+import asyncio
+import collections
+import logging
+import random
+import time
+import uuid
+import websockets
+from websockets.exceptions import WebSocketException
+from telemetry.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+# Failures that end a connection attempt or a session and lead to a reconnect
+CONNECTION_ERRORS = (WebSocketException, OSError, asyncio.TimeoutError)
+
+
+class Backoff:
+    """
+    Exponential reconnect delay with jitter. The delay for attempt n is drawn from
+    [(1 - jitter) * d, d] with d = min(initial * multiplier**n, maximum), so a fleet of
+    devices coming back after a backend restart does not reconnect in lockstep.
+    reset() once a connection has proved stable starts the next outage at `initial` again.
+    """
+
+    def __init__(self, initial=1.0, maximum=60.0, multiplier=2.0, jitter=0.5):
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter  # Fraction of the delay that is randomised (0 = none, 1 = full jitter)
+        self.attempts = 0
+
+    def next(self):
+        delay = min(self.initial * self.multiplier ** self.attempts, self.maximum)
+        self.attempts += 1
+        return delay * (1 - self.jitter * random.random())
+
+    def reset(self):
+        self.attempts = 0
+
+
+class SessionLog:
+    """
+    Sequence numbers for live telemetry. A session lasts as long as the client process,
+    across reconnects, so the backend can spot gaps (e.g. samples written into a dead
+    socket before the ping timeout noticed) and ask for them again with a "resend" command.
+    The last `window` samples sent are kept in memory for that.
+    """
+
+    def __init__(self, window=500):
+        self.session_id = uuid.uuid4().hex
+        self.next_seq = 1
+        self.sent = collections.deque(maxlen=window)  # (seq, timestamp, payload)
+
+    def record(self, samples):
+        """Assign consecutive sequence numbers to samples that were sent; returns the first one."""
+        first = self.next_seq
+        for timestamp, payload in samples:
+            self.sent.append((self.next_seq, timestamp, payload))
+            self.next_seq += 1
+        return first
+
+    def since(self, from_seq, to_seq=None):
+        """Sent samples with from_seq <= seq (<= to_seq), oldest first."""
+        return [entry for entry in self.sent
+                if entry[0] >= from_seq and (to_seq is None or entry[0] <= to_seq)]
+
+    def hello(self, resumed, **info):
+        """First message of every connection: lets the backend match it to earlier ones."""
+        return {
+            "event": "session",
+            "session_id": self.session_id,
+            "resumed": resumed,  # False on the first connection of this process
+            "next_seq": self.next_seq,
+            "replay_from": self.sent[0][0] if self.sent else self.next_seq,
+            **info,  # e.g. hal_backend, so simulated data is never mistaken for real
+        }
+
+
+async def run_until_first_exits(*coroutines):
+    """
+    Run the tasks of one connection together. When any of them finishes or fails (the
+    listener sees the close, a sender hits a dead socket) the others are cancelled, so
+    nothing keeps working against a connection that is gone. Re-raises the first error.
+    """
+    tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+
+class ConnectionManager:
+    """
+    Keeps one websocket connection to the backend open and runs `on_connect(websocket)`
+    for each connection until it returns or fails, then reconnects with a jittered
+    backoff. The backoff is only reset by a session that stayed up for stable_after
+    seconds, so a backend that accepts and immediately drops connections is retried
+    ever more slowly instead of about once a second.
+    Pings every ping_interval seconds and drops the connection if a pong is not back
+    within ping_timeout, so a dead link is noticed in seconds rather than at the next
+    TCP timeout.
+    Any other exception from on_connect (a codec or command handler bug) is logged and
+    treated like a dropped connection, so a backend-facing bug never ends run() and with
+    it the local acquisition and control tasks.
+    """
+
+    def __init__(self, uri, backoff=None, ping_interval=10.0, ping_timeout=5.0, open_timeout=10.0,
+                 close_timeout=2.0, stable_after=10.0, **connect_options):
+        self.uri = uri
+        self.backoff = backoff or Backoff()
+        self.stable_after = stable_after
+        self.connect_options = dict(
+            ping_interval=ping_interval,
+            ping_timeout=ping_timeout,
+            open_timeout=open_timeout,
+            close_timeout=close_timeout,
+            **connect_options,  # e.g. subprotocols, compression
+        )
+        self.connections = 0
+        metrics = get_registry()
+        self._connection_errors = metrics.counter("ws_connection_errors_total", "Failed or dropped connections")
+        self._connects = metrics.counter("ws_connects_total", "Successful connections to the backend")
+        self._reconnect_seconds = metrics.histogram("ws_reconnect_seconds", "Time from losing the backend to reconnecting")
+
+    async def run(self, on_connect):
+        disconnected = None  # Monotonic time the last connection was lost
+        while True:
+            try:
+                async with websockets.connect(self.uri, **self.connect_options) as websocket:
+                    connected = time.monotonic()
+                    self.connections += 1
+                    self._connects.inc()
+                    if disconnected is not None:
+                        self._reconnect_seconds.observe(time.monotonic() - disconnected)
+                    logger.info("Connected to %s", self.uri)
+                    try:
+                        await on_connect(websocket)
+                    finally:
+                        disconnected = time.monotonic()
+                        if disconnected - connected >= self.stable_after:
+                            self.backoff.reset()
+                logger.info("Connection to %s closed", self.uri)
+            except CONNECTION_ERRORS as e:
+                self._connection_errors.inc()
+                if disconnected is None:
+                    disconnected = time.monotonic()
+                logger.warning("Connection error: %s", e)
+            except Exception as e:
+                self._connection_errors.inc()
+                if disconnected is None:
+                    disconnected = time.monotonic()
+                logger.exception("Backend session failed: %s", e)
+            delay = self.backoff.next()
+            logger.info("Reconnecting in %.1f seconds", delay)
+            await asyncio.sleep(delay)
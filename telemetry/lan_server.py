@@ -0,0 +1,171 @@
+# telemetry/lan_server.py
+import hmac
+import http
+import json
+import logging
+import time
+import urllib.parse
+import websockets
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from telemetry.metrics import get_registry
+from telemetry.publisher import Sink
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ("readings", "events")
+
+
+class LanSink(Sink):
+    """Publisher sink that pushes every reading to the LAN clients subscribed to "readings"."""
+
+    def __init__(self, server, **options):
+        super().__init__("lan", **options)
+        self.server = server
+
+    async def write(self, samples):
+        for timestamp, payload in samples:
+            self.server.push("readings", {"type": "reading", "timestamp": timestamp, "payload": payload})
+
+
+class LanServer:
+    """
+    Read-only API for panels and tools on the local network, answered from state the Pi
+    already holds (reading cache, relay snapshot, rolling stats), so no request ever
+    triggers a sensor read.
+
+    HTTP:       GET /state, GET /<view> (JSON), GET /metrics (Prometheus text)
+    WebSocket:  connect to /ws and send
+                  {"action": "get_state"} or {"action": "get", "view": "stats"}
+                  {"action": "subscribe", "topics": ["readings", "events"]}
+                  {"action": "unsubscribe", "topics": [...]}
+                replies echo request_id; subscribers receive {"type": "reading"} for every
+                published reading and {"type": "event"} for pulse and EC control events.
+    `views` maps view names to functions returning JSON-serialisable data; /state combines
+    the "readings" and "actuators" views. Pushes use websockets.broadcast, which never
+    waits on a client: a client that stops reading is skipped rather than slowing the rest.
+    The server only listens on localhost unless `host` says otherwise. With a `token` set,
+    every HTTP request and websocket upgrade must carry it as "Authorization: Bearer <token>"
+    or "?token=<token>", and is refused with 401 otherwise.
+    """
+
+    def __init__(self, views, host="127.0.0.1", port=8765, metrics=None, token=None):
+        self.views = views
+        self.host = host
+        self.port = port
+        self.metrics = metrics  # Function returning the Prometheus text, or None
+        self.token = token  # Shared secret required from every client, or None for no auth
+        self.subscribers = {topic: set() for topic in TOPICS}
+        self._server = None
+        registry = get_registry()
+        registry.gauge_func("lan_clients", lambda: len(self._server.connections) if self._server else 0,
+                            "Connected LAN websocket clients")
+        self._requests = registry.counter("lan_requests_total", "Requests answered by the LAN API")
+
+    def state(self):
+        return {
+            "timestamp": time.time(),
+            "readings": self.views["readings"](),
+            "actuators": self.views["actuators"](),
+        }
+
+    def view(self, name):
+        if name == "state":
+            return self.state()
+        function = self.views.get(name)
+        if function is None:
+            raise ValueError(f"Unknown view: {name}")
+        return function()
+
+    async def start(self):
+        self._server = await serve(self._handle, self.host, self.port, process_request=self._process_request)
+        if self.token is None and self.host not in ("127.0.0.1", "::1", "localhost"):
+            logger.warning("LAN API listening on %s:%s without a token", self.host, self.port)
+        else:
+            logger.info("LAN API listening on %s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def push(self, topic, message):
+        """Send a message to every subscriber of a topic without waiting for any of them."""
+        connections = self.subscribers[topic]
+        if connections:
+            websockets.broadcast(connections, json.dumps(message))
+
+    async def push_event(self, event):
+        """Listener for pulse and EC control events."""
+        self.push("events", {"type": "event", **event})
+
+    def _authorized(self, request):
+        if self.token is None:
+            return True
+        supplied = request.headers.get("Authorization", "")
+        if supplied.startswith("Bearer "):
+            supplied = supplied[len("Bearer "):]
+        else:
+            query = urllib.parse.urlsplit(request.path).query
+            supplied = urllib.parse.parse_qs(query).get("token", [""])[0]
+        return hmac.compare_digest(supplied.encode("utf-8"), self.token.encode("utf-8"))
+
+    def _process_request(self, connection, request):
+        if not self._authorized(request):
+            return connection.respond(http.HTTPStatus.UNAUTHORIZED, "Missing or invalid token\n")
+        # Websocket upgrades go on to _handle; everything else is a plain HTTP GET
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return None
+        self._requests.inc()
+        name = request.path.split("?", 1)[0].strip("/") or "state"
+        if name == "metrics" and self.metrics is not None:
+            return connection.respond(http.HTTPStatus.OK, self.metrics())
+        try:
+            body = json.dumps(self.view(name))
+        except ValueError as e:
+            return connection.respond(http.HTTPStatus.NOT_FOUND, str(e) + "\n")
+        response = connection.respond(http.HTTPStatus.OK, body)
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+    async def _handle(self, websocket):
+        try:
+            async for message in websocket:
+                command = {}
+                try:
+                    command = json.loads(message)
+                    if not isinstance(command, dict):
+                        raise ValueError("Expected a JSON object")
+                    reply = self._command(websocket, command)
+                except (ValueError, TypeError) as e:
+                    reply = {"status": "error", "message": str(e)}
+                if isinstance(command, dict) and "request_id" in command:
+                    reply = {"request_id": command["request_id"], **reply}
+                await websocket.send(json.dumps(reply))
+        except ConnectionClosed:
+            pass
+        finally:
+            for connections in self.subscribers.values():
+                connections.discard(websocket)
+
+    def _command(self, websocket, command):
+        self._requests.inc()
+        action = command.get("action")
+        if action == "get_state":
+            return {"status": "state", "data": self.state()}
+        if action == "get":
+            view = command.get("view")
+            return {"status": "view", "view": view, "data": self.view(view)}
+        if action in ("subscribe", "unsubscribe"):
+            topics = command.get("topics", TOPICS)
+            for topic in topics:
+                if topic not in self.subscribers:
+                    raise ValueError(f"Unknown topic: {topic}")
+            for topic in topics:
+                if action == "subscribe":
+                    self.subscribers[topic].add(websocket)
+                else:
+                    self.subscribers[topic].discard(websocket)
+            return {"status": action + "d", "topics": sorted(t for t in TOPICS if websocket in self.subscribers[t])}
+        raise ValueError(f"Unknown action: {action}")
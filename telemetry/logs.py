@@ -0,0 +1,152 @@
+# telemetry/logs.py
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most `burst` records with the same logger and message template through per
+    `interval` seconds. Retry loops log the same template with different arguments, so they
+    are limited as one stream; the first record after a quiet period reports how many were
+    dropped. Only loggers under one of `loggers` (the noisy sensor retry loops by default)
+    are limited, and records at or above `exempt_level` never are, so relay audit lines and
+    safety errors always get through.
+    """
+
+    def __init__(self, burst=5, interval=60.0, exempt_level=logging.ERROR, loggers=("sensors",)):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.exempt_level = exempt_level
+        self.loggers = tuple(loggers)
+        self._streams = {}  # (logger, template) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def limits(self, name):
+        return any(name == prefix or name.startswith(prefix + ".") for prefix in self.loggers)
+
+    def filter(self, record):
+        if record.levelno >= self.exempt_level or not self.limits(record.name):
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None or now - stream[0] >= self.interval:
+                suppressed = stream[2] if stream is not None else 0
+                self._streams[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if stream[1] < self.burst:
+                stream[1] += 1
+                return True
+            stream[2] += 1
+            return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the queue is full. Records are
+    queued unformatted (the inherited prepare() would format them on the caller's thread),
+    so message arguments should not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        # A copy, so handlers further up the logger tree see the record unchanged
+        return copy.copy(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() also closes its handlers, so the log file is not left open."""
+
+    def stop(self):
+        super().stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+def configure_logging(log_config=None):
+    """
+    Route all logging through a bounded in-memory queue to a background thread that writes
+    human-readable lines to the console and JSON lines to a rotating file.
+    Callers only pay for a level check and a queue put; formatting and I/O happen on the
+    listener thread. Returns the QueueListener so it can be stopped (flushed and closed) on exit.
+    """
+    log_config = log_config or {}
+    handlers = []
+
+    console = logging.StreamHandler()
+    console.setLevel(log_config.get("console_level", "INFO"))
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handlers.append(console)
+
+    path = log_config.get("file", os.path.join("data", "client.log.jsonl"))
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=log_config.get("max_bytes", 1024 * 1024),
+            backupCount=log_config.get("backup_count", 5),
+        )
+        file_handler.setLevel(log_config.get("file_level", "INFO"))
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(log_config.get("queue_size", 10000))
+    queue_handler = _QueueHandler(log_queue)
+    rate_limit = log_config.get("rate_limit", {})
+    queue_handler.addFilter(RateLimitFilter(
+        burst=rate_limit.get("burst", 5),
+        interval=rate_limit.get("interval", 60.0),
+        exempt_level=logging.getLevelName(rate_limit.get("exempt_level", "ERROR")),
+        loggers=rate_limit.get("loggers", ["sensors"]),
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(log_config.get("level", "INFO"))
+    # Per-module overrides, e.g. {"websocket_client": "DEBUG"}
+    for name, level in log_config.get("levels", {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener = _QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
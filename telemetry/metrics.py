@@ -0,0 +1,206 @@
+# telemetry/metrics.py
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+# Default latency buckets in seconds: 1 ms to 30 s
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    __slots__ = ("value",)
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def sample(self):
+        return self.value
+
+
+class Gauge:
+    """Value that can go up and down."""
+
+    __slots__ = ("value",)
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def sample(self):
+        return self.value
+
+
+class CallbackMetric:
+    """Counter or gauge whose value is read from a function when metrics are collected."""
+
+    __slots__ = ("kind", "function")
+
+    def __init__(self, kind, function):
+        self.kind = kind
+        self.function = function
+
+    def sample(self):
+        return self.function()
+
+
+class Histogram:
+    """
+    Observations counted into fixed buckets (upper bounds, plus an implicit +Inf bucket).
+    Counts are kept per bucket in a preallocated array, so observe() only does a
+    binary search and two additions.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = array('d', sorted(buckets))
+        self.counts = array('Q', bytes(8 * (len(self.bounds) + 1)))
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def sample(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        buckets[math.inf] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class MetricsRegistry:
+    """
+    Named metrics with optional labels. Look a metric up once (for example in a driver's
+    __init__) and keep the returned object: updating it does not allocate or take a lock.
+    Updates from different threads are not synchronised, which at worst loses an increment
+    under contention; that is accepted for diagnostics.
+    """
+
+    def __init__(self):
+        self._families = {}  # name -> {"kind", "help", "children": {labels tuple: metric}}
+        self._lock = threading.Lock()
+
+    def _get(self, name, kind, help, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, {"kind": kind, "help": help, "children": {}})
+            if family["kind"] != kind:
+                raise ValueError(f"Metric {name} is already registered as a {family['kind']}")
+            metric = family["children"].get(key)
+            if metric is None:
+                metric = family["children"][key] = factory()
+            return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(name, "counter", help, labels, Counter)
+
+    def gauge(self, name, help="", **labels):
+        return self._get(name, "gauge", help, labels, Gauge)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(name, "histogram", help, labels, lambda: Histogram(buckets))
+
+    def counter_func(self, name, function, help="", **labels):
+        """Expose a count kept elsewhere (e.g. I2CBus.transactions) as a counter."""
+        metric = self._get(name, "counter", help, labels, lambda: CallbackMetric("counter", function))
+        metric.function = function  # The latest owner wins, so a recreated object is not shadowed by a stale one
+        return metric
+
+    def gauge_func(self, name, function, help="", **labels):
+        """Expose a value computed on demand (e.g. the telemetry backlog) as a gauge."""
+        metric = self._get(name, "gauge", help, labels, lambda: CallbackMetric("gauge", function))
+        metric.function = function
+        return metric
+
+    def snapshot(self):
+        """{name: [{"labels": {...}, "value": ...}]} for the get_metrics command."""
+        with self._lock:
+            families = {name: (family, list(family["children"].items())) for name, family in self._families.items()}
+        snapshot = {}
+        for name, (family, children) in families.items():
+            samples = []
+            for key, metric in children:
+                value = metric.sample()
+                if family["kind"] == "histogram":
+                    # JSON has no Infinity, so the +Inf bucket is keyed "+Inf"
+                    value = dict(value, buckets={("+Inf" if bound == math.inf else bound): count
+                                                 for bound, count in value["buckets"].items()})
+                samples.append({"labels": dict(key), "value": value})
+            snapshot[name] = samples
+        return snapshot
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            families = {name: (family, list(family["children"].items())) for name, family in self._families.items()}
+        lines = []
+        for name, (family, children) in sorted(families.items()):
+            if family["help"]:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for key, metric in children:
+                value = metric.sample()
+                if family["kind"] == "histogram":
+                    for bound, count in value["buckets"].items():
+                        le = "+Inf" if bound == math.inf else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {count}")
+                    lines.append(f"{name}_sum{_labels(key)} {value['sum']}")
+                    lines.append(f"{name}_count{_labels(key)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Write the Prometheus text atomically, for node_exporter's textfile collector."""
+        write_textfile(path, self.render_prometheus())
+
+
+def write_textfile(path, text):
+    """
+    Atomically replace `path` with already rendered exposition text. Callback metrics may
+    only be safe to sample on the event loop thread, so render there and hand just the
+    write to an executor.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    """Return the process-wide metrics registry."""
+    return _registry
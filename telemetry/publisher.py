@@ -0,0 +1,277 @@
+# telemetry/publisher.py
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+import websockets
+from telemetry.connection import CONNECTION_ERRORS, Backoff
+from telemetry.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+
+def coalesce(older, newer):
+    """Merge two payloads into one holding the latest value of every sensor and actuator."""
+    return {
+        "sensor_data": {**older.get("sensor_data", {}), **newer.get("sensor_data", {})},
+        "actuator_status": {**older.get("actuator_status", {}), **newer.get("actuator_status", {})},
+    }
+
+
+class Sink(ABC):
+    """
+    One consumer of published readings with its own bounded queue and worker task, so a
+    slow or unreachable sink only ever fills its own queue.
+    When the queue is full the policy decides what is lost:
+      drop_oldest  discard the oldest queued sample (keep the most recent data)
+      drop_newest  discard the incoming sample (keep a contiguous history)
+      coalesce     merge the incoming sample into the newest queued one (latest value per sensor)
+    The worker hands samples to write() in batches of up to batch_size, waiting at most
+    batch_interval seconds for a batch to fill (0 = send whatever is queued).
+    Subclasses implement `async write(samples)` with samples as [(timestamp, payload), ...].
+    """
+
+    def __init__(self, name, queue_size=1000, policy="drop_oldest", batch_size=1, batch_interval=0.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r} for sink {name} (expected one of {', '.join(POLICIES)})")
+        self.name = name
+        self.queue_size = queue_size
+        self.policy = policy
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._queue = collections.deque()
+        self._ready = asyncio.Event()
+        metrics = get_registry()
+        metrics.gauge_func("telemetry_sink_queue", lambda: len(self._queue), "Samples waiting for a sink", sink=name)
+        self._sent = metrics.counter("telemetry_sink_sent_total", "Samples written to a sink", sink=name)
+        self._dropped = metrics.counter("telemetry_sink_dropped_total", "Samples dropped or coalesced on a full queue", sink=name)
+        self._failures = metrics.counter("telemetry_sink_failures_total", "Failed sink writes", sink=name)
+        self._write_seconds = metrics.histogram("telemetry_sink_write_seconds", "Time to write one batch", sink=name)
+
+    def offer(self, timestamp, payload):
+        """Queue one sample without blocking."""
+        if len(self._queue) >= self.queue_size:
+            self._dropped.inc()
+            if self.policy == "drop_newest":
+                return
+            if self.policy == "coalesce":
+                _, older = self._queue.pop()
+                payload = coalesce(older, payload)
+            else:
+                self._queue.popleft()
+        self._queue.append((timestamp, payload))
+        self._ready.set()  # The worker decides whether to send now or wait for a fuller batch
+
+    def __len__(self):
+        return len(self._queue)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if len(self._queue) < self.batch_size and self.batch_interval:
+                deadline = loop.time() + self.batch_interval
+                while len(self._queue) < self.batch_size and loop.time() < deadline:
+                    try:
+                        await asyncio.wait_for(self._ready.wait(), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        break
+                    self._ready.clear()
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                started = time.perf_counter()
+                try:
+                    await self.write(batch)
+                except Exception as e:
+                    # The batch is lost for this sink; the others are unaffected
+                    self._failures.inc()
+                    logger.warning("Sink %s failed to write %d samples: %s", self.name, len(batch), e)
+                    break
+                self._write_seconds.observe(time.perf_counter() - started)
+                self._sent.inc(len(batch))
+
+    @abstractmethod
+    async def write(self, samples):
+        """Deliver one batch of [(timestamp, payload), ...]; raising drops the batch for this sink."""
+
+    async def close(self):
+        """Release resources once the worker has stopped."""
+
+
+class CallbackSink(Sink):
+    """Hands each sample to a coroutine(payload, timestamp), e.g. WebSocketClient.publish for the main backend."""
+
+    def __init__(self, name, callback, **options):
+        super().__init__(name, **options)
+        self.callback = callback
+
+    async def write(self, samples):
+        for timestamp, payload in samples:
+            await self.callback(payload, timestamp)
+
+
+class MemorySink(Sink):
+    """Keeps the last `keep` samples in memory, for in-process consumers and tests."""
+
+    def __init__(self, name, keep=1000, **options):
+        super().__init__(name, **options)
+        self.samples = collections.deque(maxlen=keep)
+
+    async def write(self, samples):
+        self.samples.extend(samples)
+
+
+def _json_lines(samples):
+    return "".join(json.dumps({"timestamp": timestamp, "payload": payload}) + "\n" for timestamp, payload in samples)
+
+
+class FileSink(Sink):
+    """Appends JSON lines to a local file (a simple historian); writes run in the default executor."""
+
+    def __init__(self, name, path, **options):
+        super().__init__(name, **options)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a')
+
+    def _append(self, text):
+        self._file.write(text)
+        self._file.flush()
+
+    async def write(self, samples):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._append, _json_lines(samples))
+
+    async def close(self):
+        self._file.close()
+
+
+class UnixSocketSink(Sink):
+    """Streams JSON lines to a local process over a UNIX socket, reconnecting on the next batch."""
+
+    def __init__(self, name, path, **options):
+        super().__init__(name, **options)
+        self.path = path
+        self._writer = None
+
+    async def write(self, samples):
+        if self._writer is None:
+            _, self._writer = await asyncio.open_unix_connection(self.path)
+        try:
+            self._writer.write(_json_lines(samples).encode("utf-8"))
+            await self._writer.drain()
+        except OSError:
+            self._writer.close()
+            self._writer = None
+            raise
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class WebSocketSink(Sink):
+    """
+    Sends batches to another websocket endpoint (e.g. a secondary site) as
+    {"type": "telemetry", "records": [...]} text frames. Only one connection attempt is made
+    per batch, with a jittered backoff between attempts; batches arriving while the endpoint
+    is unreachable are dropped for this sink.
+    """
+
+    def __init__(self, name, uri, open_timeout=5.0, ping_interval=10.0, ping_timeout=5.0, **options):
+        super().__init__(name, **options)
+        self.uri = uri
+        self.connect_options = dict(open_timeout=open_timeout, ping_interval=ping_interval, ping_timeout=ping_timeout)
+        self.backoff = Backoff()
+        self._retry_at = 0.0
+        self._websocket = None
+
+    async def write(self, samples):
+        loop = asyncio.get_running_loop()
+        if self._websocket is None:
+            if loop.time() < self._retry_at:
+                raise ConnectionError(f"{self.uri} unreachable, next attempt in {self._retry_at - loop.time():.1f} s")
+            try:
+                self._websocket = await websockets.connect(self.uri, **self.connect_options)
+                self.backoff.reset()
+            except CONNECTION_ERRORS:
+                self._retry_at = loop.time() + self.backoff.next()
+                raise
+        records = [{"timestamp": timestamp, "payload": payload} for timestamp, payload in samples]
+        try:
+            await self._websocket.send(json.dumps({"type": "telemetry", "records": records}))
+        except CONNECTION_ERRORS:
+            self._websocket = None
+            raise
+
+    async def close(self):
+        if self._websocket is not None:
+            await self._websocket.close()
+
+
+SINK_TYPES = {
+    "file": FileSink,
+    "unix": UnixSocketSink,
+    "websocket": WebSocketSink,
+    "memory": MemorySink,
+}
+
+
+class TelemetryPublisher:
+    """
+    Fans every reading out to all sinks. Sensors are sampled once; publish() only
+    appends the sample to each sink's queue and never waits for a sink.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self._tasks = []
+
+    @classmethod
+    def from_config(cls, sink_configs, primary=None):
+        """
+        Build the sinks listed in the "sinks" section of config.json ({"type": ..., "name": ...,
+        queue/batching options and type-specific settings}); entries with "enabled": false are skipped.
+        `primary` (the main backend) is always the first sink.
+        """
+        sinks = [primary] if primary is not None else []
+        for sink_config in sink_configs or []:
+            options = dict(sink_config)
+            if not options.pop("enabled", True):
+                continue
+            sink_type = options.pop("type")
+            sink_class = SINK_TYPES.get(sink_type)
+            if sink_class is None:
+                raise ValueError(f"Unknown sink type: {sink_type}")
+            sinks.append(sink_class(options.pop("name", sink_type), **options))
+        return cls(sinks)
+
+    def publish(self, payload, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        for sink in self.sinks:
+            sink.offer(timestamp, payload)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(sink.run()) for sink in self.sinks]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for sink in self.sinks:
+            try:
+                await sink.close()
+            except Exception as e:
+                logger.warning("Closing sink %s failed: %s", sink.name, e)
+
+    def status(self):
+        return {sink.name: {"queued": len(sink), "policy": sink.policy} for sink in self.sinks}
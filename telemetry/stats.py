@@ -0,0 +1,165 @@
+# telemetry/stats.py
+import math
+import time
+from array import array
+
+
+class _MonotonicQueue:
+    """Ring buffer of sample sequence numbers whose values stay monotonic (for sliding min/max)."""
+
+    __slots__ = ("seqs", "capacity", "head", "tail", "sign")
+
+    def __init__(self, capacity, sign):
+        self.seqs = array('q', bytes(8 * capacity))
+        self.capacity = capacity
+        self.head = 0  # Count of entries popped from the front
+        self.tail = 0  # Count of entries ever pushed (exclusive end)
+        self.sign = sign  # +1 keeps the maximum at the front, -1 the minimum
+
+    def push(self, seq, value, values, value_capacity):
+        sign = self.sign
+        while self.tail > self.head:
+            last = self.seqs[(self.tail - 1) % self.capacity]
+            if sign * values[last % value_capacity] > sign * value:
+                break
+            self.tail -= 1
+        self.seqs[self.tail % self.capacity] = seq
+        self.tail += 1
+
+    def expire(self, first_seq):
+        while self.tail > self.head and self.seqs[self.head % self.capacity] < first_seq:
+            self.head += 1
+
+    def front(self):
+        return self.seqs[self.head % self.capacity]
+
+
+class RollingWindow:
+    """
+    Time-bounded sliding window over one metric, backed by fixed-size arrays.
+    Count, mean and standard deviation come from running sums, min/max from monotonic
+    queues and the EWMA uses the window span as its time constant, so each sample costs O(1)
+    (amortised) and nothing is allocated per sample.
+    """
+
+    __slots__ = ("span", "capacity", "times", "values", "next_seq", "count", "total", "total_sq",
+                 "max_queue", "min_queue", "ewma", "last_time")
+
+    def __init__(self, span, capacity=1024):
+        self.span = span  # Window length in seconds
+        self.capacity = capacity  # Maximum samples held; the oldest are dropped beyond this
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.next_seq = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.max_queue = _MonotonicQueue(capacity, 1)
+        self.min_queue = _MonotonicQueue(capacity, -1)
+        self.ewma = None
+        self.last_time = None
+
+    def _drop_oldest(self):
+        old = self.values[(self.next_seq - self.count) % self.capacity]
+        self.total -= old
+        self.total_sq -= old * old
+        self.count -= 1
+
+    def expire(self, now):
+        """Drop samples older than the window span."""
+        cutoff = now - self.span
+        while self.count and self.times[(self.next_seq - self.count) % self.capacity] < cutoff:
+            self._drop_oldest()
+        first_seq = self.next_seq - self.count
+        self.max_queue.expire(first_seq)
+        self.min_queue.expire(first_seq)
+        if not self.count:
+            # Reset the sums so floating-point drift does not accumulate across empty periods
+            self.total = self.total_sq = 0.0
+
+    def push(self, now, value):
+        if self.count == self.capacity:
+            self._drop_oldest()
+            self.max_queue.expire(self.next_seq - self.count)
+            self.min_queue.expire(self.next_seq - self.count)
+        slot = self.next_seq % self.capacity
+        self.times[slot] = now
+        self.values[slot] = value
+        self.max_queue.push(self.next_seq, value, self.values, self.capacity)
+        self.min_queue.push(self.next_seq, value, self.values, self.capacity)
+        self.next_seq += 1
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            alpha = 1.0 - math.exp(-(now - self.last_time) / self.span)
+            self.ewma += alpha * (value - self.ewma)
+        self.last_time = now
+        self.expire(now)
+
+    def summary(self, now):
+        self.expire(now)
+        if not self.count:
+            return {"count": 0}
+        mean = self.total / self.count
+        variance = max(0.0, self.total_sq / self.count - mean * mean)
+        return {
+            "count": self.count,
+            "min": self.values[self.min_queue.front() % self.capacity],
+            "max": self.values[self.max_queue.front() % self.capacity],
+            "mean": mean,
+            "stddev": math.sqrt(variance),
+            "ewma": self.ewma,
+        }
+
+
+class MetricStats:
+    """The set of rolling windows kept for one sensor metric."""
+
+    __slots__ = ("windows",)
+
+    def __init__(self, spans, capacity):
+        self.windows = {label: RollingWindow(span, capacity) for label, span in spans.items()}
+
+    def push(self, now, value):
+        for window in self.windows.values():
+            window.push(now, value)
+
+    def summary(self, now):
+        return {label: window.summary(now) for label, window in self.windows.items()}
+
+
+class StatsRegistry:
+    """Rolling statistics for every numeric metric of every sensor, fed with each good reading."""
+
+    DEFAULT_WINDOWS = {"1m": 60, "15m": 900, "1h": 3600}
+
+    def __init__(self, windows=None, capacity=1024):
+        self.windows = windows or self.DEFAULT_WINDOWS
+        self.capacity = capacity
+        self.metrics = {}  # sensor name -> {metric name -> MetricStats}
+
+    def update(self, sensor_name, entry, now=None):
+        """Add one {"sensor_data": ..., "sensor_status": ...} reading."""
+        if entry.get("sensor_status") != "OK":
+            return
+        now = time.monotonic() if now is None else now
+        sensor_metrics = self.metrics.setdefault(sensor_name, {})
+        for metric, value in (entry.get("sensor_data") or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats = sensor_metrics.get(metric)
+                if stats is None:
+                    stats = sensor_metrics[metric] = MetricStats(self.windows, self.capacity)
+                stats.push(now, value)
+
+    def snapshot(self, sensor_name=None):
+        """{sensor: {metric: {window: summary}}}, for one sensor or all of them."""
+        now = time.monotonic()
+        sensor_names = self.metrics if sensor_name in (None, "all") else [sensor_name]
+        return {
+            name: {metric: stats.summary(now) for metric, stats in self.metrics.get(name, {}).items()}
+            for name in sensor_names
+        }
@@ -0,0 +1,34 @@
+# tests/support.py
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def write_config(workdir, **overrides):
+    """config.json on simulated hardware with every file the client writes kept in workdir."""
+    with open(os.path.join(REPO_ROOT, "config.json"), "r") as f:
+        config = json.load(f)
+    config["hal"] = {"backend": "sim", "sim": config.get("hal", {}).get("sim", {})}
+    config.setdefault("telemetry_buffer", {})["path"] = os.path.join(workdir, "telemetry.db")
+    config.setdefault("logging", {})["file"] = os.path.join(workdir, "client.log.jsonl")
+    config.update(overrides)
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+def make_client(workdir, **overrides):
+    import websocket_client
+    return websocket_client.WebSocketClient(write_config(workdir, **overrides))
+
+
+def close_client(client):
+    client.acquisition.shutdown()
+    client.buffer.close()
+    client.buffer.executor.shutdown()
+    client.log_listener.stop()
@@ -0,0 +1,131 @@
+# tests/test_acquisition.py
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from sensors.acquisition import SensorAcquisition
+from telemetry.stats import StatsRegistry
+
+
+class FakeSensor:
+    def __init__(self, value, delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.reads = 0
+        self.kwargs = []
+        self._lock = threading.Lock()
+
+    def read_value(self, **kwargs):
+        with self._lock:
+            self.reads += 1
+        self.kwargs.append(kwargs)
+        time.sleep(self.delay)
+        return dict(self.value)
+
+    def get_status(self):
+        return "OK"
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_joined_reads_are_recorded_once(self):
+        sensor = FakeSensor({"temperature": 21.5}, delay=0.1)
+        acquisition = SensorAcquisition({"T": sensor}, read_timeout=2)
+        stats = StatsRegistry()
+        acquisition.listeners.append(stats.update)
+        observed = acquisition._read_seconds["T"].count  # The histogram lives in the shared registry
+
+        async def read_three():
+            return await asyncio.gather(*(acquisition.read("T") for _ in range(3)))
+
+        try:
+            entries = asyncio.run(read_three())
+        finally:
+            acquisition.shutdown()
+        self.assertEqual([entry["sensor_data"]["temperature"] for entry in entries], [21.5] * 3)
+        self.assertEqual(sensor.reads, 1)
+        self.assertEqual(acquisition.cache.coalesced, 2)
+        self.assertEqual(acquisition._read_seconds["T"].count - observed, 1)
+        self.assertEqual(stats.snapshot("T")["T"]["temperature"]["1m"]["count"], 1)
+
+    def test_read_that_outlives_its_waiters_still_fills_the_cache(self):
+        sensor = FakeSensor({"temperature": 20.0}, delay=0.2)
+        acquisition = SensorAcquisition({"T": sensor}, read_timeout=0.05)
+
+        async def read_then_wait():
+            entry = await acquisition.read("T")
+            await asyncio.sleep(0.3)
+            return entry
+
+        try:
+            entry = asyncio.run(read_then_wait())
+        finally:
+            acquisition.shutdown()
+        self.assertEqual(entry["sensor_status"], "Timeout")
+        self.assertEqual(acquisition.cache.peek("T", 10)["sensor_data"], {"temperature": 20.0})
+
+
+class CycleDeadlineTest(unittest.TestCase):
+    def test_dependent_chain_stays_within_cycle_timeout(self):
+        upstream = FakeSensor({"temperature": 21.0}, delay=0.5)
+        derived = FakeSensor({"ec_value": 1.2}, delay=0.5)
+        acquisition = SensorAcquisition(
+            {"T": upstream, "EC": derived},
+            read_timeouts={"T": 0.45, "EC": 0.45},
+            cycle_timeout=0.6,
+            inputs={"EC": {"temperature": {"sensor": "T", "max_age": 0, "default": 25}}},
+        )
+
+        async def cycle():
+            started = time.perf_counter()
+            results = await acquisition.read_all()
+            return results, time.perf_counter() - started
+
+        try:
+            results, elapsed = asyncio.run(cycle())
+        finally:
+            acquisition.shutdown()
+        self.assertLess(elapsed, 0.75)
+        self.assertEqual(results["T"]["sensor_status"], "Timeout")
+        self.assertEqual(results["EC"]["sensor_status"], "Timeout")
+
+
+class InputCacheTest(unittest.TestCase):
+    def test_derived_read_within_max_age_reuses_cached_input(self):
+        upstream = FakeSensor({"temperature": 19.0}, delay=0.2)
+        derived = FakeSensor({"ec_value": 1.2})
+        acquisition = SensorAcquisition(
+            {"T": upstream, "EC": derived},
+            inputs={"EC": {"temperature": {"sensor": "T", "max_age": 150, "default": 25}}},
+        )
+
+        async def reads():
+            await acquisition.read("T")
+            started = time.perf_counter()
+            for _ in range(3):
+                await acquisition.read("EC")
+            return time.perf_counter() - started
+
+        try:
+            elapsed = asyncio.run(reads())
+        finally:
+            acquisition.shutdown()
+        self.assertEqual(upstream.reads, 1)  # No extra conversion per EC read
+        self.assertLess(elapsed, 0.15)
+        self.assertEqual(derived.kwargs, [{"temperature": 19.0}] * 3)
+
+    def test_shipped_inputs_outlive_their_upstream_interval(self):
+        with open(os.path.join(support.REPO_ROOT, "config.json")) as f:
+            config = json.load(f)
+        for sensor_name, inputs in config["sensor_inputs"].items():
+            for argument, spec in inputs.items():
+                upstream = config["sampling"].get(spec["sensor"], {})
+                interval = upstream.get("interval", config["sampling_interval"])
+                self.assertGreaterEqual(spec.get("max_age", 0), interval, f"{sensor_name}.{argument}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# tests/test_ads1115.py
+import time
+import unittest
+from array import array
+from unittest import mock
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from hal.sim import SimBackend  # noqa: E402
+from libs.ADS1115 import (ADS1115, ADS1115_REG_CONFIG_DR_8SPS, ADS1115_REG_CONFIG_DR_860SPS,  # noqa: E402
+                          ADS1115_REG_CONFIG_DR_128SPS, ADS1115_REG_CONFIG_MODE_SINGLE, dataRateFromSPS)
+from sensors import filters  # noqa: E402
+
+
+class CountingBus:
+    """SimSMBus wrapper that records config writes and OS bit polls."""
+
+    def __init__(self, smbus):
+        self.smbus = smbus
+        self.config_writes = []
+        self.polls = 0
+
+    def write_i2c_block_data(self, addr, register, data):
+        if register == 0x01:
+            self.config_writes.append(list(data))
+        self.smbus.write_i2c_block_data(addr, register, data)
+
+    def read_i2c_block_data(self, addr, register, length):
+        if register == 0x01:
+            self.polls += 1
+        return self.smbus.read_i2c_block_data(addr, register, length)
+
+
+def converter(channels=None, data_rate=ADS1115_REG_CONFIG_DR_128SPS):
+    backend = SimBackend({"seed": 1, "ads1115": {"channels": channels or {"72": {"0": 1000.0, "1": 500.0}},
+                                                 "noise_mv": 0.0, "i2c_latency": 0.0}})
+    bus = CountingBus(backend.SMBus(1))
+    return ADS1115(bus=bus, data_rate=data_rate), bus
+
+
+class SingleShotTest(unittest.TestCase):
+    def test_reads_the_selected_channel(self):
+        adc, _ = converter()
+        self.assertAlmostEqual(adc.readVoltage(0)["r"], 1000, delta=1)
+        self.assertAlmostEqual(adc.readVoltage(1)["r"], 500, delta=1)
+
+    def test_waits_for_the_os_bit_not_a_fixed_delay(self):
+        adc, bus = converter(data_rate=ADS1115_REG_CONFIG_DR_860SPS)
+        started = time.perf_counter()
+        adc.readVoltage(0)
+        elapsed = time.perf_counter() - started
+        self.assertGreaterEqual(bus.polls, 1)
+        self.assertLess(elapsed, 0.02)  # ~1.2 ms conversion, not the old fixed 100 ms sleep
+
+    def test_slow_data_rate_takes_its_conversion_time(self):
+        adc, _ = converter(data_rate=ADS1115_REG_CONFIG_DR_8SPS)
+        started = time.perf_counter()
+        adc.readVoltage(0)
+        self.assertGreaterEqual(time.perf_counter() - started, 1 / 8)
+
+    def test_every_read_starts_a_conversion(self):
+        adc, bus = converter()
+        adc.readVoltage(0)
+        adc.readVoltage(0)
+        self.assertEqual(len(bus.config_writes), 2)  # OS writes are never skipped as redundant
+        self.assertTrue(all(msb & 0x80 for msb, _ in bus.config_writes))
+
+    def test_missing_conversion_raises(self):
+        adc, _ = converter()
+        adc.conversionReady = lambda: False
+        with self.assertRaises(RuntimeError):
+            adc.readVoltage(0)
+
+    def test_data_rate_mapping(self):
+        self.assertEqual(dataRateFromSPS(860), ADS1115_REG_CONFIG_DR_860SPS)
+        with self.assertRaises(ValueError):
+            dataRateFromSPS(100)
+        with self.assertRaises(ValueError):
+            converter()[0].setDataRate(0x03)
+
+
+class BurstTest(unittest.TestCase):
+    def test_burst_fills_the_buffer_in_continuous_mode(self):
+        adc, bus = converter(data_rate=ADS1115_REG_CONFIG_DR_128SPS)
+        out = array("d", bytes(8 * 8))
+        started = time.perf_counter()
+        result = adc.readBurst(1, out, dr=ADS1115_REG_CONFIG_DR_860SPS)
+        elapsed = time.perf_counter() - started
+        self.assertIs(result, out)  # Filled in place, no new buffer
+        self.assertTrue(all(abs(value - 500.0) < 1.0 for value in out), list(out))
+        self.assertLess(elapsed, 8 * 1.1 / 128)  # Paced at the burst rate, not the single-shot rate
+        (start_msb, _), (end_msb, _) = bus.config_writes
+        self.assertFalse(start_msb & ADS1115_REG_CONFIG_MODE_SINGLE)  # Continuous for the burst
+        self.assertTrue(end_msb & ADS1115_REG_CONFIG_MODE_SINGLE)  # Back to power-down single-shot
+
+    def test_failed_burst_still_powers_down(self):
+        adc, bus = converter()
+        adc.readRaw = mock.Mock(side_effect=OSError(121, "Remote I/O error"))
+        with self.assertRaises(OSError):
+            adc.readBurst(0, array("d", bytes(8 * 4)))
+        self.assertTrue(bus.config_writes[-1][0] & ADS1115_REG_CONFIG_MODE_SINGLE)
+
+
+class FilterTest(unittest.TestCase):
+    samples = array("d", [1.0, 1.1, 0.9, 1.0, 9.0, 1.05, 0.95, 1.0, 1.0, -5.0])
+
+    def check(self):
+        self.assertAlmostEqual(filters.median(self.samples), 1.0)
+        self.assertAlmostEqual(filters.trimmed_mean(self.samples), 1.0, places=6)
+        minimum, maximum, std = filters.spread(self.samples)
+        self.assertEqual((minimum, maximum), (-5.0, 9.0))
+        self.assertGreater(std, 2.0)
+
+    def test_filters(self):
+        self.check()
+
+    def test_filters_without_numpy(self):
+        with mock.patch.object(filters, "np", None):
+            self.check()
+
+
+if __name__ == "__main__":
+    unittest.main()
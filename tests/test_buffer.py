@@ -0,0 +1,45 @@
+# tests/test_buffer.py
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from telemetry.buffer import TelemetryBuffer  # noqa: E402
+
+
+class AsyncBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.buffer = TelemetryBuffer(os.path.join(self.workdir.name, "telemetry.db"), commit_batch=2)
+        self.threads = set()
+        flush = self.buffer._flush
+
+        def recording_flush():
+            self.threads.add(threading.current_thread().name)
+            flush()
+        self.buffer._flush = recording_flush
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_round_trip_runs_on_the_buffer_thread(self):
+        async def scenario():
+            await self.buffer.extend([(float(i), {"i": i}) for i in range(5)])
+            records = await self.buffer.fetch(3)
+            await self.buffer.confirm(records[-1]["seq"])
+            remaining = await self.buffer.fetch(10)
+            await self.buffer.aclose()
+            return records, remaining
+
+        records, remaining = asyncio.run(scenario())
+        self.assertEqual([record["payload"]["i"] for record in records], [0, 1, 2])
+        self.assertEqual([record["payload"]["i"] for record in remaining], [3, 4])
+        self.assertEqual(len(self.buffer), 2)
+        self.assertTrue(self.threads)
+        self.assertTrue(all(name.startswith("telemetry-buffer") for name in self.threads), self.threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
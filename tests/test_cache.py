@@ -0,0 +1,57 @@
+# tests/test_cache.py
+import unittest
+from unittest import mock
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from sensors import cache  # noqa: E402
+from sensors.cache import ReadingCache  # noqa: E402
+
+OK = {"sensor_data": {"temperature": 21.5}, "sensor_status": "OK"}
+
+
+class ReadingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(cache.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ReadingCache()
+
+    def test_fresh_entry_is_a_hit_until_it_expires(self):
+        self.cache.put("DS18B20", OK)
+        self.now += 10
+        self.assertEqual(self.cache.get("DS18B20", max_age=10), OK)
+        self.now += 0.1
+        self.assertIsNone(self.cache.get("DS18B20", max_age=10))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_unknown_sensor_is_a_miss(self):
+        self.assertIsNone(self.cache.get("EC", max_age=60))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+    def test_failed_read_keeps_the_last_good_sample(self):
+        self.cache.put("DS18B20", OK)
+        self.now += 5
+        self.cache.put("DS18B20", {"sensor_data": None, "sensor_status": "ERROR"})
+        self.assertEqual(self.cache.get("DS18B20", max_age=60), OK)
+        self.assertEqual(self.cache.age("DS18B20"), 5)
+
+    def test_peek_and_snapshot_do_not_count(self):
+        self.cache.put("DS18B20", OK)
+        self.now += 3
+        self.assertEqual(self.cache.peek("DS18B20", max_age=60), OK)
+        self.assertIsNone(self.cache.peek("DS18B20", max_age=1))
+        self.assertEqual(self.cache.snapshot(), {"DS18B20": {**OK, "age": 3}})
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+
+    def test_stats_report_counters_and_ages(self):
+        self.cache.put("DS18B20", OK)
+        self.now += 2
+        self.cache.get("DS18B20", max_age=60)
+        self.cache.get("EC", max_age=60)
+        self.cache.coalesced += 1
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "coalesced": 1, "ages": {"DS18B20": 2}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# tests/test_calibration.py
+import asyncio
+import tempfile
+import unittest
+
+from support import close_client, make_client
+
+
+class CalibrationTemperatureTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.client = make_client(self.workdir.name)
+        self.used = []
+        self.client.sensors["EC"].calibrate = lambda temperature: self.used.append(temperature) or {"k": 1.0}
+
+    def tearDown(self):
+        close_client(self.client)
+        self.workdir.cleanup()
+
+    def calibrate(self, **command):
+        return asyncio.run(self.client._cmd_calibration(None, {"action": "calibrate", **command}))
+
+    def test_explicit_temperature(self):
+        reply = self.calibrate(temperature=21.5)
+        self.assertEqual((reply["temperature"], reply["temperature_source"]), (21.5, "command"))
+        self.assertEqual(self.used, [21.5])
+
+    def test_reads_probe_on_demand(self):
+        reply = self.calibrate()
+        self.assertEqual(reply["temperature_source"], "DS18B20")
+        self.assertEqual(self.used, [reply["temperature"]])
+        self.assertIsNotNone(self.client.acquisition.cache.peek("DS18B20", 5))
+
+    def test_zero_degrees_is_a_reading(self):
+        self.client.acquisition.cache.put("DS18B20", {"sensor_data": {"temperature": 0.0}, "sensor_status": "OK"})
+        reply = self.calibrate()
+        self.assertEqual((reply["temperature"], reply["temperature_source"]), (0.0, "DS18B20"))
+
+    def test_default_without_probe_value(self):
+        self.client.acquisition.cache.put("DS18B20", {"sensor_data": None, "sensor_status": "Error"})
+        self.client.acquisition.sensors["DS18B20"].read_value = lambda **kwargs: None
+        reply = self.calibrate()
+        self.assertEqual((reply["temperature"], reply["temperature_source"]), (25, "default"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+# tests/test_codec.py
+import asyncio
+import math
+import tempfile
+import unittest
+
+from support import close_client, make_client
+from telemetry.codec import (BinaryCodec, BinaryDecoder, DYNAMIC_ID_START, FLAG_SEQ, FLAG_ZLIB,
+                             JsonCodec, _HEADER)
+
+
+def payload(ec=1.42, rom=21.4):
+    return {
+        "sensor_data": {
+            "DHT22": {"sensor_data": {"temperature": 24.0, "humidity": 61.0}, "sensor_status": "OK"},
+            "DS18B20": {"sensor_data": {"temperature": 21.5, "28-0000abcd": rom}, "sensor_status": "OK"},
+            "EC": {"sensor_data": {"ec_value": ec, "temperature": None}, "sensor_status": "Timeout"},
+        },
+        "actuator_status": {"EC_Pump": "ON", "ECA": "OFF"},
+    }
+
+
+def flags(frame):
+    return _HEADER.unpack_from(frame, 0)[2]
+
+
+class BinaryRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.codec = BinaryCodec(batch_size=2)
+        self.decoder = BinaryDecoder()
+
+    def test_round_trip(self):
+        samples = [(1000.0, payload()), (1001.0, payload(ec=1.5))]
+        decoded = self.decoder.decode(self.codec.encode(samples, batch_id=7))
+        self.assertEqual((decoded["batch_id"], decoded["seq"]), (7, None))
+        self.assertEqual([record["timestamp"] for record in decoded["records"]], [1000.0, 1001.0])
+        first = decoded["records"][0]["payload"]
+        self.assertEqual(first["actuator_status"], {"EC_Pump": "ON", "ECA": "OFF"})
+        self.assertEqual(first["sensor_data"]["EC"]["sensor_status"], "Timeout")
+        self.assertIsNone(first["sensor_data"]["EC"]["sensor_data"]["temperature"])  # None -> NaN -> None
+        self.assertAlmostEqual(first["sensor_data"]["DS18B20"]["sensor_data"]["28-0000abcd"], 21.4, places=5)
+        self.assertAlmostEqual(decoded["records"][1]["payload"]["sensor_data"]["EC"]["sensor_data"]["ec_value"],
+                               1.5, places=5)
+
+    def test_dynamic_names_are_defined_once_per_session(self):
+        first = self.codec.encode([(1.0, payload())])
+        second = self.codec.encode([(2.0, payload(rom=22.0))])
+        n_defs = lambda frame: _HEADER.unpack_from(frame, 0)[4]
+        self.assertEqual(n_defs(first), 2)  # The ROM key and ECA
+        self.assertEqual(n_defs(second), 0)
+        self.assertEqual(self.codec._ids["28-0000abcd"], DYNAMIC_ID_START)
+        self.decoder.decode(first)
+        rom = self.decoder.decode(second)["records"][0]["payload"]["sensor_data"]["DS18B20"]["sensor_data"]
+        self.assertAlmostEqual(rom["28-0000abcd"], 22.0, places=5)
+
+    def test_unknown_dynamic_id_needs_its_definition(self):
+        self.codec.encode([(1.0, payload())])
+        with self.assertRaises(KeyError):
+            BinaryDecoder().decode(self.codec.encode([(2.0, payload())]))
+
+    def test_seq_flag(self):
+        frame = self.codec.encode([(1.0, payload())], seq=41)
+        self.assertTrue(flags(frame) & FLAG_SEQ)
+        self.assertEqual(self.decoder.decode(frame)["seq"], 41)
+        self.assertIsNone(self.decoder.decode(frame)["batch_id"])
+
+    def test_zlib_flag(self):
+        codec = BinaryCodec(batch_size=10, compress=True, compress_threshold=16)
+        samples = [(float(i), payload()) for i in range(10)]
+        frame = codec.encode(samples)
+        self.assertTrue(flags(frame) & FLAG_ZLIB)
+        self.assertLess(len(frame), len(BinaryCodec(batch_size=10).encode(samples)))
+        records = self.decoder.decode(frame)["records"]
+        self.assertEqual(len(records), 10)
+        self.assertEqual(records[9]["payload"]["actuator_status"]["EC_Pump"], "ON")
+
+    def test_small_frames_are_not_compressed(self):
+        codec = BinaryCodec(compress=True, compress_threshold=100000)
+        self.assertFalse(flags(codec.encode([(1.0, payload())])) & FLAG_ZLIB)
+
+    def test_nan_is_not_a_number(self):
+        frame = self.codec.encode([(1.0, {"sensor_data": {"EC": {"sensor_data": {"ec_value": math.nan}}}})])
+        self.assertIsNone(self.decoder.decode(frame)["records"][0]["payload"]["sensor_data"]["EC"]["sensor_data"]["ec_value"])
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class LiveBatchDelayTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.client = make_client(self.workdir.name)
+
+    def tearDown(self):
+        close_client(self.client)
+        self.workdir.cleanup()
+
+    def test_partial_batch_is_sent_after_max_batch_delay(self):
+        self.client.codec = BinaryCodec(batch_size=10)
+        self.client.max_batch_delay = 0.1
+        websocket = self.client.websocket = FakeWebSocket()
+
+        async def scenario():
+            await self.client.publish(payload(), timestamp=1.0)
+            await self.client.publish(payload(), timestamp=2.0)
+            self.assertEqual(websocket.sent, [])
+            await asyncio.sleep(0.2)
+
+        asyncio.run(scenario())
+        self.assertEqual(len(websocket.sent), 1)
+        decoded = BinaryDecoder().decode(websocket.sent[0])
+        self.assertEqual([record["timestamp"] for record in decoded["records"]], [1.0, 2.0])
+        self.assertEqual(decoded["seq"], 1)
+
+    def test_full_batch_is_sent_at_once(self):
+        self.client.codec = BinaryCodec(batch_size=2)
+        websocket = self.client.websocket = FakeWebSocket()
+
+        async def scenario():
+            await self.client.publish(payload(), timestamp=1.0)
+            await self.client.publish(payload(), timestamp=2.0)
+            return self.client._batch_timer
+
+        self.assertIsNone(asyncio.run(scenario()))
+        self.assertEqual(len(websocket.sent), 1)
+
+    def test_json_codec_sends_every_sample(self):
+        self.client.codec = JsonCodec()
+        websocket = self.client.websocket = FakeWebSocket()
+        asyncio.run(self.client.publish(payload(), timestamp=1.0))
+        self.assertEqual(len(websocket.sent), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
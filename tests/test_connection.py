@@ -0,0 +1,73 @@
+# tests/test_connection.py
+import asyncio
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from websockets.asyncio.server import serve  # noqa: E402
+from telemetry.connection import Backoff, ConnectionManager  # noqa: E402
+
+
+class FlappingBackendTest(unittest.TestCase):
+    """A backend that accepts and then drops every connection right away."""
+
+    def run_sessions(self, stable_after, sessions=4):
+        delays = []
+
+        async def scenario():
+            async def drop(websocket):
+                await websocket.close()
+
+            async with serve(drop, "127.0.0.1", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                backoff = Backoff(initial=0.01, maximum=1.0, jitter=0.0)
+                next_delay = backoff.next
+                backoff.next = lambda: delays.append(next_delay()) or 0.0
+                manager = ConnectionManager(f"ws://127.0.0.1:{port}", backoff=backoff, stable_after=stable_after)
+
+                async def on_connect(websocket):
+                    await websocket.wait_closed()
+
+                task = asyncio.create_task(manager.run(on_connect))
+                while manager.connections < sessions:
+                    await asyncio.sleep(0.01)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(asyncio.wait_for(scenario(), 10))
+        return delays
+
+    def test_short_sessions_keep_backing_off(self):
+        delays = self.run_sessions(stable_after=10.0)
+        self.assertEqual(delays[:3], [0.01, 0.02, 0.04])
+
+    def test_stable_sessions_reset_the_backoff(self):
+        delays = self.run_sessions(stable_after=0.0)
+        self.assertEqual(delays[:3], [0.01, 0.01, 0.01])
+
+
+class SessionBugTest(unittest.TestCase):
+    def test_failing_session_is_retried_not_raised(self):
+        async def scenario():
+            async def echo(websocket):
+                await websocket.wait_closed()
+
+            async with serve(echo, "127.0.0.1", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                manager = ConnectionManager(f"ws://127.0.0.1:{port}", backoff=Backoff(initial=0.01, jitter=0.0))
+
+                async def on_connect(websocket):
+                    raise RuntimeError("handler bug")
+
+                task = asyncio.create_task(manager.run(on_connect))
+                with self.assertLogs("telemetry.connection", "ERROR"):
+                    while manager.connections < 3 and not task.done():
+                        await asyncio.sleep(0.01)
+                self.assertFalse(task.done())
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(asyncio.wait_for(scenario(), 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# tests/test_dispatcher.py
+import asyncio
+import json
+import tempfile
+import unittest
+
+from support import close_client, make_client
+from commands.dispatcher import CommandDispatcher
+from telemetry.metrics import get_registry
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def replies(self):
+        return [json.loads(message) for message in self.sent]
+
+
+async def echo(websocket, command):
+    return {"status": "echo"}
+
+
+class DispatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = CommandDispatcher()
+        self.dispatcher.register("echo", echo)
+        self.websocket = FakeWebSocket()
+
+    def dispatch(self, command):
+        asyncio.run(self.dispatcher.dispatch(self.websocket, command))
+        return self.websocket.replies()[-1]
+
+    def test_non_object_commands_get_an_error_reply(self):
+        for command in ([1, 2], 5, "get_status", None):
+            self.assertEqual(self.dispatch(command), {"status": "error", "message": "Expected a JSON object"})
+
+    def test_unhashable_action_is_unknown(self):
+        self.assertEqual(self.dispatch({"action": ["echo"]})["status"], "error")
+
+    def test_unregistered_actions_share_one_label(self):
+        for i in range(5):
+            self.dispatch({"action": f"bogus-{i}", "request_id": i})
+        series = get_registry().render_prometheus()
+        self.assertNotIn('action="bogus-', series)
+        self.assertIn('ws_commands_total{action="unknown"}', series)
+
+    def test_registered_action_reply_echoes_request_id(self):
+        self.assertEqual(self.dispatch({"action": "echo", "request_id": "a"}), {"request_id": "a", "status": "echo"})
+
+
+class GetStatusTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.client = make_client(self.workdir.name)
+        self.websocket = FakeWebSocket()
+
+    def tearDown(self):
+        close_client(self.client)
+        self.workdir.cleanup()
+
+    def test_status_with_request_id_is_one_correlated_reply(self):
+        asyncio.run(self.client.handle_commands(self.websocket, {"action": "get_status", "request_id": 9}))
+        self.assertEqual(len(self.websocket.sent), 1)
+        reply = self.websocket.replies()[0]
+        self.assertEqual((reply["request_id"], reply["status"]), (9, "status"))
+        self.assertIn("EC_Pump", reply["data"]["actuator_status"])
+        self.assertIn("EC", reply["data"]["sensor_data"])
+
+    def test_status_without_request_id_is_the_payload(self):
+        asyncio.run(self.client.handle_commands(self.websocket, {"action": "get_status"}))
+        self.assertEqual(len(self.websocket.sent), 1)
+        self.assertIn("sensor_data", self.websocket.replies()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# tests/test_ds18b20_reporting.py
+import io
+import time
+import unittest
+from unittest import mock
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from hal import rpi  # noqa: E402
+from sensors.scheduler import SamplingScheduler  # noqa: E402
+
+
+class BulkConvertTest(unittest.TestCase):
+    """w1_bulk_convert against a fake therm_bulk_read that reports done after `converts_in` seconds."""
+
+    def convert(self, converts_in, timeout):
+        started = time.monotonic()
+
+        def fake_open(path, mode="r"):
+            if "w" in mode:
+                return io.StringIO()
+            done = time.monotonic() - started >= converts_in
+            return io.StringIO("1\n" if done else "-1\n")
+
+        with mock.patch.object(rpi.glob, "glob", return_value=["/sys/bus/w1/devices/w1_bus_master1/therm_bulk_read"]), \
+                mock.patch("hal.rpi.open", fake_open, create=True):
+            self.assertTrue(rpi.RPiBackend.w1_bulk_convert(None, timeout))
+        return time.monotonic() - started
+
+    def test_returns_as_soon_as_the_conversion_is_done(self):
+        self.assertLess(self.convert(converts_in=0.1, timeout=0.5), 0.3)
+
+    def test_stuck_conversion_is_bounded_by_one_timeout(self):
+        self.assertLess(self.convert(converts_in=10, timeout=0.3), 0.45)
+
+
+class PerRomDeadbandTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = SamplingScheduler(["DS18B20"], schedules={
+            "DS18B20": {"interval": 120, "deadband": {"temperature": 0.1, "*": 0.1}}})
+
+    def report(self, **sensor_data):
+        return self.scheduler.should_report("DS18B20", {"sensor_data": sensor_data, "sensor_status": "OK"}, now=0)
+
+    def test_secondary_rom_change_is_reported(self):
+        self.assertTrue(self.report(temperature=20.0, **{"28-a": 20.0, "28-b": 18.0}))
+        self.assertFalse(self.report(temperature=20.05, **{"28-a": 20.05, "28-b": 18.05}))
+        self.assertTrue(self.report(temperature=20.05, **{"28-a": 20.05, "28-b": 19.0}))
+
+    def test_missing_rom_is_reported(self):
+        self.assertTrue(self.report(temperature=20.0, **{"28-a": 20.0, "28-b": 18.0}))
+        self.assertTrue(self.report(temperature=20.0, **{"28-a": 20.0, "28-b": None}))
+
+    def test_without_wildcard_only_listed_metrics_count(self):
+        scheduler = SamplingScheduler(["DS18B20"], schedules={"DS18B20": {"deadband": {"temperature": 0.1}}})
+        entry = lambda rom: {"sensor_data": {"temperature": 20.0, "28-b": rom}, "sensor_status": "OK"}
+        self.assertTrue(scheduler.should_report("DS18B20", entry(18.0), now=0))
+        self.assertFalse(scheduler.should_report("DS18B20", entry(25.0), now=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+# tests/test_ec_dosing.py
+import asyncio
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from control.ec_dosing import ECDosingController
+
+
+class FakeAcquisition:
+    def __init__(self, ec=1.0, status="OK"):
+        self.ec = ec
+        self.status = status
+
+    async def read(self, sensor_name, max_age=None):
+        return {"sensor_data": {"ec_value": self.ec, "temperature": 22.0}, "sensor_status": self.status}
+
+
+class FakeRelays:
+    def __init__(self, **states):
+        self.states = {"ECA": "OFF", "ECB": "OFF", "MP": "ON", **states}
+
+    def snapshot(self):
+        return self.states
+
+
+class FakePulses:
+    def __init__(self, max_on_time=None):
+        self.pulses = []
+        self.limit = max_on_time
+        self.rejects = set()  # Pumps check() refuses
+        self.fails = set()  # Pumps pulse() refuses although check() passed
+
+    def max_on_time(self, name):
+        return self.limit
+
+    def check(self, name, duration_ms):
+        if name in self.rejects:
+            raise ValueError(f"Pulse queue for {name} is full (8 pending)")
+        return name
+
+    def pulse(self, name, duration_ms, request_id=None):
+        if name in self.fails:
+            raise ValueError(f"Pulse queue for {name} is full (8 pending)")
+        self.pulses.append((name, duration_ms))
+        return len(self.pulses)
+
+
+def controller(ec=1.0, pumps=("ECA",), pulses=None, **settings):
+    settings = dict(dict(enabled=True, setpoint=1.5, hysteresis=0.1, dose_ms=1000, mix_wait=60.0), **settings)
+    return ECDosingController(FakeAcquisition(ec), FakeRelays(), pulses or FakePulses(), pumps=list(pumps), **settings)
+
+
+def step(control):
+    return asyncio.run(control.step())
+
+
+class DosingTest(unittest.TestCase):
+    def test_doses_below_setpoint(self):
+        control = controller(ec=1.0)
+        wait = step(control)
+        self.assertEqual(control.pulses.pulses, [("ECA", 1000)])
+        self.assertEqual(control.last_event["action"], "dose")
+        self.assertAlmostEqual(wait, 61.0)
+
+    def test_no_dose_within_hysteresis(self):
+        control = controller(ec=1.45)
+        step(control)
+        self.assertEqual(control.pulses.pulses, [])
+        self.assertEqual(control.last_event["action"], "idle")
+
+
+class LockoutTest(unittest.TestCase):
+    def test_mix_wait_blocks_next_dose(self):
+        control = controller(ec=1.0)
+        step(control)
+        step(control)
+        self.assertEqual(len(control.pulses.pulses), 1)
+        self.assertEqual(control.last_event["reason"], "last dose still mixing")
+
+    def test_rate_limit(self):
+        control = controller(ec=1.0, max_doses_per_hour=2)
+        for _ in range(3):
+            step(control)
+            control.mixing_until = 0.0  # As if each dose had mixed in
+        self.assertEqual(len(control.pulses.pulses), 2)
+        self.assertEqual(control.last_event["reason"], "max_doses_per_hour reached")
+
+    def test_require_on(self):
+        control = controller(ec=1.0, require_on=["MP"])
+        control.relays.states["MP"] = "OFF"
+        step(control)
+        self.assertEqual(control.pulses.pulses, [])
+        self.assertEqual(control.last_event["reason"], "MP is not ON")
+
+    def test_failed_reading(self):
+        control = controller(ec=1.0)
+        control.acquisition.status = "Error"
+        step(control)
+        self.assertEqual(control.pulses.pulses, [])
+        self.assertEqual(control.last_event["action"], "interlock")
+
+    def test_above_max_ec_disables(self):
+        control = controller(ec=3.5, max_ec=3.0)
+        step(control)
+        self.assertEqual(control.pulses.pulses, [])
+        self.assertFalse(control.enabled)
+
+
+class MaxDoseTest(unittest.TestCase):
+    def test_pi_output_clamped_to_max_dose(self):
+        control = controller(ec=0.2, mode="pi", kp=10000.0, ki=0.0, max_dose_ms=2500)
+        step(control)
+        self.assertEqual(control.pulses.pulses, [("ECA", 2500)])
+
+    def test_pi_output_below_min_dose_is_skipped(self):
+        control = controller(ec=1.49, mode="pi", kp=2000.0, ki=0.0, min_dose_ms=100)
+        step(control)
+        self.assertEqual(control.pulses.pulses, [])
+
+
+    def test_max_dose_capped_at_pump_max_on_time(self):
+        control = controller(ec=0.2, mode="pi", kp=10000.0, ki=0.0, max_dose_ms=5000,
+                             pulses=FakePulses(max_on_time=2.0))
+        self.assertEqual(control.max_dose_ms, 2000)
+        step(control)
+        self.assertEqual(control.pulses.pulses, [("ECA", 2000)])
+        with self.assertRaises(ValueError):
+            control.configure({"max_dose_ms": 3000})
+
+
+class PartialDoseTest(unittest.TestCase):
+    def test_rejected_second_pump_doses_nothing(self):
+        control = controller(ec=1.0, pumps=("ECA", "ECB"))
+        control.pulses.rejects.add("ECB")
+        step(control)
+        self.assertEqual(control.pulses.pulses, [])
+        self.assertEqual(control.last_event["action"], "interlock")
+        self.assertEqual(control.doses, [])
+
+    def test_failing_second_pump_does_not_lead_to_a_redose(self):
+        control = controller(ec=1.0, pumps=("ECA", "ECB"))
+        control.pulses.fails.add("ECB")
+        wait = step(control)
+        self.assertAlmostEqual(wait, 61.0)  # The mix wait, not sample_interval
+        self.assertEqual(len(control.doses), 1)
+        control.pulses.fails.clear()
+        step(control)
+        self.assertEqual(control.pulses.pulses, [("ECA", 1000)])
+        self.assertEqual(control.last_event["reason"], "last dose still mixing")
+
+
+class ConfigureTest(unittest.TestCase):
+    def test_rejects_wrong_types_without_changing_anything(self):
+        control = controller()
+        for settings in ({"setpoint": "1.8"}, {"require_on": "MP"}, {"enabled": "yes"}, {"kp": None},
+                         {"dose_ms": -5}, {"require_on": ["NOPE"]}, {"setpoint": 5.0},
+                         {"min_dose_ms": 6000}, {"mode": "bang-bang"}, {"speed": 1}):
+            with self.assertRaises(ValueError, msg=settings):
+                control.configure(settings)
+        self.assertEqual(control.setpoint, 1.5)
+        self.assertEqual(control.require_on, [])
+
+    def test_accepts_valid_settings(self):
+        control = controller()
+        status = control.configure({"setpoint": 1.8, "require_on": ["MP"], "mode": "pi"})
+        self.assertEqual(status["setpoint"], 1.8)
+        self.assertEqual(control.require_on, ["MP"])
+
+    def test_invalid_config_is_rejected_at_startup(self):
+        with self.assertRaises(ValueError):
+            controller(setpoint="1.5")
+
+
+class RunTest(unittest.TestCase):
+    def test_crashing_step_disables_and_reports(self):
+        control = controller(ec=1.0)
+        events = []
+
+        async def listener(event):
+            events.append(event)
+
+        async def crash():
+            raise RuntimeError("boom")
+
+        control.listeners.append(listener)
+        control.step = crash
+
+        async def run_briefly():
+            task = asyncio.create_task(control.run())
+            await asyncio.sleep(0.05)
+            self.assertFalse(task.done())  # The loop survives and keeps idling
+            task.cancel()
+
+        asyncio.run(run_briefly())
+        self.assertFalse(control.enabled)
+        self.assertEqual(events[-1]["action"], "fault")
+
+
+if __name__ == "__main__":
+    unittest.main()
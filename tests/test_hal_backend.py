@@ -0,0 +1,44 @@
+# tests/test_hal_backend.py
+import os
+import unittest
+from unittest import mock
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from hal import backend  # noqa: E402
+
+
+class SelectBackendTest(unittest.TestCase):
+    def select(self, hal_config=None, env=None):
+        with mock.patch.dict(os.environ, {backend.BACKEND_ENV: env} if env else {}, clear=False):
+            if not env:
+                os.environ.pop(backend.BACKEND_ENV, None)
+            return backend.select_backend_name(hal_config)
+
+    def test_defaults_to_rpi(self):
+        self.assertEqual(self.select(), "rpi")
+        self.assertEqual(self.select({}), "rpi")
+
+    def test_sim_is_explicit(self):
+        self.assertEqual(self.select({"backend": "sim"}), "sim")
+        self.assertEqual(self.select({"backend": "rpi"}, env="sim"), "sim")
+
+    def test_auto_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.select({"backend": "auto"})
+
+    def test_rpi_off_the_pi_fails_loudly(self):
+        if backend.is_raspberry_pi():
+            self.skipTest("running on a Raspberry Pi")
+        with mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop(backend.BACKEND_ENV, None)
+            previous = backend._backend
+            try:
+                with mock.patch.dict("sys.modules", {"RPi": None, "RPi.GPIO": None}):
+                    with self.assertRaises(RuntimeError):
+                        backend.configure_backend({"backend": "rpi"})
+            finally:
+                backend._backend = previous
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_i2c_bus.py
+import os
+import threading
+import time
+import unittest
+
+os.environ.setdefault("ROBECTRON_HAL", "sim")
+import support  # noqa: F401,E402  (puts the repo root on sys.path)
+from libs.ADS1115 import ADS1115, ADS1115_IIC_ADDRESS0, ADS1115_IIC_ADDRESS1  # noqa: E402
+from libs.i2c_bus import I2CBus, get_i2c_bus  # noqa: E402
+
+
+class OverlapDetector:
+    """Stand-in SMBus that fails the test if two transactions ever overlap."""
+
+    def __init__(self):
+        self.inside = 0
+        self.overlaps = 0
+        self._count = threading.Lock()
+
+    def _transaction(self):
+        with self._count:
+            self.inside += 1
+            if self.inside > 1:
+                self.overlaps += 1
+        time.sleep(0.0005)
+        with self._count:
+            self.inside -= 1
+
+    def write_i2c_block_data(self, addr, register, data):
+        self._transaction()
+
+    def read_i2c_block_data(self, addr, register, length):
+        self._transaction()
+        return [0x80, 0x00][:length]  # OS bit set: conversion complete
+
+    def close(self):
+        pass
+
+
+class I2CBusTest(unittest.TestCase):
+    def test_one_manager_per_bus_number(self):
+        self.assertIs(get_i2c_bus(7), get_i2c_bus(7))
+        self.assertIsNot(get_i2c_bus(7), get_i2c_bus(8))
+
+    def test_transactions_are_serialised_and_counted(self):
+        bus = I2CBus(9)
+        bus.smbus = OverlapDetector()
+        converters = [ADS1115(addr, bus=bus) for addr in (ADS1115_IIC_ADDRESS0, ADS1115_IIC_ADDRESS1)]
+
+        def hammer(adc):
+            for _ in range(20):
+                adc.readVoltage(0)
+
+        threads = [threading.Thread(target=hammer, args=(adc,)) for adc in converters]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(bus.smbus.overlaps, 0)
+        self.assertGreaterEqual(bus.transactions, 2 * 20 * 3)  # Config write, OS poll and result per read
+
+    def test_io_errors_are_counted_and_raised(self):
+        bus = I2CBus(10)
+
+        class Failing(OverlapDetector):
+            def read_i2c_block_data(self, addr, register, length):
+                raise OSError(121, "Remote I/O error")
+
+        bus.smbus = Failing()
+        errors = bus.errors.value
+        with self.assertRaises(OSError):
+            bus.read_i2c_block_data(0x48, 0x00, 2)
+        self.assertEqual(bus.errors.value, errors + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# tests/test_lan_server.py
+import asyncio
+import json
+import unittest
+import urllib.error
+import urllib.request
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from websockets.asyncio.client import connect  # noqa: E402
+from websockets.exceptions import InvalidStatus  # noqa: E402
+from telemetry.lan_server import LanServer  # noqa: E402
+
+VIEWS = {"readings": lambda: {"EC": {"sensor_data": {"ec": 1.2}}}, "actuators": lambda: {"PH": "OFF"}}
+
+
+class LanServerTest(unittest.IsolatedAsyncioTestCase):
+    async def start(self, **options):
+        self.server = LanServer(VIEWS, port=0, **options)
+        await self.server.start()
+        self.addAsyncCleanup(self.server.stop)
+        host, port = list(self.server._server.sockets)[0].getsockname()[:2]
+        self.base = f"{host}:{port}"
+
+    async def get(self, path, headers=None):
+        def fetch():
+            request = urllib.request.Request(f"http://{self.base}{path}", headers=headers or {})
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    return response.status, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read()
+        return await asyncio.get_running_loop().run_in_executor(None, fetch)
+
+    async def test_listens_on_localhost_by_default(self):
+        await self.start()
+        self.assertEqual(self.server.host, "127.0.0.1")
+        self.assertTrue(self.base.startswith("127.0.0.1:"))
+        status, body = await self.get("/actuators")
+        self.assertEqual((status, json.loads(body)), (200, {"PH": "OFF"}))
+
+    async def test_token_is_required_for_http(self):
+        await self.start(token="s3cret")
+        self.assertEqual((await self.get("/state"))[0], 401)
+        self.assertEqual((await self.get("/state?token=wrong"))[0], 401)
+        self.assertEqual((await self.get("/state?token=s3cret"))[0], 200)
+        self.assertEqual((await self.get("/state", {"Authorization": "Bearer s3cret"}))[0], 200)
+
+    async def test_token_is_required_for_websocket(self):
+        await self.start(token="s3cret")
+        with self.assertRaises(InvalidStatus) as raised:
+            async with connect(f"ws://{self.base}/ws"):
+                pass
+        self.assertEqual(raised.exception.response.status_code, 401)
+        async with connect(f"ws://{self.base}/ws", additional_headers={"Authorization": "Bearer s3cret"}) as ws:
+            await ws.send(json.dumps({"action": "get", "view": "actuators", "request_id": 7}))
+            reply = json.loads(await ws.recv())
+        self.assertEqual(reply, {"request_id": 7, "status": "view", "view": "actuators", "data": {"PH": "OFF"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+# tests/test_logs.py
+import json
+import logging
+import os
+import queue
+import tempfile
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from telemetry.logs import RateLimitFilter, _QueueHandler, configure_logging
+
+
+def record(name, level=logging.WARNING, msg="Read failed: %s", args=("timeout",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class RateLimitFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.filter = RateLimitFilter(burst=2, interval=60.0)
+
+    def passed(self, name, level=logging.WARNING, count=5):
+        return sum(self.filter.filter(record(name, level)) for _ in range(count))
+
+    def test_limits_sensor_loggers(self):
+        self.assertEqual(self.passed("sensors.DS18B20"), 2)
+
+    def test_leaves_other_loggers_alone(self):
+        self.assertEqual(self.passed("relays.relay_bank"), 5)
+        self.assertEqual(self.passed("relays.pulse"), 5)
+        self.assertEqual(self.passed("sensorsfoo"), 5)
+
+    def test_errors_are_exempt(self):
+        self.assertEqual(self.passed("sensors.DS18B20", logging.ERROR), 5)
+
+    def test_reports_suppressed_count(self):
+        self.passed("sensors.DS18B20")
+        self.filter._streams[("sensors.DS18B20", "Read failed: %s")][0] -= 60.0
+        first = record("sensors.DS18B20")
+        self.assertTrue(self.filter.filter(first))
+        self.assertEqual(first.suppressed, 3)
+
+
+class QueueHandlerTest(unittest.TestCase):
+    def test_records_are_queued_unformatted(self):
+        log_queue = queue.Queue()
+        handler = _QueueHandler(log_queue)
+        original = record("sensors.DS18B20")
+        handler.handle(original)
+        queued = log_queue.get_nowait()
+        self.assertEqual(queued.msg, "Read failed: %s")
+        self.assertEqual(queued.args, ("timeout",))
+        self.assertEqual(queued.getMessage(), "Read failed: timeout")
+        self.assertIsNot(queued, original)
+
+
+class ConfigureLoggingTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "client.log.jsonl")
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        self.addCleanup(self._restore, root, saved_handlers, saved_level)
+        self.listener = configure_logging({"file": self.path, "console_level": "CRITICAL"})
+
+    @staticmethod
+    def _restore(root, handlers, level):
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    def test_stop_flushes_and_closes_the_log_file(self):
+        logging.getLogger("relays.pulse").warning("Pulse on %s cut short", "ECA")
+        self.listener.stop()
+        file_handler = self.listener.handlers[-1]
+        self.assertIsNone(file_handler.stream)
+        with open(self.path) as f:
+            entry = json.loads(f.readline())
+        self.assertEqual((entry["logger"], entry["msg"]), ("relays.pulse", "Pulse on ECA cut short"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# tests/test_metrics_export.py
+import asyncio
+import os
+import tempfile
+import unittest
+
+import support
+
+
+class MetricsExportTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.textfile = os.path.join(self.workdir, "metrics", "robectron.prom")
+        self.client = support.make_client(self.workdir, metrics={"textfile": self.textfile, "export_interval": 15})
+
+    def tearDown(self):
+        support.close_client(self.client)
+
+    def test_export_cycle_writes_textfile(self):
+        self.client.buffer.append({"sensor_data": {}, "actuator_status": {}})
+
+        async def export():
+            await self.client.export_metrics(asyncio.get_running_loop())
+
+        asyncio.run(export())
+        with open(self.textfile) as f:
+            text = f.read()
+        self.assertIn("# TYPE telemetry_backlog_records gauge", text)
+        self.assertIn("telemetry_backlog_records 1", text)
+
+    def test_backlog_count_tracks_flush_and_ack(self):
+        buffer = self.client.buffer
+        for i in range(7):
+            buffer.append({"i": i})
+        buffer.flush()
+        self.assertEqual(len(buffer), 7)
+        records = buffer.fetch_batch(3)
+        buffer.ack(records[-1]["seq"])
+        self.assertEqual(len(buffer), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
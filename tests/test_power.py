@@ -0,0 +1,64 @@
+# tests/test_power.py
+import os
+import unittest
+
+os.environ.setdefault("ROBECTRON_HAL", "sim")
+import support  # noqa: F401,E402  (puts the repo root on sys.path)
+from sensors.power import PowerScheduler  # noqa: E402
+
+
+class PowerSchedulerKeepHotTest(unittest.TestCase):
+    def setUp(self):
+        # Mirrors config.json: EC samples every 60 s (5 s while dosing), DS18B20 every 120 s
+        self.power = PowerScheduler(sampling_interval=60, keep_hot_factor=10.0,
+                                    intervals={"EC": 60, "DS18B20": 120})
+        self.ec = self.power.register("EC", 91, warmup=1.0)
+        self.ds = self.power.register("DS18B20", 92, warmup=0.5)
+        self.ec_rail = self.power.sensor_rails["EC"]
+        self.ds_rail = self.power.sensor_rails["DS18B20"]
+
+    def test_rails_follow_their_own_sensor_interval(self):
+        self.assertFalse(self.ec_rail.keep_hot)
+        self.assertFalse(self.ds_rail.keep_hot)
+        self.assertIsNone(self.ec_rail.powered_at)
+
+    def test_fast_mode_keeps_the_rail_hot_until_it_ends(self):
+        self.power.set_interval("EC", 5)
+        self.assertTrue(self.ec_rail.keep_hot)
+        self.assertEqual(self.ec_rail.relay.get_status(), "ON")
+        self.assertFalse(self.ds_rail.keep_hot)
+
+        self.power.hold(["EC"])
+        self.power.release(["EC"])
+        self.assertEqual(self.ec_rail.relay.get_status(), "ON")
+        self.assertEqual(self.ec_rail.switches, 1)
+
+        self.power.set_interval("EC", 60)
+        self.assertFalse(self.ec_rail.keep_hot)
+        self.assertEqual(self.ec_rail.relay.get_status(), "OFF")
+
+    def test_slow_rail_is_cycled_per_window(self):
+        for _ in range(2):
+            self.power.hold(["DS18B20"])
+            self.assertEqual(self.ds_rail.relay.get_status(), "ON")
+            self.power.release(["DS18B20"])
+            self.assertEqual(self.ds_rail.relay.get_status(), "OFF")
+        self.assertEqual(self.ds_rail.switches, 2)
+
+    def test_leaving_keep_hot_mid_window_waits_for_the_release(self):
+        self.power.set_interval("EC", 5)
+        self.power.hold(["EC"])
+        self.power.set_interval("EC", 60)
+        self.assertEqual(self.ec_rail.relay.get_status(), "ON")
+        self.power.release(["EC"])
+        self.assertEqual(self.ec_rail.relay.get_status(), "OFF")
+
+    def test_shared_rail_uses_the_fastest_sensor(self):
+        power = PowerScheduler(sampling_interval=60, keep_hot_factor=10.0, intervals={"A": 300, "B": 5})
+        power.register("A", 93, warmup=1.0)
+        power.register("B", 93, warmup=0.0)
+        self.assertTrue(power.sensor_rails["A"].keep_hot)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+# tests/test_publisher.py
+import asyncio
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from telemetry.publisher import MemorySink, Sink, TelemetryPublisher  # noqa: E402
+
+
+def reading(**sensor_data):
+    return {"sensor_data": sensor_data, "actuator_status": {}}
+
+
+class FailingSink(Sink):
+    async def write(self, samples):
+        raise ConnectionError("endpoint down")
+
+
+class StalledSink(Sink):
+    """Never finishes a write, like an endpoint that stopped reading."""
+
+    def __init__(self, name, **options):
+        super().__init__(name, **options)
+        self.started = asyncio.Event()
+
+    async def write(self, samples):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+class SinkContractTest(unittest.TestCase):
+    def test_write_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Sink("abstract")
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            MemorySink("test-bad-policy", policy="drop_all")
+
+
+class OverflowPolicyTest(unittest.TestCase):
+    def fill(self, policy):
+        sink = MemorySink(f"test-{policy}", queue_size=2, policy=policy)
+        for value in range(4):
+            sink.offer(value, reading(**{f"s{value}": value}))
+        return [(timestamp, payload["sensor_data"]) for timestamp, payload in sink._queue]
+
+    def test_drop_oldest_keeps_the_latest_samples(self):
+        self.assertEqual(self.fill("drop_oldest"), [(2, {"s2": 2}), (3, {"s3": 3})])
+
+    def test_drop_newest_keeps_the_earliest_samples(self):
+        self.assertEqual(self.fill("drop_newest"), [(0, {"s0": 0}), (1, {"s1": 1})])
+
+    def test_coalesce_merges_into_the_newest_sample(self):
+        self.assertEqual(self.fill("coalesce"), [(0, {"s0": 0}), (3, {"s1": 1, "s2": 2, "s3": 3})])
+
+    def test_coalesce_keeps_the_latest_value_per_sensor(self):
+        sink = MemorySink("test-coalesce-latest", queue_size=1, policy="coalesce")
+        sink.offer(0, reading(ec=1.0, ph=6.0))
+        sink.offer(1, reading(ec=1.2))
+        self.assertEqual([payload["sensor_data"] for _, payload in sink._queue], [{"ec": 1.2, "ph": 6.0}])
+
+    def test_drops_are_counted(self):
+        sink = MemorySink("test-drop-count", queue_size=1)
+        before = sink._dropped.value
+        for value in range(3):
+            sink.offer(value, reading(ec=value))
+        self.assertEqual(sink._dropped.value - before, 2)
+
+
+class SinkIsolationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.memory = MemorySink("test-isolation-memory")
+        self.failing = FailingSink("test-isolation-failing")
+        self.stalled = StalledSink("test-isolation-stalled", queue_size=2)
+        self.publisher = TelemetryPublisher([self.failing, self.stalled, self.memory])
+        self.publisher.start()
+
+    async def asyncTearDown(self):
+        await self.publisher.stop()
+
+    async def test_failing_and_stalled_sinks_do_not_hold_back_the_others(self):
+        failures = self.failing._failures.value
+        self.publisher.publish(reading(ec=1.0), timestamp=0)
+        await asyncio.wait_for(self.stalled.started.wait(), 1)
+        for value in range(1, 5):
+            self.publisher.publish(reading(ec=float(value)), timestamp=value)
+            await asyncio.sleep(0)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        self.assertEqual([timestamp for timestamp, _ in self.memory.samples], [0, 1, 2, 3, 4])
+        self.assertEqual(self.failing._failures.value - failures, 5)
+        self.assertEqual(len(self.stalled), 2)  # Bounded by its own queue, the rest dropped
+
+    async def test_failing_sink_keeps_serving_later_samples(self):
+        sent = self.failing._sent.value
+        self.publisher.publish(reading(ec=1.0), timestamp=0)
+        await asyncio.sleep(0.01)
+        self.publisher.publish(reading(ec=2.0), timestamp=1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.failing), 0)
+        self.assertEqual(self.failing._sent.value, sent)
+        self.assertEqual(len(self.memory.samples), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
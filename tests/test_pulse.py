@@ -0,0 +1,81 @@
+# tests/test_pulse.py
+import asyncio
+import os
+import time
+import unittest
+
+os.environ.setdefault("ROBECTRON_HAL", "sim")
+import support  # noqa: F401,E402  (puts the repo root on sys.path)
+from relays.pulse import PulseScheduler  # noqa: E402
+from relays.relay_bank import RelayBank  # noqa: E402
+
+
+class WatchdogTest(unittest.TestCase):
+    def setUp(self):
+        self.bank = RelayBank({"ECA": 18, "MP": 20})
+        self.pulses = PulseScheduler(self.bank, max_on_times={"ECA": 0.3})
+
+    def tearDown(self):
+        self.pulses.shutdown()
+
+    def test_repeated_activate_does_not_extend_max_on_time(self):
+        self.bank.apply({"ECA": True})
+        self.pulses.arm_watchdog("ECA")
+        started = time.monotonic()
+        while self.bank.status("ECA") == "ON" and time.monotonic() - started < 1.0:
+            self.bank.apply({"ECA": True})
+            self.pulses.arm_watchdog("ECA")  # Backend repeating activate
+            time.sleep(0.05)
+        self.assertEqual(self.bank.status("ECA"), "OFF")
+        self.assertLess(time.monotonic() - started, 0.45)
+
+    def test_can_rearm_after_expiry(self):
+        self.bank.apply({"ECA": True})
+        self.pulses.arm_watchdog("ECA")
+        time.sleep(0.4)
+        self.assertEqual(self.bank.status("ECA"), "OFF")
+        self.bank.apply({"ECA": True})
+        self.pulses.arm_watchdog("ECA")
+        time.sleep(0.4)
+        self.assertEqual(self.bank.status("ECA"), "OFF")
+
+
+class WatchdogEventTest(unittest.TestCase):
+    def setUp(self):
+        self.bank = RelayBank({"ECA": 18, "MP": 20})
+        self.pulses = PulseScheduler(self.bank, max_on_times={"ECA": 0.3})
+        self.events = []
+
+        async def listener(event):
+            self.events.append(event)
+        self.pulses.listeners.append(listener)
+
+    def tearDown(self):
+        self.pulses.shutdown()
+
+    def test_forced_off_activation_is_reported(self):
+        async def scenario():
+            self.bank.apply({"ECA": True})
+            self.pulses.arm_watchdog("ECA")
+            await asyncio.sleep(0.45)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.bank.status("ECA"), "OFF")
+        self.assertEqual([(e["status"], e["actuator"]) for e in self.events], [("watchdog", "ECA")])
+
+    def test_pulse_cut_short_by_a_stalled_loop_is_not_completed(self):
+        async def scenario():
+            pulse_id = self.pulses.pulse("ECA", 250, request_id="r1")
+            await asyncio.sleep(0.01)  # The pulse starts
+            time.sleep(0.4)  # Loop stalled past the max on-time: only the watchdog can switch it off
+            self.assertEqual(self.bank.status("ECA"), "OFF")
+            await asyncio.sleep(0.05)
+            return pulse_id
+
+        pulse_id = asyncio.run(scenario())
+        statuses = [(e["status"], e["pulse_id"], e["request_id"]) for e in self.events]
+        self.assertEqual(statuses, [("watchdog", pulse_id, "r1"), ("cancelled", pulse_id, "r1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
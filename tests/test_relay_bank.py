@@ -0,0 +1,69 @@
+# tests/test_relay_bank.py
+import os
+import unittest
+
+os.environ.setdefault("ROBECTRON_HAL", "sim")
+import support  # noqa: F401,E402  (puts the repo root on sys.path)
+from relays.relay_bank import RelayBank  # noqa: E402
+
+
+class RelayBankTest(unittest.TestCase):
+    def setUp(self):
+        self.bank = RelayBank({"PH": 17, "ECA": 18, "MP": 20}, aliases={"EC_Pump": "ECA"})
+        self.gpio = self.bank.gpio
+        self.writes = self.gpio.writes
+
+    def tearDown(self):
+        self.bank.cleanup()
+
+    def test_batched_apply_writes_only_changed_pins_once(self):
+        self.bank.apply({"PH": True})
+        self.gpio.writes = self.writes = 0
+        changed = self.bank.apply({"PH": "ON", "ECA": "ON", "MP": "on"})
+        self.assertEqual(changed, ["ECA", "MP"])
+        self.assertEqual(self.gpio.writes, 1)
+        self.assertEqual(self.bank.state, 0b111)
+        self.assertEqual([self.gpio.pins[pin] for pin in (17, 18, 20)], [1, 1, 1])
+
+    def test_unchanged_apply_writes_nothing(self):
+        self.assertEqual(self.bank.apply({"PH": "OFF"}), [])
+        self.assertEqual(self.gpio.writes, self.writes)
+
+    def test_aliases_switch_their_channel(self):
+        self.assertEqual(self.bank.canonical("EC_Pump"), "ECA")
+        self.assertEqual(self.bank.apply({"EC_Pump": True}), ["ECA"])
+        self.assertEqual(self.bank.status("ECA"), "ON")
+        self.assertEqual(self.bank.snapshot()["EC_Pump"], "ON")
+        self.assertEqual(self.bank.apply({"ECA": False}), ["ECA"])
+        self.assertEqual(self.bank.channel("EC_Pump").get_status(), "OFF")
+
+    def test_invalid_change_writes_nothing(self):
+        for changes in ({"PH": True, "NOPE": True}, {"PH": "maybe"}):
+            with self.assertRaises(ValueError):
+                self.bank.apply(changes)
+        self.assertEqual(self.bank.state, 0)
+        self.assertEqual(self.gpio.writes, self.writes)
+
+    def test_return_value_tells_a_watchdog_whether_it_switched_anything(self):
+        self.bank.apply({"ECA": True})
+        self.assertEqual(self.bank.apply({"ECA": False}), ["ECA"])
+        self.assertFalse(self.bank.apply({"ECA": False}))  # Already off: nothing to report
+
+    def test_snapshot_is_replaced_not_mutated(self):
+        before = self.bank.snapshot()
+        self.bank.apply({"MP": True})
+        self.assertEqual(before["MP"], "OFF")
+        self.assertEqual(self.bank.snapshot()["MP"], "ON")
+
+    def test_alias_to_unknown_channel_is_rejected(self):
+        with self.assertRaises(ValueError):
+            RelayBank({"PH": 17}, aliases={"EC_Pump": "ECA"})
+
+    def test_from_config_leaves_out_reserved_pins(self):
+        bank = RelayBank.from_config({"channels": {"PH": 17, "DS": 4}, "aliases": {"Probe": "DS"}}, reserved_pins=(4,))
+        self.assertEqual(bank.names, ["PH"])
+        self.assertNotIn("Probe", bank.bits)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# tests/test_relay_notify.py
+import asyncio
+import tempfile
+import unittest
+
+from support import close_client, make_client
+
+
+class RelayNotifyTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.client = make_client(self.workdir.name)
+
+    def tearDown(self):
+        self.client.pulses.shutdown()
+        close_client(self.client)
+        self.workdir.cleanup()
+
+    def test_loop_change_wakes_sampler(self):
+        async def scenario():
+            self.client._schedule_changed.clear()
+            self.client.relays.apply({"EC_Pump": True})
+            return self.client._schedule_changed.is_set()
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_watchdog_thread_change_wakes_sampler(self):
+        async def scenario():
+            self.client._loop = asyncio.get_running_loop()
+            self.client._schedule_changed.clear()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.client.relays.apply, {"EC_Pump": True})
+            await asyncio.wait_for(self.client._schedule_changed.wait(), 1.0)
+        asyncio.run(scenario())
+
+    def test_unchanged_apply_does_not_wake(self):
+        async def scenario():
+            self.client.relays.apply({"EC_Pump": False})
+            self.client._schedule_changed.clear()
+            self.client.relays.apply({"EC_Pump": False})
+            return self.client._schedule_changed.is_set()
+        self.assertFalse(asyncio.run(scenario()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# tests/test_scheduler.py
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from sensors.scheduler import SamplingScheduler  # noqa: E402
+
+SCHEDULES = {
+    "DHT22": {"interval": 300, "deadband": {"temperature": 0.2, "humidity": 1.0}, "max_silence": 900},
+    "DS18B20": {"interval": 120, "deadband": {"temperature": 0.1, "*": 0.1}},
+    "EC": {"interval": 60, "fast_interval": 5, "fast_when": ["EC_Pump"]},
+}
+
+
+def ok(**sensor_data):
+    return {"sensor_data": sensor_data, "sensor_status": "OK"}
+
+
+class SamplingIntervalTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = SamplingScheduler(["DHT22", "DS18B20", "EC", "pH"], default_interval=30,
+                                           schedules=SCHEDULES)
+
+    def test_everything_is_due_at_start(self):
+        self.assertEqual(self.scheduler.due({}, now=0), ["DHT22", "DS18B20", "EC", "pH"])
+
+    def test_sensor_without_schedule_uses_the_default_interval(self):
+        self.assertEqual(self.scheduler.interval_for("pH", {}), 30)
+
+    def test_fast_mode_follows_the_actuator(self):
+        self.assertEqual(self.scheduler.interval_for("EC", {"EC_Pump": "OFF"}), 60)
+        self.assertEqual(self.scheduler.interval_for("EC", {"EC_Pump": "ON"}), 5)
+
+    def test_due_and_seconds_until_next(self):
+        self.scheduler.mark_sampled(["DHT22", "DS18B20", "EC", "pH"], now=100)
+        self.assertEqual(self.scheduler.due({}, now=159), ["pH"])
+        self.assertEqual(self.scheduler.seconds_until_next({}, now=100), 30)
+        self.assertEqual(self.scheduler.due({"EC_Pump": "ON"}, now=105), ["EC"])
+        self.assertEqual(self.scheduler.seconds_until_next({}, now=500), 0.0)
+
+
+class DeadbandTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = SamplingScheduler(["DHT22", "DS18B20", "EC"], schedules=SCHEDULES)
+
+    def test_first_sample_is_always_reported(self):
+        self.assertTrue(self.scheduler.should_report("DHT22", ok(temperature=20.0, humidity=50.0), now=0))
+
+    def test_change_must_exceed_the_threshold(self):
+        self.scheduler.should_report("DHT22", ok(temperature=20.0, humidity=50.0), now=0)
+        self.assertFalse(self.scheduler.should_report("DHT22", ok(temperature=20.2, humidity=50.5), now=1))
+        self.assertTrue(self.scheduler.should_report("DHT22", ok(temperature=20.0, humidity=51.5), now=2))
+
+    def test_small_changes_do_not_move_the_reference(self):
+        self.scheduler.should_report("DHT22", ok(temperature=20.0, humidity=50.0), now=0)
+        self.assertFalse(self.scheduler.should_report("DHT22", ok(temperature=20.15, humidity=50.0), now=1))
+        self.assertTrue(self.scheduler.should_report("DHT22", ok(temperature=20.3, humidity=50.0), now=2))
+
+    def test_status_change_is_reported(self):
+        self.scheduler.should_report("DHT22", ok(temperature=20.0, humidity=50.0), now=0)
+        self.assertTrue(self.scheduler.should_report(
+            "DHT22", {"sensor_data": None, "sensor_status": "ERROR"}, now=1))
+
+    def test_max_silence_forces_a_report(self):
+        entry = ok(temperature=20.0, humidity=50.0)
+        self.scheduler.should_report("DHT22", entry, now=0)
+        self.assertFalse(self.scheduler.should_report("DHT22", entry, now=899))
+        self.assertTrue(self.scheduler.should_report("DHT22", entry, now=900))
+        self.assertFalse(self.scheduler.should_report("DHT22", entry, now=901))
+
+    def test_without_deadband_every_sample_is_reported(self):
+        self.assertTrue(self.scheduler.should_report("EC", ok(ec=1.2), now=0))
+        self.assertTrue(self.scheduler.should_report("EC", ok(ec=1.2), now=1))
+
+    def test_wildcard_covers_per_rom_keys_not_known_in_advance(self):
+        self.scheduler.should_report("DS18B20", ok(temperature=20.0, **{"28-a": 20.0}), now=0)
+        self.assertFalse(self.scheduler.should_report("DS18B20", ok(temperature=20.0, **{"28-a": 20.05}), now=1))
+        self.assertTrue(self.scheduler.should_report("DS18B20", ok(temperature=20.0, **{"28-a": 20.3}), now=2))
+        self.assertTrue(self.scheduler.should_report(
+            "DS18B20", ok(temperature=20.0, **{"28-a": 20.3, "28-c": 17.0}), now=3))
+
+    def test_wildcard_ignores_non_numeric_fields(self):
+        self.scheduler.should_report("DS18B20", ok(temperature=20.0, unit="C"), now=0)
+        self.assertFalse(self.scheduler.should_report("DS18B20", ok(temperature=20.0, unit="F"), now=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
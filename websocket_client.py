@@ -1,21 +1,30 @@
 import json
+import logging
 import time
 import websockets
 import asyncio
-import platform
+from hal.backend import configure_backend
 from sensors.EC import ECSensor
 from sensors.DHT22 import DHTSensor
 from sensors.DS18B20 import DS18B20Sensor
-from relays.relay_control import RelayControl
+from sensors.acquisition import SensorAcquisition
+from sensors.power import PowerScheduler
+from sensors.scheduler import SamplingScheduler
+from commands.dispatcher import CommandDispatcher
+from control.ec_dosing import ECDosingController
+from relays.pulse import PulseScheduler
+from relays.relay_bank import ON_VALUES, RelayBank
+from libs.ADS1115 import ADS1115_IIC_ADDRESS0, dataRateFromSPS
+from telemetry.buffer import TelemetryBuffer
+from telemetry.stats import StatsRegistry
+from telemetry.codec import BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL, JsonCodec, make_codec
+from telemetry.connection import Backoff, ConnectionManager, SessionLog, run_until_first_exits
+from telemetry.lan_server import LanServer, LanSink
+from telemetry.logs import configure_logging
+from telemetry.metrics import get_registry, write_textfile
+from telemetry.publisher import CallbackSink, TelemetryPublisher
 
-# Conditional import for Adafruit board library (only for Raspberry Pi)
-if platform.system() == 'Linux':  # Raspberry Pi
-    import board
-else:
-    # Mock the board library for non-Linux platforms (macOS/Windows)
-    class board:
-        D11 = "D11"
-        # Add any other board pin constants you might use
+logger = logging.getLogger(__name__)
 
 class WebSocketClient:
     def __init__(self, config_file='config.json'):
@@ -23,31 +32,79 @@ class WebSocketClient:
         with open(config_file, 'r') as config_file:
             self.config = json.load(config_file)
 
+        # Log through a background thread so console and file I/O never block the event loop
+        self.log_listener = configure_logging(self.config.get("logging"))
+
         # Fetch the WebSocket URL from the config file
         self.uri = self.config["websocket_url_pi"]
-        self.retry_delay = 10
+
+        # Select real or simulated hardware before any driver touches it
+        self.hal = configure_backend(self.config.get("hal", {}))
 
         # Dynamically get the board pin from the config file
-        dht_data_pin = getattr(board, self.config['dht_sensor_data_pin'])  # board.D11
+        dht_data_pin = getattr(self.hal.board, self.config['dht_sensor_data_pin'])  # board.D11
         dht_power_pin = self.config['dht_sensor_power_pin']
         ds18b20_power_pin = self.config['ds18b20_sensor_power_pin']
         ec_power_pin = self.config['ec_sensor_power_pin']
+        self.sampling_interval = self.config.get("sampling_interval", 60)
 
+        # Sensors are grouped by power relay so shared rails are switched once per acquisition window
+        power_config = self.config.get("power", {})
+        warmup = power_config.get("warmup", {})
+        self.power = PowerScheduler(
+            sampling_interval=self.sampling_interval,
+            keep_hot_factor=power_config.get("keep_hot_factor"),
+            intervals={sensor_name: settings["interval"]
+                       for sensor_name, settings in self.config.get("sampling", {}).items() if "interval" in settings},
+        )
 
         # Initialize the DHT sensor with the configuration
-        self.dht_sensor = DHTSensor(data_pin=dht_data_pin, power_relay_pin=dht_power_pin)
+        self.dht_sensor = DHTSensor(
+            data_pin=dht_data_pin,
+            power_relay_pin=dht_power_pin,
+            power=self.power.register("DHT22", dht_power_pin, warmup.get("DHT22", 0.0)),
+        )
 
-        # Initialize the DS18B20 sensor with power relay pin from the config file
-        self.ds18b20_sensor = DS18B20Sensor(power_relay_pin=ds18b20_power_pin)
+        # Initialize the DS18B20 probes with power relay pin and resolutions from the config file
+        ds18b20_config = self.config.get('ds18b20', {})
+        self.ds18b20_sensor = DS18B20Sensor(
+            power_relay_pin=ds18b20_power_pin,
+            resolution=ds18b20_config.get('resolution', 12),
+            resolutions=ds18b20_config.get('resolutions'),
+            primary_probe=ds18b20_config.get('primary_probe'),
+            power=self.power.register("DS18B20", ds18b20_power_pin, warmup.get("DS18B20", 0.0)),
+        )
 
-        # Initialize the EC sensor
-        self.ec_sensor = ECSensor(power_relay_pin=ec_power_pin)
+        # Initialize the EC sensor (optionally oversampling each reading in a burst)
+        ec_burst = self.config.get('ec_burst', {})
+        self.ec_sensor = ECSensor(
+            power_relay_pin=ec_power_pin,
+            adc_address=self.config.get('ec_adc_address', ADS1115_IIC_ADDRESS0),
+            gain=self.config.get('ec_gain', 0x00),
+            data_rate=dataRateFromSPS(self.config.get('ec_data_rate_sps', 128)),
+            burst_samples=ec_burst.get('samples', 1),
+            burst_data_rate=dataRateFromSPS(ec_burst.get('data_rate_sps', 860)),
+            burst_filter=ec_burst.get('filter', 'median'),
+            power=self.power.register("EC", ec_power_pin, warmup.get("EC", 0.0)),
+            probe_id=self.config.get('ec_probe_id'),
+        )
 
-        # Initialize actuators using the configuration
-        ec_pump_pin = self.config['ec_pump_pin']
-        self.relay_actuators = {
-            "EC_Pump": RelayControl(pin=ec_pump_pin),
-        }
+        # Initialize the relay board; pins used as sensor power rails stay with the PowerScheduler
+        self.relays = RelayBank.from_config(
+            self.config.get("relays"),
+            reserved_pins=(dht_power_pin, ds18b20_power_pin, ec_power_pin),
+        )
+        self.relay_actuators = self.relays.channels()
+
+        # Timed pulses (dosing pumps) run on-device with per-channel queues and max on-time watchdogs
+        pulse_config = self.config.get("pulse", {})
+        self.pulses = PulseScheduler(
+            self.relays,
+            max_on_times=pulse_config.get("max_on_time"),
+            default_max_on_time=pulse_config.get("default_max_on_time"),
+            queue_size=pulse_config.get("queue_size", 8),
+        )
+        self.pulses.listeners.append(self.send_event)
 
         # Dictionary to map sensor names to their sensor instances
         self.sensors = {
@@ -56,145 +113,582 @@ class WebSocketClient:
             "EC": self.ec_sensor,
         }
 
-    async def gather_data(self, sensor_name=None):
+        # Drivers block on sleeps and bus I/O, so they run in a bounded thread pool.
+        # sensor_inputs wires derived readings to their sources (EC is compensated with the DS18B20 temperature)
+        self.acquisition = SensorAcquisition(
+            self.sensors,
+            max_workers=self.config.get("acquisition_max_workers", 3),
+            read_timeout=self.config.get("sensor_read_timeout", 12),
+            read_timeouts=self.config.get("sensor_read_timeouts"),
+            cycle_timeout=self.config.get("acquisition_cycle_timeout"),
+            power=self.power,
+            inputs=self.config.get("sensor_inputs"),
+        )
+        # Closed-loop EC dosing on the device; the backend only pushes setpoints and receives events
+        ec_control_config = dict(self.config.get("ec_control", {}))
+        self.ec_control = ECDosingController(
+            self.acquisition, self.relays, self.pulses,
+            pumps=ec_control_config.pop("pumps", ("ECA", "ECB")),
+            **ec_control_config,
+        )
+        self.ec_control.listeners.append(self.send_event)
+
+        # Rolling min/max/mean/stddev/EWMA per sensor metric, fed by every physical read
+        stats_config = self.config.get("stats", {})
+        self.stats = StatsRegistry(
+            windows=stats_config.get("windows"),
+            capacity=stats_config.get("capacity", 1024),
+        )
+        self.acquisition.listeners.append(self.stats.update)
+
+        # Per-sensor sampling intervals and report-by-exception rules (default: every sensor each sampling_interval)
+        self.sampling = SamplingScheduler(
+            self.sensors,
+            default_interval=self.sampling_interval,
+            schedules=self.config.get("sampling"),
+        )
+        self._schedule_changed = asyncio.Event()  # Set when an actuator changes state
+        self._loop = None  # Event loop of gather_and_send, for relay changes made on watchdog threads
+        self.relays.listeners.append(self._relays_changed)
+
+        # Default max_age for get_reading/get_status; the DHT22 cannot produce new data faster than every 2 s
+        self.default_max_age = self.config.get("reading_cache_max_age", 2.0)
+
+        # Readings taken while the backend is unreachable are kept on disk until acknowledged
+        buffer_config = self.config.get("telemetry_buffer", {})
+        self.buffer = TelemetryBuffer(
+            path=buffer_config.get("path", "data/telemetry.db"),
+            max_records=buffer_config.get("max_records", 50000),
+            commit_batch=buffer_config.get("commit_batch", 5),
+            commit_interval=buffer_config.get("commit_interval", 300),
+        )
+        self.drain_batch_size = buffer_config.get("drain_batch_size", 200)
+        self.drain_interval = buffer_config.get("drain_interval", 1.0)  # Pause between backlog batches
+        self.ack_timeout = buffer_config.get("ack_timeout", 10)
+
+        # Wire format: "json" (default) or "binary", which is offered to the backend as a subprotocol
+        self.wire_config = self.config.get("wire_format", {})
+        self.codec = JsonCodec()  # Codec negotiated for the current connection
+        self._live_samples = []  # (timestamp, payload) samples waiting to fill a live batch
+        # A partly filled live batch is sent after at most this many seconds (0 = wait for a full batch)
+        self.max_batch_delay = self.wire_config.get("max_batch_delay", 5.0)
+        self._batch_timer = None  # Task sending a partly filled batch once max_batch_delay has passed
+
+        self.websocket = None  # Current backend connection, None while offline
+        self._pending_acks = {}  # batch_id -> future resolved by an "ack" command
+
+        # Reconnects use a jittered backoff that restarts from `initial` after every successful connect;
+        # short ping interval/timeout detect a dead link in seconds
+        connection_config = self.config.get("connection", {})
+        backoff_config = connection_config.get("backoff", {})
+        if self.wire_config.get("format") == "binary":
+            subprotocols = [BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL]
+        else:
+            subprotocols = None
+        self.connection = ConnectionManager(
+            self.uri,
+            backoff=Backoff(
+                initial=backoff_config.get("initial", 1.0),
+                maximum=backoff_config.get("max", 60.0),
+                multiplier=backoff_config.get("multiplier", 2.0),
+                jitter=backoff_config.get("jitter", 0.5),
+            ),
+            ping_interval=connection_config.get("ping_interval", 10.0),
+            ping_timeout=connection_config.get("ping_timeout", 5.0),
+            open_timeout=connection_config.get("open_timeout", 10.0),
+            close_timeout=connection_config.get("close_timeout", 2.0),
+            stable_after=connection_config.get("stable_after", 10.0),
+            subprotocols=subprotocols,
+            compression="deflate" if self.wire_config.get("permessage_deflate", True) else None,
+        )
+        # Live samples are numbered per session; the backend can ask for recent ones again after a gap
+        self.session = SessionLog(window=connection_config.get("replay_window", 500))
+
+        # Every reading is fanned out to the main backend and any extra sinks (historian, secondary site),
+        # each with its own bounded queue so a slow sink never stalls acquisition or the others
+        publisher_config = self.config.get("publisher", {})
+        self.publisher = TelemetryPublisher.from_config(
+            publisher_config.get("sinks"),
+            primary=CallbackSink("backend", self.publish, **publisher_config.get("backend", {})),
+        )
+
+        # Optional read-only API for LAN panels, served from cached state so it never adds sensor reads
+        lan_config = dict(self.config.get("lan_api", {}))
+        self.lan = None
+        if lan_config.pop("enabled", False):
+            self.lan = LanServer(
+                views={
+                    "readings": self.acquisition.cache.snapshot,
+                    "actuators": self.relays.snapshot,
+                    "stats": self.stats.snapshot,
+                    "ec_control": self.ec_control.status,
+                    "pulses": self.pulses.pending,
+                },
+                host=lan_config.get("host", "127.0.0.1"),
+                port=lan_config.get("port", 8765),
+                token=lan_config.get("token"),
+                metrics=get_registry().render_prometheus,
+            )
+            self.publisher.sinks.append(LanSink(self.lan, **lan_config.get("sink", {})))
+            self.pulses.listeners.append(self.lan.push_event)
+            self.ec_control.listeners.append(self.lan.push_event)
+
+        # Runtime metrics, served by get_metrics and optionally exported for node_exporter's textfile collector
+        self.metrics = get_registry()
+        metrics_config = self.config.get("metrics", {})
+        self.metrics_textfile = metrics_config.get("textfile")
+        self.metrics_export_interval = metrics_config.get("export_interval", 15)
+        # Commands run concurrently, serialised per relay channel, with a bounded number in flight
+        self.dispatcher = CommandDispatcher(max_in_flight=self.config.get("commands", {}).get("max_in_flight", 16))
+        self._register_commands()
+        self._send_seconds = self.metrics.histogram("ws_send_seconds", "Time to encode and send one message")
+        self._send_failures = self.metrics.counter("ws_send_failures_total", "Live sends that failed and were buffered")
+        self.metrics.gauge_func("telemetry_backlog_records", lambda: len(self.buffer), "Readings waiting on disk")
+        self.metrics.gauge_func("hal_simulated", lambda: int(self.hal.name == "sim"),
+                                "1 when readings come from the simulated hardware backend")
+
+    async def gather_data(self, sensor_name=None, max_age=None):
         """
         Gathers data from a specific sensor or all sensors.
         If sensor_name is None or 'all', it gathers data from all sensors.
         Otherwise, it gathers data from the specified sensor.
+        With max_age (seconds), cached readings at most that old are used instead of a physical read.
         """
         if sensor_name is None or sensor_name == "all":
-            # Gather data from all sensors
-            all_sensor_data = {}
-            for sensor_name, sensor_instance in self.sensors.items():
-                sensor_data = sensor_instance.read_value()
-                sensor_status = sensor_instance.get_status()
-                all_sensor_data[sensor_name] = {
-                    "sensor_data": sensor_data,
-                    "sensor_status": sensor_status
-                }
-            return all_sensor_data
+            # Gather data from all sensors in parallel; late sensors come back with a Timeout status
+            return await self.acquisition.read_all(max_age=max_age)
         else:
-            # Gather data from the specified sensor
-            sensor_instance = self.sensors.get(sensor_name)
-            if sensor_instance:
-                sensor_data = sensor_instance.read_value()
-                sensor_status = sensor_instance.get_status()
-                return {sensor_name: {"sensor_data": sensor_data, "sensor_status": sensor_status}}
-            else:
-                # Raise an error if the sensor is not recognized
-                raise ValueError(f"Unrecognized sensor: {sensor_name}")
+            # Gather data from the specified sensor (raises ValueError if the sensor is not recognized)
+            return {sensor_name: await self.acquisition.read(sensor_name, max_age=max_age)}
 
     async def gather_actuator_status(self):
         """Get the status of all actuators (i.e., relays)."""
-        actuator_status = {}
-        for name, relay in self.relay_actuators.items():
-            actuator_status[name] = relay.get_status()
-        return actuator_status
+        return self.relays.snapshot()
     
-    async def send_data(self, websocket):
-        """Send sensor data and actuator status to the backend via WebSocket."""
+    async def collect_payload(self, max_age=None):
+        """Gather sensor data and actuator status into one payload."""
         # Gather data from all sensors
-        sensor_info = await self.gather_data()
+        sensor_info = await self.gather_data(max_age=max_age)
 
         # Gather actuator statuses (e.g., status of EC pump relay)
         actuator_info = await self.gather_actuator_status()
 
         # Combine sensor data and actuator status into one payload
-        payload = {
+        return {
             "sensor_data": sensor_info,
             "actuator_status": actuator_info
         }
 
-        # Send the payload as JSON to the WebSocket server
-        await websocket.send(json.dumps(payload))
-        print(f"Data sent: {payload}")
+    async def send_data(self, websocket, max_age=None):
+        """Send sensor data and actuator status to the backend via WebSocket."""
+        payload = await self.collect_payload(max_age=max_age)
+
+        # Send the payload in the negotiated wire format
+        started = time.perf_counter()
+        await websocket.send(self.codec.encode([(time.time(), payload)]))
+        self._send_seconds.observe(time.perf_counter() - started)
+        logger.debug("Data sent: %s", payload)
+
+    async def publish(self, payload, timestamp=None):
+        """Send a payload live if connected, otherwise store it for later delivery."""
+        self._live_samples.append((time.time() if timestamp is None else timestamp, payload))
+        websocket = self.websocket
+        if websocket is None:
+            await self._buffer_live_samples()
+            return
+        if len(self._live_samples) < self.codec.batch_size:
+            if self.max_batch_delay and (self._batch_timer is None or self._batch_timer.done()):
+                self._batch_timer = asyncio.create_task(self._send_live_after(self.max_batch_delay))
+            return
+        await self._send_live(websocket)
+
+    async def _send_live_after(self, delay):
+        """Send whatever live samples are batched once `delay` seconds have passed."""
+        await asyncio.sleep(delay)
+        websocket = self.websocket
+        if websocket is not None and self._live_samples:
+            await self._send_live(websocket)
+
+    async def _send_live(self, websocket):
+        """Send the batched live samples in one frame, or buffer them if the connection is gone."""
+        if self._batch_timer is not None and self._batch_timer is not asyncio.current_task():
+            self._batch_timer.cancel()
+        self._batch_timer = None
+        samples, self._live_samples = self._live_samples, []
+        try:
+            started = time.perf_counter()
+            await websocket.send(self.codec.encode(samples, seq=self.session.next_seq))
+            self._send_seconds.observe(time.perf_counter() - started)
+            self.session.record(samples)  # Only samples that were sent consume sequence numbers
+            logger.debug("Data sent: %d samples", len(samples))
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.warning("Send failed (%s), buffering reading", e)
+            self._send_failures.inc()
+            self._live_samples = samples + self._live_samples
+            await self._buffer_live_samples()
+
+    async def send_event(self, event):
+        """Push an on-device event (e.g. a finished pulse) to the backend if connected."""
+        websocket = self.websocket
+        if websocket is None:
+            logger.debug("Event not delivered (offline): %s", event)
+            return
+        await websocket.send(json.dumps(event))
+
+    async def _buffer_live_samples(self):
+        """Move samples that were not sent live into the on-disk buffer."""
+        samples, self._live_samples = self._live_samples, []
+        if samples:
+            await self.buffer.extend(samples)
+
+    def _register_commands(self):
+        """Map every backend action to its handler; relay commands are serialised per channel."""
+        relay = lambda command: [self._channel_key(command.get("actuator"))]
+        relays = lambda command: [self._channel_key(name) for name in (command.get("relays") or {})]
+        sensor = lambda command: ["sensor:" + str(command.get("sensor", "EC"))]
+        register = self.dispatcher.register
+        register("activate", self._cmd_activate, relay)
+        register("deactivate", self._cmd_deactivate, relay)
+        register("set_relays", self._cmd_set_relays, relays)
+        register("pulse", self._cmd_pulse, relay)
+        register("cancel_pulse", self._cmd_cancel_pulse, relay)
+        register("set_ec_control", self._cmd_set_ec_control, lambda command: ["ec_control"])
+        register("get_ec_control", self._cmd_get_ec_control)
+        register("get_reading", self._cmd_get_reading)
+        register("get_status", self._cmd_get_status)
+        register("get_stats", self._cmd_get_stats)
+        register("get_metrics", self._cmd_get_metrics)
+        register("get_cache_stats", self._cmd_get_cache_stats)
+        for action in ("calibrate", "reset_calibration", "restore_calibration", "get_calibration"):
+            register(action, self._cmd_calibration, sensor)
+        register("ack", self._cmd_ack)
+        register("resend", self._cmd_resend)
+
+    def _channel_key(self, name):
+        """Serialisation key for a relay channel, shared by a channel and its aliases."""
+        try:
+            return "relay:" + self.relays.canonical(name)
+        except ValueError:
+            return "relay:" + str(name)
+
+    def _relays_changed(self, changed):
+        """RelayBank listener: wake the sampler, since sensors tied to an actuator may sample faster now."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Watchdog thread: hand the wake-up to the event loop
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._schedule_changed.set)
+            return
+        self._schedule_changed.set()
 
     async def handle_commands(self, websocket, command):
-        """Handle commands received from the backend."""
-        action = command.get("action")
+        """Handle one command from the backend and send its reply."""
+        await self.dispatcher.dispatch(websocket, command)
+
+    async def _cmd_activate(self, websocket, command):
         actuator_name = command.get("actuator")
+        if actuator_name not in self.relay_actuators:
+            raise ValueError(f"Unrecognized actuator: {actuator_name}")
+        self.relay_actuators[actuator_name].activate()
+        self.pulses.arm_watchdog(actuator_name)  # Enforce the channel's max on-time (an armed deadline is kept)
+        logger.info("%s activated", actuator_name)
+        return {"status": "activated", "actuator": actuator_name}
+
+    async def _cmd_deactivate(self, websocket, command):
+        actuator_name = command.get("actuator")
+        if actuator_name not in self.relay_actuators:
+            raise ValueError(f"Unrecognized actuator: {actuator_name}")
+        self.pulses.cancel(actuator_name)  # A deactivate also ends pending pulses
+        self.relay_actuators[actuator_name].deactivate()
+        self.pulses.disarm_watchdog(actuator_name)
+        logger.info("%s deactivated", actuator_name)
+        return {"status": "deactivated", "actuator": actuator_name}
+
+    async def _cmd_set_relays(self, websocket, command):
+        # Switch many relays in one batched write: {"relays": {"PH": "ON", "FAN": "OFF"}}
+        relays = command.get("relays") or {}
+        changed = self.relays.apply(relays)
+        for name, value in relays.items():
+            if value in ON_VALUES:
+                self.pulses.arm_watchdog(name)
+            else:
+                self.pulses.cancel(name)
+                self.pulses.disarm_watchdog(name)
+        logger.info("Relays set: %s", changed)
+        return {"status": "relays_set", "changed": changed, "actuator_status": self.relays.snapshot()}
+
+    async def _cmd_pulse(self, websocket, command):
+        # Switch the actuator on for duration_ms, timed on-device; completion is reported as an event
+        actuator_name = command.get("actuator")
+        pulse_id = self.pulses.pulse(actuator_name, command.get("duration_ms", 0), request_id=command.get("request_id"))
+        return {"status": "pulse_queued", "actuator": actuator_name, "pulse_id": pulse_id}
+
+    async def _cmd_cancel_pulse(self, websocket, command):
+        actuator_name = command.get("actuator")
+        cancelled = self.pulses.cancel(actuator_name, command.get("pulse_id"))
+        return {"status": "pulse_cancelled", "actuator": actuator_name, "cancelled": cancelled}
+
+    async def _cmd_set_ec_control(self, websocket, command):
+        # {"action": "set_ec_control", "settings": {"setpoint": 1.8, "enabled": true}}
+        return {"status": "ec_control", "data": self.ec_control.configure(command.get("settings") or {})}
+
+    async def _cmd_get_ec_control(self, websocket, command):
+        return {"status": "ec_control", "data": self.ec_control.status()}
+
+    async def _cmd_get_reading(self, websocket, command):
+        # Use gather_data to retrieve sensor readings dynamically (ValueError if the sensor is not recognized)
         sensor_name = command.get("sensor")
+        sensor_info = await self.gather_data(sensor_name, max_age=command.get("max_age", self.default_max_age))
+        logger.debug("%s sensor data sent: %s", sensor_name, sensor_info)
+        return {"status": "reading_received", "sensor": sensor_name, "data": sensor_info}
 
-        if action == "activate":
-            if actuator_name in self.relay_actuators:
-                self.relay_actuators[actuator_name].activate()
-                await websocket.send(f"{actuator_name} activated")
-                print(f"{actuator_name} activated")
+    async def _cmd_get_status(self, websocket, command):
+        max_age = command.get("max_age", self.default_max_age)
+        if "request_id" in command:
+            # One JSON reply carrying the payload, so periodic telemetry frames cannot come in between
+            return {"status": "status", "data": await self.collect_payload(max_age=max_age)}
+        # Without a request_id the reply is the status payload itself, in the negotiated wire format
+        await self.send_data(websocket, max_age=max_age)
+        return None
 
-        elif action == "deactivate":
-            if actuator_name in self.relay_actuators:
-                self.relay_actuators[actuator_name].deactivate()
-                await websocket.send(f"{actuator_name} deactivated")
-                print(f"{actuator_name} deactivated")
+    async def _cmd_get_stats(self, websocket, command):
+        # Rolling statistics for one sensor (or all), so the backend can work from summaries
+        sensor_name = command.get("sensor")
+        return {"status": "stats", "sensor": sensor_name or "all", "data": self.stats.snapshot(sensor_name)}
 
-        elif action == "get_reading":
-            # Use gather_data to retrieve sensor readings dynamically
-            try:
-                sensor_info = await self.gather_data(sensor_name)
-                await websocket.send(json.dumps({
-                    "status": "reading_received",
-                    "sensor": sensor_name,
-                    "data": sensor_info
-                }))
-                print(f"{sensor_name} sensor data sent: {sensor_info}")
-            except ValueError as e:
-                # Handle the case where the sensor is not recognized
-                await websocket.send(json.dumps({
-                    "status": "error",
-                    "message": str(e)
-                }))
-                print(f"Error: {str(e)}")
-
-        elif action == "get_status":
-            # If a status request is received, gather and send data
-            await self.send_data(websocket)
+    async def _cmd_get_metrics(self, websocket, command):
+        # Counters, gauges and histograms as JSON, or as Prometheus text with {"format": "prometheus"}
+        if command.get("format") == "prometheus":
+            return {"status": "metrics", "data": self.metrics.render_prometheus()}
+        return {"status": "metrics", "data": self.metrics.snapshot()}
+
+    async def _cmd_get_cache_stats(self, websocket, command):
+        # Report reading cache hit/miss counters and the age of each cached reading
+        return {"status": "cache_stats", "data": self.acquisition.cache.stats()}
+
+    async def _cmd_calibration(self, websocket, command):
+        """Calibrate, reset, restore or report the calibration of a sensor (default: EC)."""
+        action = command.get("action")
+        sensor_name = command.get("sensor", "EC")
+        sensor = self.sensors.get(sensor_name)
+        if sensor is None or not hasattr(sensor, "calibrate"):
+            raise ValueError(f"Sensor {sensor_name} cannot be calibrated")
+        extra = {}
+        if action == "calibrate":
+            # Compensate with the given temperature, else a probe reading, else the input's default
+            temperature = command.get("temperature")
+            source = "command"
+            if temperature is None:
+                temperature, source = await self._calibration_temperature(sensor_name)
+            extra = {"temperature": temperature, "temperature_source": source}
+            call = lambda: sensor.calibrate(temperature)
+        elif action == "reset_calibration":
+            call = sensor.reset_calibration
+        elif action == "restore_calibration":
+            call = lambda: sensor.restore_calibration(command.get("version"))
+        else:
+            call = sensor.get_calibration
+        # Calibration drives the ADC and writes to disk, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        calibration = await loop.run_in_executor(self.acquisition.executor, call)
+        logger.info("%s %s: %s", sensor_name, action, calibration)
+        return {"status": "calibration", "sensor": sensor_name, "data": calibration, **extra}
+
+    async def _calibration_temperature(self, sensor_name):
+        """
+        Temperature for calibrating sensor_name, as (value, source): the sensor's temperature
+        input from sensor_inputs (DS18B20 by default), read on demand unless a reading within the
+        input's max_age is cached, or the input's default when the probe has no value.
+        """
+        spec = self.acquisition.inputs.get(sensor_name, {}).get("temperature", {})
+        upstream = spec.get("sensor", "DS18B20")
+        default = spec.get("default", 25)
+        if upstream not in self.sensors:
+            return default, "default"
+        entry = (await self.acquisition.read_all([upstream], max_age=spec.get("max_age", 30)))[upstream]
+        temperature = (entry.get("sensor_data") or {}).get(spec.get("metric", "temperature"))
+        if temperature is None:
+            logger.warning("No %s temperature for %s calibration, using %s", upstream, sensor_name, default)
+            return default, "default"
+        return temperature, upstream
+
+    async def _cmd_ack(self, websocket, command):
+        # Backend confirmed receipt of a backlog batch
+        ack = self._pending_acks.get(command.get("batch_id"))
+        if ack is not None and not ack.done():
+            ack.set_result(True)
+        return None
+
+    async def _cmd_resend(self, websocket, command):
+        # Send recently sent live samples again: {"action": "resend", "from_seq": 120, "to_seq": 131}
+        entries = self.session.since(int(command.get("from_seq", 1)), command.get("to_seq"))
+        batch_size = self.codec.batch_size
+        for start in range(0, len(entries), batch_size):
+            chunk = entries[start:start + batch_size]
+            await websocket.send(self.codec.encode([(timestamp, payload) for _, timestamp, payload in chunk],
+                                                   seq=chunk[0][0]))
+        return {
+            "status": "resent",
+            "session_id": self.session.session_id,
+            "count": len(entries),
+            "replay_from": self.session.sent[0][0] if self.session.sent else self.session.next_seq,
+        }
 
     async def listen_and_execute(self, websocket):
         """Main loop to listen for commands from the backend and execute actions."""
         try:
             async for message in websocket:
                 if not message.strip():  # Check for empty or whitespace-only message
-                    print("Received empty or whitespace message, skipping...")
+                    logger.debug("Received empty or whitespace message, skipping...")
                     continue
 
                 try:
                     command = json.loads(message)  # Attempt to decode the JSON message
-                    print(f"Received command: {command}")
-                    await self.handle_commands(websocket, command)
+                    logger.debug("Received command: %s", command)
                 except json.JSONDecodeError as e:
-                    print(f"Failed to decode JSON message: {e}. Received: {message}")
+                    logger.warning("Failed to decode JSON message: %s. Received: %.200s", e, message)
                     error_response = json.dumps({"error": "Invalid JSON", "details": str(e)})
                     await websocket.send(error_response)
+                    continue
+                # Run the command in the background so slow ones do not hold up the next message
+                await self.dispatcher.submit(websocket, command)
 
         except websockets.exceptions.ConnectionClosed as e:
-            print(f"Connection closed: {e}")
+            logger.info("Connection closed: %s", e)
+        finally:
+            await self.dispatcher.cancel_all()  # Their replies have nowhere to go
+
+    async def sample_sensors(self, sensor_names):
+        """Physically read the given sensors in one acquisition window."""
+        return await self.acquisition.read_all(sensor_names)
 
-    async def gather_data_periodically(self, websocket, interval=60):
-        """Periodically gather sensor data and send it to the backend."""
+    async def acquire_periodically(self):
+        """
+        Sample each sensor on its own schedule, whether or not the backend is reachable.
+        Only readings that pass the report-by-exception rules are published.
+        """
         while True:
-            await self.send_data(websocket)
-            await asyncio.sleep(interval)
+            actuator_info = await self.gather_actuator_status()
+            for sensor_name in self.sampling.schedules:
+                # Fast mode changes the interval, and with it whether the sensor's rail stays hot
+                self.power.set_interval(sensor_name, self.sampling.interval_for(sensor_name, actuator_info))
+            due = self.sampling.due(actuator_info)
+            if due:
+                started = time.monotonic()
+                sensor_info = await self.sample_sensors(due)
+                self.sampling.mark_sampled(due, started)
+                report = {sensor_name: entry for sensor_name, entry in sensor_info.items()
+                          if self.sampling.should_report(sensor_name, entry)}
+                if report:
+                    # Sampled once, queued for every sink
+                    self.publisher.publish({
+                        "sensor_data": report,
+                        "actuator_status": await self.gather_actuator_status()
+                    })
 
-    async def gather_and_send(self):
-        """Main function to gather and send data periodically and listen for commands."""
+            # Sleep until the next sensor is due; an actuator switching wakes us early to re-plan
+            self._schedule_changed.clear()
+            delay = self.sampling.seconds_until_next(await self.gather_actuator_status())
+            try:
+                await asyncio.wait_for(self._schedule_changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain_backlog(self, websocket):
+        """
+        Replay buffered readings oldest first, in batches, using the negotiated codec.
+        Each batch stays on disk until the backend answers with {"action": "ack", "batch_id": ...},
+        and batches are spaced by drain_interval so live readings are not starved.
+        """
+        loop = asyncio.get_running_loop()
         while True:
+            records = await self.buffer.fetch(self.drain_batch_size)
+            if not records:
+                await asyncio.sleep(self.drain_interval)
+                continue
+
+            batch_id = records[-1]["seq"]
+            ack = loop.create_future()
+            self._pending_acks[batch_id] = ack
             try:
-                async with websockets.connect(self.uri) as websocket:
-                    # Run both gather_data_periodically and listen_for_commands concurrently
-                    gather_task = asyncio.create_task(self.gather_data_periodically(websocket, 60))
-                    listen_task = asyncio.create_task(self.listen_and_execute(websocket))
+                samples = [(record["timestamp"], record["payload"]) for record in records]
+                await websocket.send(self.codec.encode(samples, batch_id=batch_id))
+                await asyncio.wait_for(ack, self.ack_timeout)
+                await self.buffer.confirm(batch_id)
+                logger.info("Backlog batch %s acknowledged (%d records)", batch_id, len(records))
+            except asyncio.TimeoutError:
+                logger.warning("No ack for backlog batch %s, will resend", batch_id)
+            finally:
+                self._pending_acks.pop(batch_id, None)
+
+            await asyncio.sleep(self.drain_interval)
 
-                    # Wait for both tasks to run concurrently
-                    await asyncio.gather(gather_task, listen_task)
+    async def export_metrics_periodically(self):
+        """Rewrite the Prometheus textfile every export_interval seconds."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.export_metrics(loop)
+            await asyncio.sleep(self.metrics_export_interval)
+
+    async def export_metrics(self, loop):
+        """One export cycle: sample the metrics on the loop thread, write the file in the default executor."""
+        try:
+            text = self.metrics.render_prometheus()
+            # Only the file I/O leaves the loop, so a slow SD card does not stall it
+            await loop.run_in_executor(None, write_textfile, self.metrics_textfile, text)
+        except Exception as e:
+            # A failed export must not end the export task
+            logger.warning("Could not write metrics to %s: %s", self.metrics_textfile, e)
 
-            except (websockets.exceptions.ConnectionClosedError, OSError) as e:
-                print(f"Connection error: {e}. Retrying in {self.retry_delay} seconds...")
-                await asyncio.sleep(self.retry_delay)
-                self.retry_delay = min(self.retry_delay * 2, 60)
+    async def on_connect(self, websocket):
+        """Run one backend connection: announce the session, then replay the backlog and serve commands."""
+        # The binary codec keeps per-connection name tables, so build a fresh one
+        self.codec = make_codec(websocket.subprotocol, self.wire_config)
+        self.websocket = websocket
+        try:
+            await websocket.send(json.dumps(self.session.hello(resumed=self.connection.connections > 1,
+                                                               hal_backend=self.hal.name)))
+            # When either task ends (connection closed or failed), the other is cancelled
+            await run_until_first_exits(self.drain_backlog(websocket), self.listen_and_execute(websocket))
+        finally:
+            self.websocket = None
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+                self._batch_timer = None
+            await self._buffer_live_samples()
+
+    async def gather_and_send(self):
+        """Main function to gather data periodically, forward it when connected and listen for commands."""
+        self._loop = asyncio.get_running_loop()
+        # Acquisition runs independently of the connection so nothing is lost while offline
+        acquire_task = asyncio.create_task(self.acquire_periodically())
+        export_task = asyncio.create_task(self.export_metrics_periodically()) if self.metrics_textfile else None
+        # EC control keeps running while the backend is unreachable
+        control_task = asyncio.create_task(self.ec_control.run())
+        self.publisher.start()
+        if self.lan is not None:
+            await self.lan.start()
+        try:
+            await self.connection.run(self.on_connect)
+        finally:
+            acquire_task.cancel()
+            control_task.cancel()
+            await self.publisher.stop()
+            if self.lan is not None:
+                await self.lan.stop()
+            self.pulses.shutdown()
+            if export_task is not None:
+                export_task.cancel()
+            await self.buffer.aclose()
 
 async def main():
     ws_client = WebSocketClient()
-    await ws_client.gather_and_send()
+    try:
+        await ws_client.gather_and_send()
+    finally:
+        ws_client.acquisition.shutdown()
+        ws_client.log_listener.stop()  # Flush queued log records
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file